@@ -1,37 +1,178 @@
+import csv
+import datetime
+import json
+import tempfile
 from .models import BuyList
 from openpyxl import Workbook
-from django.http import HttpResponse
+from django.conf import settings
+from django.http import HttpResponse, FileResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from rest_framework.exceptions import ValidationError
+
+HEADERS = ["ID", "Item", "Miktar", "Birim", "Narx", "Para Birimi", "Sana"]
+
+# Satırlar model instance'ı oluşturmadan, sunucu tarafı cursor ile parça parça okunur
+EXPORT_FIELDS = ('id', 'item__name', 'item_count', 'item_unit__unit', 'item_price', 'money_type__type', 'created_at')
+EXPORT_CHUNK_SIZE = 2000
+STREAM_ROWS_PER_CHUNK = 500
+NDJSON_KEYS = ('id', 'item', 'qty', 'unit', 'narx', 'moneytype', 'created_at')
+EXPORT_FILTERS = ('date_from', 'date_to', 'item')
+EXPORT_XLSX_SYNC_MAX_ROWS = getattr(settings, 'EXPORT_XLSX_SYNC_MAX_ROWS', 20000)
+
+
+def filter_export_queryset(queryset, params):
+    """
+    Filtreler (hepsi opsiyonel):
+      date_from=YYYY-MM-DD  date_to=YYYY-MM-DD  (ikisi de dahil)
+      item=3,7,12
+    """
+    # created_at__date yerine datetime aralığı — (company, depo, created_at) index'i kullanılsın
+    for param, lookup, days in (('date_from', 'created_at__gte', 0), ('date_to', 'created_at__lt', 1)):
+        value = params.get(param)
+        if value:
+            date = parse_date(str(value))
+            if date is None:
+                raise ValidationError({param: "Sana formati YYYY-MM-DD bo'lishi kerak."})
+            start = datetime.datetime.combine(date + datetime.timedelta(days=days), datetime.time.min)
+            queryset = queryset.filter(**{lookup: timezone.make_aware(start)})
+
+    items = params.get('item')
+    if items:
+        try:
+            item_ids = [int(i) for i in str(items).split(',') if i.strip()]
+        except ValueError:
+            raise ValidationError({'item': "Item id'lari vergul bilan ajratilgan sonlar bo'lishi kerak."})
+        queryset = queryset.filter(item_id__in=item_ids)
+
+    return queryset.order_by('created_at', 'id')
+
+
+def get_export_queryset(request, depo_id):
+    queryset = BuyList.objects.filter(
+        company=request.user.company,
+        depo_id=depo_id  # ← model field adı: depo (depolar değil)
+    )
+    return filter_export_queryset(queryset, request.query_params)
+
+
+def buylist_export_values(queryset):
+    # Ham satırlar (BI için) — tarih tam ISO formatında
+    for (pk, item, count, unit, price, money_type, created_at) in queryset.values_list(*EXPORT_FIELDS).iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield (pk, item or "", count, unit or "", price, money_type or "",
+               created_at.isoformat() if created_at else "")
+
+
+class _Echo:
+    # csv.writer'ın yazdığını geri döndüren sahte dosya (Django docs'taki yöntem)
+    def write(self, value):
+        return value
+
+
+def stream_buylist_csv(values):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(HEADERS)
+    chunk = []
+    for row in values:
+        chunk.append(writer.writerow(row))
+        if len(chunk) >= STREAM_ROWS_PER_CHUNK:
+            yield "".join(chunk)
+            chunk = []
+    if chunk:
+        yield "".join(chunk)
+
+
+def stream_buylist_ndjson(values):
+    chunk = []
+    for row in values:
+        chunk.append(json.dumps(dict(zip(NDJSON_KEYS, row)), ensure_ascii=False) + "\n")
+        if len(chunk) >= STREAM_ROWS_PER_CHUNK:
+            yield "".join(chunk)
+            chunk = []
+    if chunk:
+        yield "".join(chunk)
+
+
+def buylist_export_rows(queryset):
+    for (pk, item, count, unit, price, money_type, created_at) in queryset.values_list(*EXPORT_FIELDS).iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield [
+            pk,
+            item or "",
+            float(count) if count is not None else 0,
+            unit or "",                                 # ← Unit modelde .unit field'ı var
+            float(price) if price is not None else 0,
+            money_type or "",                           # ← MoneyType modelde .type field'ı var
+            created_at.strftime("%Y-%m-%d") if created_at else "",
+        ]
+
+
+def exceeds_sync_limit(queryset):
+    # LIMIT'li COUNT — büyük depoda tüm satırlar sayılmaz
+    return queryset[:EXPORT_XLSX_SYNC_MAX_ROWS + 1].count() > EXPORT_XLSX_SYNC_MAX_ROWS
+
+
+def write_buylist_xlsx(rows, fileobj):
+    """
+    openpyxl write-only modu: her satır hemen diskteki geçici sheet XML'ine yazılır,
+    bellekte satır tutulmaz. Döndürür: yazılan satır sayısı.
+    """
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("BuyList")
+    ws.append(HEADERS)
+
+    count = 0
+    for row in rows:
+        ws.append(row)
+        count += 1
+
+    wb.save(fileobj)
+    return count
+
 
 def export_buylist_as_excel(request, depo_id):
     if not request.user.is_authenticated:
         return HttpResponse("Unauthorized", status=401)
 
-    buylist_items = BuyList.objects.filter(
-        company=request.user.company,
-        depo_id=depo_id  # ← model field adı: depo (depolar değil)
-    ).select_related('item', 'item_unit', 'money_type')
-
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "BuyList"
-
-    headers = ["ID", "Item", "Miktar", "Birim", "Narx", "Para Birimi", "Sana"]
-    ws.append(headers)
-
-    for b in buylist_items:
-        ws.append([
-            b.id,
-            b.item.name if b.item else "",
-            float(b.item_count) if b.item_count is not None else 0,
-            b.item_unit.unit if b.item_unit else "",   # ← Unit modelde .unit field'ı var
-            float(b.item_price) if b.item_price is not None else 0,
-            b.money_type.type if b.money_type else "",  # ← MoneyType modelde .type field'ı var
-            b.created_at.strftime("%Y-%m-%d") if b.created_at else "",
-        ])
-
-    response = HttpResponse(
+    buylist_items = get_export_queryset(request, depo_id)
+
+    # Bu yanıt stream DEĞİL: xlsx bir zip dosyası, central directory en sonda yazıldığı
+    # için workbook önce tamamen geçici dosyaya yazılır (istek o kadar bekler), sonra
+    # FileResponse ile parça parça gönderilir. TemporaryFile response bitince silinir.
+    # EXPORT_XLSX_SYNC_MAX_ROWS'tan büyük exportlar buraya gelmez — view export job açar.
+    tmp = tempfile.TemporaryFile(suffix=".xlsx")
+    write_buylist_xlsx(buylist_export_rows(buylist_items), tmp)
+    tmp.seek(0)
+
+    return FileResponse(
+        tmp,
+        as_attachment=True,
+        filename=f"depo_{depo_id}_buylist.xlsx",
         content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
     )
-    response['Content-Disposition'] = f'attachment; filename="depo_{depo_id}_buylist.xlsx"'
-    wb.save(response)
-    return response
\ No newline at end of file
+
+
+def export_buylist_as_csv(request, depo_id):
+    if not request.user.is_authenticated:
+        return HttpResponse("Unauthorized", status=401)
+
+    values = buylist_export_values(get_export_queryset(request, depo_id))
+    response = StreamingHttpResponse(stream_buylist_csv(values), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="depo_{depo_id}_buylist.csv"'
+    return response
+
+
+def export_buylist_as_ndjson(request, depo_id):
+    if not request.user.is_authenticated:
+        return HttpResponse("Unauthorized", status=401)
+
+    values = buylist_export_values(get_export_queryset(request, depo_id))
+    response = StreamingHttpResponse(stream_buylist_ndjson(values), content_type='application/x-ndjson')
+    response['Content-Disposition'] = f'attachment; filename="depo_{depo_id}_buylist.ndjson"'
+    return response
+
+
+EXPORT_FORMATS = {
+    'xlsx': export_buylist_as_excel,
+    'csv': export_buylist_as_csv,
+    'ndjson': export_buylist_as_ndjson,
+}
@@ -0,0 +1,117 @@
+# app/export_jobs.py
+# Arka plan export işleri — API iş kuyruğa koyar, run_export_worker işler
+import hashlib
+import json
+import tempfile
+import traceback
+from datetime import timedelta
+
+from django.core.files import File
+from django.db import IntegrityError, connection, transaction
+from django.utils import timezone
+
+from .models import BuyList, ExportJob
+from .expoer_as_excel import (
+    EXPORT_FILTERS, filter_export_queryset, buylist_export_rows, buylist_export_values,
+    write_buylist_xlsx, stream_buylist_csv, stream_buylist_ndjson,
+)
+
+# rows_done her satırda değil, bu aralıkla yazılır
+PROGRESS_EVERY = 2000
+
+
+def normalize_filters(filters):
+    return {key: str(filters[key]) for key in EXPORT_FILTERS if filters.get(key) not in (None, '')}
+
+
+def export_job_key(company_id, depo_id, fmt, filters):
+    raw = json.dumps([company_id, depo_id, fmt, normalize_filters(filters)], sort_keys=True)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def get_or_create_export_job(user, depo, fmt, filters):
+    """
+    Aynı anahtarla aktif (queued/running) bir iş varsa onu döndürür.
+    Döndürür: (job, created)
+    """
+    filters = normalize_filters(filters)
+    # Filtre hatalarını iş kuyruğa girmeden yakala (ValidationError → 400)
+    filter_export_queryset(BuyList.objects.none(), filters)
+
+    key = export_job_key(user.company_id, depo.id, fmt, filters)
+    active = ExportJob.objects.filter(dedupe_key=key, status__in=ExportJob.ACTIVE_STATUSES)
+
+    job = active.first()
+    if job:
+        return job, False
+    try:
+        with transaction.atomic():
+            job = ExportJob.objects.create(
+                company_id=user.company_id, depo=depo, created_by=user,
+                format=fmt, filters=filters, dedupe_key=key,
+            )
+        return job, True
+    except IntegrityError:
+        # Aynı anda gelen ikinci istek — partial unique constraint yakaladı
+        return active.get(), False
+
+
+def reclaim_stale_jobs(stale_minutes):
+    """Çöken worker'dan kalan, stale_minutes'tan uzun 'running' işleri failed yapar."""
+    stale = timezone.now() - timedelta(minutes=stale_minutes)
+    return ExportJob.objects.filter(status='running', started_at__lt=stale).update(
+        status='failed', error='Worker stopped while the job was running.', finished_at=timezone.now(),
+    )
+
+
+def claim_next_job():
+    """Kuyruktaki en eski işi 'running' yapıp döndürür; yoksa None."""
+    with transaction.atomic():
+        queryset = ExportJob.objects.filter(status='queued').order_by('created_at')
+        if connection.features.has_select_for_update_skip_locked:
+            queryset = queryset.select_for_update(skip_locked=True)
+        job = queryset.first()
+        if job is None:
+            return None
+        job.status = 'running'
+        job.started_at = timezone.now()
+        job.save(update_fields=['status', 'started_at'])
+        return job
+
+
+def _track_progress(job, rows):
+    done = 0
+    for row in rows:
+        yield row
+        done += 1
+        if done % PROGRESS_EVERY == 0:
+            ExportJob.objects.filter(pk=job.pk).update(rows_done=done)
+
+
+def run_export_job(job):
+    queryset = filter_export_queryset(
+        BuyList.objects.filter(company_id=job.company_id, depo_id=job.depo_id),
+        job.filters,
+    )
+    try:
+        job.rows_total = queryset.count()
+        job.save(update_fields=['rows_total'])
+
+        with tempfile.TemporaryFile() as tmp:
+            if job.format == 'xlsx':
+                write_buylist_xlsx(_track_progress(job, buylist_export_rows(queryset)), tmp)
+            else:
+                stream = stream_buylist_csv if job.format == 'csv' else stream_buylist_ndjson
+                for chunk in stream(_track_progress(job, buylist_export_values(queryset))):
+                    tmp.write(chunk.encode('utf-8'))
+            tmp.seek(0)
+            job.file.save(f"depo_{job.depo_id}_buylist_{job.id}.{job.format}", File(tmp), save=False)
+
+        job.status = 'done'
+        job.rows_done = job.rows_total
+    except Exception:
+        job.status = 'failed'
+        job.error = traceback.format_exc()
+    job.finished_at = timezone.now()
+    job.save(update_fields=['file', 'status', 'rows_done', 'error', 'finished_at'])
+    return job
@@ -0,0 +1,378 @@
+# app/invoice_scan.py
+# Groq Vision ile fatura okuma — view'lardan (senkron, job, ...) ortak kullanılır
+
+import json
+import math
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from rest_framework import status
+from .scan_cache import image_digest, get_cached_lines, set_cached_lines
+from .scan_preprocess import prepare_image, build_data_url, pdf_page_count, render_pdf_page
+from .vision import VisionNotConfigured, VisionUnavailable, get_vision_client
+
+ALLOWED_IMAGE_TYPES = ["image/jpeg", "image/png", "image/webp", "image/gif"]
+PDF_TYPE = "application/pdf"
+
+# Bir istekte en fazla kaç sayfa (resim + PDF sayfaları toplamı)
+SCAN_MAX_PAGES = getattr(settings, 'SCAN_MAX_PAGES', 10)
+# Süreç genelinde aynı anda vision'a giden sayfa sayısı — tüm istekler paylaşır
+SCAN_PAGE_CONCURRENCY = getattr(settings, 'SCAN_PAGE_CONCURRENCY', 4)
+
+_page_executor = ThreadPoolExecutor(max_workers=SCAN_PAGE_CONCURRENCY, thread_name_prefix='scan-page')
+
+SCAN_PROMPT = (
+    "Bu fatura yoki chek resmini analiz qil.\n"
+    "Rasm o'zbek, rus yoki ingliz tilida bo'lishi mumkin — barchasi ishlaydi.\n"
+    "Barcha mahsulot nomlarini o'zbek lotin alifbosiga o'girib yoz.\n\n"
+    "MUHIM QOIDALAR:\n"
+    "- Agar mahsulotning narxi ko'rsatilmagan bo'lsa, 'birim_fiyat' ni 0 qilib yoz — mahsulotni o'tkazib yuborme.\n"
+    "- Agar miqdor ko'rsatilmagan bo'lsa, 'adet' ni 1 qilib yoz.\n"
+    "- Agar birlik ko'rsatilmagan bo'lsa, 'birlik' ni 'dona' qilib yoz.\n"
+    "- Faqat sof JSON qaytadir, boshqa hech narsa yozma.\n\n"
+    "Aynan shu formatda qaytadir:\n"
+    '{"urunler": [{"ad": "Mahsulot nomi", "adet": 2, "birlik": "dona", "birim_fiyat": 15000.0}]}'
+)
+
+
+class ScanError(Exception):
+    """Frontend'e {"detail": ...} olarak dönen tarama hatası."""
+
+    def __init__(self, detail, status_code=status.HTTP_500_INTERNAL_SERVER_ERROR):
+        super().__init__(detail)
+        self.detail = detail
+        self.status_code = status_code
+
+
+def validate_image(image_file):
+    if not image_file:
+        raise ScanError("Iltimos 'image' maydonida rasm yuboring.", status.HTTP_400_BAD_REQUEST)
+    if image_file.content_type not in ALLOWED_IMAGE_TYPES + [PDF_TYPE]:
+        raise ScanError("Faqat JPG, PNG, WEBP yoki PDF yuklay olasiz.", status.HTTP_400_BAD_REQUEST)
+
+
+def get_scan_files(request):
+    # 'images' (bir nechta) + eski 'image' maydoni birga qabul qilinadi
+    files = request.FILES.getlist("images") + request.FILES.getlist("image")
+    if not files:
+        validate_image(None)
+    for image_file in files:
+        validate_image(image_file)
+    return files
+
+
+NUMBER_RE = re.compile(r"\d+(?:[.,]\d+)?")
+DIGIT_GROUP_RE = re.compile(r"(?<=\d)[\s']+(?=\d)")
+
+
+def parse_number(value, default):
+    """
+    Modelin yazdığı sayı: 2, "2.5", "2 ta", "~3", "1,5 kg". İlk sayı alınır;
+    hiç sayı yoksa default. İkinci değer: temiz sayı değilse True (warn).
+    """
+    if value is None or value == "":
+        return default, False
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        pass
+    else:
+        return (number, False) if math.isfinite(number) else (default, True)
+    # "15 000" gibi binlik boşlukları sayıyı bölmesin
+    match = NUMBER_RE.search(DIGIT_GROUP_RE.sub("", str(value)))
+    if not match:
+        return default, True
+    return float(match.group().replace(",", ".")), True
+
+
+def format_line(index, u):
+    # Narxi 0 bo'lsa ham qo'shiladi, faqat warn=True bilan belgilanadi
+    adet, adet_unclear   = parse_number(u.get("adet"), 1)          # None bo'lsa 1
+    fiyat, fiyat_unclear = parse_number(u.get("birim_fiyat"), 0)   # None bo'lsa 0
+    adet = adet or 1                                                # 0 bo'lsa 1
+    return {
+        "id":     index,
+        "desc":   u.get("ad", "Noma'lum"),
+        "qty":    adet,
+        "price":  str(fiyat),
+        "cur":    "UZS",
+        "birlik": u.get("birlik", "dona") or "dona",
+        "warn":   fiyat == 0 or adet_unclear or fiyat_unclear,   # Narxi yo'q / sayı belirsizse sariq belgi
+    }
+
+
+class ScanPage:
+    """Bir sayfa: cache'ten gelen satırlar ya da modele gidecek küçültülmüş resim."""
+
+    def __init__(self, number, digest):
+        self.number = number
+        self.digest = digest
+        self.image_bytes = None
+        self.media_type = None
+        self.lines = None
+        self.error = None
+
+
+def load_pages(files):
+    """
+    Resimleri ve PDF sayfalarını sırayla ScanPage'e açar. Cache'te olan sayfa
+    küçültülmez/çizilmez. PDF çizimi bu thread'de yapılır (pdfium thread-safe değil).
+    """
+    pages = []
+
+    def add_page(digest, prepare):
+        if len(pages) >= SCAN_MAX_PAGES:
+            raise ScanError(f"Bir so'rovda ko'pi bilan {SCAN_MAX_PAGES} sahifa yuklash mumkin.", status.HTTP_400_BAD_REQUEST)
+        page = ScanPage(len(pages) + 1, digest)
+        page.lines = get_cached_lines(digest)
+        if page.lines is None:
+            page.image_bytes, page.media_type = prepare()
+        pages.append(page)
+
+    for image_file in files:
+        digest = image_digest(image_file)
+        if image_file.content_type != PDF_TYPE:
+            add_page(digest, lambda: prepare_image(image_file))
+            continue
+
+        document, count = pdf_page_count(image_file)
+        try:
+            if len(pages) + count > SCAN_MAX_PAGES:
+                raise ScanError(f"Bir so'rovda ko'pi bilan {SCAN_MAX_PAGES} sahifa yuklash mumkin.", status.HTTP_400_BAD_REQUEST)
+            for index in range(count):
+                add_page(f"{digest}:{index}", lambda: render_pdf_page(document, index))
+        finally:
+            document.close()
+
+    return pages
+
+
+def scan_pages(pages):
+    """
+    Cache'te olmayan sayfaları aynı anda vision'a gönderir (SCAN_PAGE_CONCURRENCY ile
+    sınırlı), sonuçları merge_pages ile birleştirir. Süre ≈ en yavaş sayfa.
+    """
+    futures = [
+        (page, _page_executor.submit(call_vision_model, page.image_bytes, page.media_type))
+        for page in pages if page.lines is None
+    ]
+    for page, future in futures:
+        try:
+            page.lines = future.result()
+        except ScanError as e:
+            page.error = e
+        else:
+            set_cached_lines(page.digest, page.lines)
+        page.image_bytes = None
+    return merge_pages(pages)
+
+
+def merge_pages(pages):
+    """
+    Sayfa sırasıyla tek liste; id'ler 1..N sıralı (sayfa sırası sabit olduğu için
+    aynı yükleme hep aynı id'leri alır), her satırda 'page' numarası.
+    Hiç satır çıkmazsa ilk sayfa hatası (tek sayfada eski davranış) fırlatılır.
+    """
+    lines = []
+    for page in pages:
+        for line in page.lines or []:
+            lines.append(dict(line, id=len(lines) + 1, page=page.number))
+
+    failed = [page for page in pages if page.error]
+    if not lines:
+        if failed:
+            raise failed[0].error
+        raise ScanError("Rasmdan mahsulot topib bo'lmadi. Aniqroq rasm yuklang.", status.HTTP_400_BAD_REQUEST)
+
+    result = {"lines": lines, "item_count": len(lines), "page_count": len(pages)}
+    if failed:
+        result["page_errors"] = [{"page": page.number, "detail": page.error.detail} for page in failed]
+    return result
+
+
+def scan_invoice(files):
+    """
+    Yüklenen resim(ler)i / PDF'i küçültüp Groq Vision'a gönderir, frontend formatındaki
+    birleşik sonucu döndürür. Aynı sayfa daha önce okunduysa cache'ten döner.
+    Hata durumunda ScanError.
+    """
+    return scan_pages(load_pages(files))
+
+
+def scan_messages(image_bytes, media_type):
+    # Resmi base64'e çevir — server'da hiç fayl saqlanmaydi
+    return [
+        {
+            "role": "user",
+            "content": [
+                {
+                    "type": "image_url",
+                    "image_url": {
+                        "url": build_data_url(image_bytes, media_type)
+                    }
+                },
+                {
+                    "type": "text",
+                    "text": SCAN_PROMPT,
+                }
+            ]
+        }
+    ]
+
+
+def not_configured_error():
+    return ScanError("AI skanerlash serverda sozlanmagan (GROQ_API_KEY).", status.HTTP_503_SERVICE_UNAVAILABLE)
+
+
+def call_vision_model(image_bytes, media_type):
+    # Groq Vision — direkt resmi ko'radi
+    try:
+        json_str = get_vision_client().complete(
+            scan_messages(image_bytes, media_type),
+            response_format={"type": "json_object"},
+            max_tokens=2048,
+        )
+        data = json.loads(json_str)
+
+    except json.JSONDecodeError:
+        raise ScanError("AI javobi JSON formatida emas.")
+    except VisionNotConfigured:
+        raise not_configured_error()
+    except VisionUnavailable:
+        raise ScanError(
+            "AI xizmati vaqtincha ishlamayapti. Birozdan keyin qayta urinib ko'ring.",
+            status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+    except Exception as e:
+        raise ScanError(f"AI xatosi: {str(e)}")
+
+    # Frontend uchun formatlash
+    urunler = data.get("urunler", [])
+    lines = [format_line(i + 1, u) for i, u in enumerate(urunler)]
+
+    if not lines:
+        raise ScanError("Rasmdan mahsulot topib bo'lmadi. Aniqroq rasm yuklang.", status.HTTP_400_BAD_REQUEST)
+
+    return lines
+
+
+class UrunlerStreamParser:
+    """
+    Model çıktısını parça parça okur; "urunler" dizisindeki her obje kapandığı anda
+    dict olarak döndürür. String içindeki { } ve kaçış karakterleri sayılmaz.
+    Dizinin öncesindeki metin (```json gibi) yok sayılır.
+    """
+
+    def __init__(self):
+        self._head = ''
+        self._in_array = False
+        self._done = False
+        self._obj = []
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+
+    def feed(self, text):
+        items = []
+        for ch in text:
+            if self._done:
+                break
+            if not self._in_array:
+                self._head += ch
+                if ch == '[' and '"urunler"' in self._head:
+                    self._in_array = True
+                continue
+            if self._depth == 0:
+                if ch == '{':
+                    self._depth = 1
+                    self._obj = [ch]
+                elif ch == ']':
+                    self._done = True
+                continue
+
+            self._obj.append(ch)
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == '\\':
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch == '{':
+                self._depth += 1
+            elif ch == '}':
+                self._depth -= 1
+                if self._depth == 0:
+                    try:
+                        items.append(json.loads(''.join(self._obj)))
+                    except json.JSONDecodeError:
+                        pass   # bozuk tek obje — kalanlar yine gelsin
+        return items
+
+
+def stream_vision_model(image_bytes, media_type):
+    # call_vision_model'in stream hali — her urun objesi tamamlanınca yield.
+    # Groq JSON mode stream desteklemiyor; format prompt ile sağlanıyor.
+    parser = UrunlerStreamParser()
+    try:
+        for text in get_vision_client().stream(scan_messages(image_bytes, media_type), max_tokens=2048):
+            yield from parser.feed(text)
+    except VisionNotConfigured:
+        raise not_configured_error()
+    except VisionUnavailable:
+        raise ScanError(
+            "AI xizmati vaqtincha ishlamayapti. Birozdan keyin qayta urinib ko'ring.",
+            status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+    except ScanError:
+        raise
+    except Exception as e:
+        raise ScanError(f"AI xatosi: {str(e)}")
+
+
+def _page_lines(page):
+    if page.lines is not None:
+        yield from page.lines
+        return
+    lines = []
+    for u in stream_vision_model(page.image_bytes, page.media_type):
+        line = format_line(len(lines) + 1, u)
+        lines.append(line)
+        yield line
+    if lines:
+        set_cached_lines(page.digest, lines)
+    page.lines = lines
+
+
+def stream_scan(pages):
+    """
+    Sayfaları sırayla stream eder; her satır hazır olunca event (dict) yield eder:
+      {"type": "line", "line": {...}}   — id'ler sayfalar boyunca 1..N
+      {"type": "done", "item_count": N, "page_count": P[, "page_errors": [...]]}
+      {"type": "error", "detail": ..., "status": ...}   — hiç satır çıkmadıysa
+    """
+    count = 0
+    errors = []
+    for page in pages:
+        try:
+            for line in _page_lines(page):
+                count += 1
+                yield {"type": "line", "line": dict(line, id=count, page=page.number)}
+        except ScanError as e:
+            errors.append((page.number, e))
+        page.image_bytes = None
+
+    if not count:
+        error = errors[0][1] if errors else ScanError(
+            "Rasmdan mahsulot topib bo'lmadi. Aniqroq rasm yuklang.", status.HTTP_400_BAD_REQUEST
+        )
+        yield {"type": "error", "detail": error.detail, "status": error.status_code}
+        return
+
+    done = {"type": "done", "item_count": count, "page_count": len(pages)}
+    if errors:
+        done["page_errors"] = [{"page": number, "detail": e.detail} for number, e in errors]
+    yield done
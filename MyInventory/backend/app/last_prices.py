@@ -0,0 +1,140 @@
+# app/last_prices.py
+# LastPrice — (company, item, unit, money_type) başına en son alış fiyatı
+from django.db import transaction
+from .models import BuyList, LastPrice
+
+KEY_FIELDS = ['company', 'item', 'unit', 'money_type']
+# Bundan fazla anahtar etkilendiyse (depo silme gibi) anahtar başına sorgu yerine toplu rebuild
+REFRESH_KEYS_MAX = 20
+
+
+def _last_price(row):
+    return LastPrice(
+        company_id=row.company_id, item_id=row.item_id, unit_id=row.item_unit_id,
+        money_type_id=row.money_type_id, price=row.item_price, bought_at=row.created_at,
+    )
+
+
+def record_last_prices(buylist_rows):
+    """
+    Yeni eklenen satırlar her zaman en yenisidir — anahtar başına tek upsert.
+    Aynı anahtar listede birden fazla varsa sonuncusu kalır.
+    """
+    latest = {}
+    for row in buylist_rows:
+        latest[row.price_key()] = row
+    if not latest:
+        return
+    LastPrice.objects.bulk_create(
+        [_last_price(row) for row in latest.values()],
+        update_conflicts=True,
+        unique_fields=KEY_FIELDS,
+        update_fields=['price', 'bought_at'],
+    )
+
+
+def refresh_last_price(company_id, item_id, unit_id, money_type_id):
+    """Satır güncellenince/silinince anahtarın son fiyatını BuyList'ten yeniden bul (index'li tek sorgu)."""
+    row = BuyList.objects.filter(
+        company_id=company_id, item_id=item_id, item_unit_id=unit_id, money_type_id=money_type_id,
+    ).order_by('-created_at', '-id').first()
+    if row is None:
+        LastPrice.objects.filter(
+            company_id=company_id, item_id=item_id, unit_id=unit_id, money_type_id=money_type_id,
+        ).delete()
+    else:
+        record_last_prices([row])
+
+
+def refresh_last_prices(keys):
+    """Toplu silmeden sonra: az anahtar varsa tek tek, çoksa company başına item'larla rebuild."""
+    keys = set(keys)
+    if len(keys) <= REFRESH_KEYS_MAX:
+        for key in keys:
+            refresh_last_price(*key)
+        return
+    items_by_company = {}
+    for company_id, item_id, _, _ in keys:
+        items_by_company.setdefault(company_id, set()).add(item_id)
+    for company_id, item_ids in items_by_company.items():
+        rebuild_last_prices(company_id, item_ids)
+
+
+def rebuild_last_prices(company_id=None, item_ids=None):
+    """LastPrice'ı BuyList'ten baştan hesapla. Döndürür: yazılan satır sayısı."""
+    buylist = BuyList.objects.all()
+    prices = LastPrice.objects.all()
+    if company_id is not None:
+        buylist = buylist.filter(company_id=company_id)
+        prices = prices.filter(company_id=company_id)
+    if item_ids is not None:
+        buylist = buylist.filter(item_id__in=item_ids)
+        prices = prices.filter(item_id__in=item_ids)
+
+    # Artan sırada gez — her anahtarda en son görülen satır kalır
+    latest = {}
+    rows = buylist.order_by('created_at', 'id').values_list(
+        'company_id', 'item_id', 'item_unit_id', 'money_type_id', 'item_price', 'created_at',
+    )
+    for company, item, unit, money_type, price, created_at in rows.iterator(chunk_size=2000):
+        latest[(company, item, unit, money_type)] = (price, created_at)
+
+    with transaction.atomic():
+        prices.delete()
+        objs = LastPrice.objects.bulk_create(
+            [
+                LastPrice(company_id=company, item_id=item, unit_id=unit, money_type_id=money_type,
+                          price=price, bought_at=created_at)
+                for (company, item, unit, money_type), (price, created_at) in latest.items()
+            ],
+            batch_size=1000,
+        )
+    return len(objs)
+
+
+def last_prices_for_items(company_id, item_ids):
+    """item_id → [LastPrice, ...] (en yeni önce); tüm satırlar için tek sorgu."""
+    by_item = {}
+    queryset = LastPrice.objects.filter(company_id=company_id, item_id__in=set(item_ids)).order_by('-bought_at')
+    for price in queryset:
+        by_item.setdefault(price.item_id, []).append(price)
+    return by_item
+
+
+def prefill_prices(company_id, lines):
+    """
+    Fiyatı olmayan (warn) ve katalogda Item'ı eşleşen satırlara son alış fiyatını yazar.
+    Fiyat sadece birim ve para birimi de eşleşip LastPrice anahtarıyla aynıysa yazılır;
+    biri eşleşmediyse en yeni fiyat yalnızca "last_price" ipucu olarak döner.
+    match_lines'tan sonra çağrılmalı. Satır "warn" olarak kalır — kullanıcı kontrol etsin.
+    """
+    wanted = [
+        line for line in lines
+        if line.get("warn") and (line.get("match") or {}).get("item")
+    ]
+    if company_id is None or not wanted:
+        return lines
+
+    by_item = last_prices_for_items(company_id, [line["match"]["item"]["id"] for line in wanted])
+    for line in wanted:
+        match = line["match"]
+        unit_id = (match.get("unit") or {}).get("id")
+        money_type_id = (match.get("money_type") or {}).get("id")
+        candidates = by_item.get(match["item"]["id"], ())
+        if unit_id is None or money_type_id is None:
+            # Başka birim/para biriminin fiyatı satıra yazılmaz
+            price = candidates[0] if candidates else None
+        else:
+            price = next((p for p in candidates
+                          if (p.unit_id, p.money_type_id) == (unit_id, money_type_id)), None)
+            if price is not None:
+                line["price"] = str(price.price)
+                line["price_source"] = "last_price"
+        if price is not None:
+            line["last_price"] = {
+                "price": price.price,
+                "unit_id": price.unit_id,
+                "money_type_id": price.money_type_id,
+                "bought_at": price.bought_at.isoformat(),
+            }
+    return lines
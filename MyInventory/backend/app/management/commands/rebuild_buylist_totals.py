@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from app.totals import rebuild_totals
+
+
+class Command(BaseCommand):
+    help = "BuyListTotal özet tablosunu BuyList'ten yeniden hesaplar."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--company', type=int, help="Sadece bu company id için")
+
+    def handle(self, *args, **options):
+        count = rebuild_totals(options.get('company'))
+        self.stdout.write(self.style.SUCCESS(f"{count} BuyListTotal satırı yazıldı."))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from app.last_prices import rebuild_last_prices
+
+
+class Command(BaseCommand):
+    help = "LastPrice (son alış fiyatı) tablosunu BuyList'ten yeniden hesaplar."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--company', type=int, help="Sadece bu company id için")
+
+    def handle(self, *args, **options):
+        count = rebuild_last_prices(options.get('company'))
+        self.stdout.write(self.style.SUCCESS(f"{count} LastPrice satırı yazıldı."))
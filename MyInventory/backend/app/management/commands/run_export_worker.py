@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from app.export_jobs import claim_next_job, reclaim_stale_jobs, run_export_job
+
+
+class Command(BaseCommand):
+    help = "Kuyruktaki export işlerini (ExportJob) işleyen worker süreci."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Kuyruk boşalınca çık")
+        parser.add_argument('--sleep', type=float, default=2.0, help="Kuyruk boşken bekleme (saniye)")
+        parser.add_argument('--stale-minutes', type=int, default=60,
+                            help="Bu süreden uzun 'running' kalan işler (çöken worker) failed sayılır")
+        parser.add_argument('--reclaim-every', type=float, default=60.0,
+                            help="Yarım kalmış işleri kontrol etme aralığı (saniye)")
+
+    def handle(self, *args, **options):
+        # Başka bir worker çökmüş olabilir — sadece başlangıçta değil, düzenli aralıkla
+        next_reclaim = 0
+        while True:
+            close_old_connections()
+            if time.monotonic() >= next_reclaim:
+                expired = reclaim_stale_jobs(options['stale_minutes'])
+                if expired:
+                    self.stdout.write(f"{expired} yarım kalmış iş failed olarak işaretlendi.")
+                next_reclaim = time.monotonic() + options['reclaim_every']
+
+            job = claim_next_job()
+            if job is None:
+                if options['once']:
+                    return
+                time.sleep(options['sleep'])
+                continue
+
+            job = run_export_job(job)
+            self.stdout.write(f"Export {job.id}: {job.status} ({job.rows_done} satır)")
@@ -0,0 +1,133 @@
+# app/matcher.py
+# Taranan satır adlarını (desc / birlik / cur) şirketin mevcut Item / Unit /
+# MoneyType kayıtlarıyla eşleştirir — satır başına sorgu yok.
+# Şirket başına trigram index bir kez kurulur, süreçte tutulur; Item/Unit/MoneyType
+# yazılınca signals.py versiyonu artırır. Versiyon default cache'te (paylaşımlı
+# cache varsa tüm worker'lar görür), yine de MATCHER_INDEX_TTL sonunda yeniden kurulur.
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Item, Unit, MoneyType
+
+MATCHER_MIN_SCORE = getattr(settings, 'MATCHER_MIN_SCORE', 0.45)
+MATCHER_INDEX_TTL = getattr(settings, 'MATCHER_INDEX_TTL', 300)
+VERSION_KEY = 'catalog-version:{}'
+
+_WORD = re.compile(r"[^\w]+")
+_lock = threading.Lock()
+_indexes = {}   # company_id → (version, built_at, CompanyCatalog)
+
+
+def normalize(name):
+    # "Un (1-nav)" → "un 1 nav"; o'/g' apostrofları da ayırıcı sayılır
+    return " ".join(_WORD.sub(" ", (name or "").casefold()).split())
+
+
+def trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TrigramIndex:
+    """(id, ad) listesi üzerinde trigram posting list'leri; skor = Dice katsayısı."""
+
+    def __init__(self, rows):
+        self.ids = []
+        self.names = []
+        self.sizes = []
+        self.exact = {}
+        self.postings = defaultdict(list)
+        for pk, name in rows:
+            key = normalize(name)
+            if not key:
+                continue
+            position = len(self.ids)
+            grams = trigrams(key)
+            self.ids.append(pk)
+            self.names.append(name)
+            self.sizes.append(len(grams))
+            self.exact.setdefault(key, position)
+            for gram in grams:
+                self.postings[gram].append(position)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def best(self, name):
+        """En iyi eşleşme {"id", "name", "score"} ya da None."""
+        key = normalize(name)
+        if not key:
+            return None
+        position = self.exact.get(key)
+        if position is not None:
+            return self._result(position, 1.0)
+
+        grams = trigrams(key)
+        shared = Counter()
+        for gram in grams:
+            # Counter.update(list) sayımı C tarafında yapar
+            shared.update(self.postings.get(gram, ()))
+        if not shared:
+            return None
+
+        size = len(grams)
+        sizes = self.sizes
+        best_position = max(shared, key=lambda position: shared[position] / (size + sizes[position]))
+        best_score = 2.0 * shared[best_position] / (size + sizes[best_position])
+        if best_score < MATCHER_MIN_SCORE:
+            return None
+        return self._result(best_position, round(best_score, 3))
+
+    def _result(self, position, score):
+        return {"id": self.ids[position], "name": self.names[position], "score": score}
+
+
+class CompanyCatalog:
+
+    def __init__(self, company_id):
+        self.items = TrigramIndex(Item.objects.filter(company_id=company_id).values_list('id', 'name'))
+        self.units = TrigramIndex(Unit.objects.filter(company_id=company_id).values_list('id', 'unit'))
+        self.money_types = TrigramIndex(MoneyType.objects.filter(company_id=company_id).values_list('id', 'type'))
+
+    def match(self, line):
+        return {
+            "item": self.items.best(line.get("desc")),
+            "unit": self.units.best(line.get("birlik")),
+            "money_type": self.money_types.best(line.get("cur")),
+        }
+
+
+def invalidate_catalog(company_id):
+    try:
+        cache.incr(VERSION_KEY.format(company_id))
+    except ValueError:
+        cache.set(VERSION_KEY.format(company_id), 1, None)
+
+
+def get_catalog(company_id):
+    version = cache.get(VERSION_KEY.format(company_id), 0)
+    entry = _indexes.get(company_id)
+    if entry and entry[0] == version and time.monotonic() - entry[1] < MATCHER_INDEX_TTL:
+        return entry[2]
+    with _lock:
+        entry = _indexes.get(company_id)
+        if entry and entry[0] == version and time.monotonic() - entry[1] < MATCHER_INDEX_TTL:
+            return entry[2]
+        catalog = CompanyCatalog(company_id)
+        _indexes[company_id] = (version, time.monotonic(), catalog)
+        return catalog
+
+
+def match_lines(company_id, lines):
+    """Her satıra "match": {"item", "unit", "money_type"} ekler (yerinde). Döndürür: lines."""
+    if company_id is None:
+        return lines
+    catalog = get_catalog(company_id)
+    for line in lines:
+        line["match"] = catalog.match(line)
+    return lines
@@ -0,0 +1,66 @@
+# Generated by Django 5.2.11 on 2026-10-18 11:18
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('user_app', '0003_alter_message_text'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Depo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=999)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='depolar', to='user_app.company')),
+                ('created_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Item',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=999)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='user_app.company')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='MoneyType',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('type', models.CharField(max_length=50)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='moneytypes', to='user_app.company')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Unit',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('unit', models.CharField(max_length=999)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='units', to='user_app.company')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='BuyList',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('item_count', models.FloatField()),
+                ('item_price', models.FloatField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='buylist', to='user_app.company')),
+                ('depo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='buylist', to='app.depo')),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='app.item')),
+                ('money_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='app.moneytype')),
+                ('item_unit', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='app.unit')),
+            ],
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.11 on 2026-10-18 11:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0001_initial'),
+        ('user_app', '0003_alter_message_text'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='buylist',
+            index=models.Index(fields=['company', 'depo', 'created_at'], name='buylist_company_depo_created'),
+        ),
+        migrations.AddIndex(
+            model_name='buylist',
+            index=models.Index(fields=['company', 'item', 'created_at'], name='buylist_company_item_created'),
+        ),
+        migrations.AddIndex(
+            model_name='buylist',
+            index=models.Index(fields=['company', 'created_at', 'id'], name='buylist_company_created_id'),
+        ),
+    ]
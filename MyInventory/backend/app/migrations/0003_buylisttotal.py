@@ -0,0 +1,41 @@
+# Generated by Django 5.2.11 on 2026-10-18 11:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, F, FloatField, Sum, ExpressionWrapper
+
+
+def build_totals(apps, schema_editor):
+    BuyList = apps.get_model('app', 'BuyList')
+    BuyListTotal = apps.get_model('app', 'BuyListTotal')
+    rows = BuyList.objects.values('company_id', 'depo_id', 'money_type_id').annotate(
+        total=Sum(ExpressionWrapper(F('item_count') * F('item_price'), output_field=FloatField())),
+        row_count=Count('id'),
+    ).order_by()
+    BuyListTotal.objects.bulk_create([BuyListTotal(**row) for row in rows], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0002_buylist_indexes'),
+        ('user_app', '0003_alter_message_text'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BuyListTotal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total', models.FloatField(default=0)),
+                ('row_count', models.PositiveIntegerField(default=0)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='buylist_totals', to='user_app.company')),
+                ('depo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='totals', to='app.depo')),
+                ('money_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='buylist_totals', to='app.moneytype')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('company', 'depo', 'money_type'), name='buylist_total_key')],
+            },
+        ),
+        migrations.RunPython(build_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.11 on 2026-10-18 11:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def build_last_prices(apps, schema_editor):
+    BuyList = apps.get_model('app', 'BuyList')
+    LastPrice = apps.get_model('app', 'LastPrice')
+    latest = {}
+    rows = BuyList.objects.order_by('created_at', 'id').values_list(
+        'company_id', 'item_id', 'item_unit_id', 'money_type_id', 'item_price', 'created_at',
+    )
+    for company, item, unit, money_type, price, created_at in rows.iterator(chunk_size=2000):
+        latest[(company, item, unit, money_type)] = (price, created_at)
+    LastPrice.objects.bulk_create(
+        [
+            LastPrice(company_id=company, item_id=item, unit_id=unit, money_type_id=money_type,
+                      price=price, bought_at=created_at)
+            for (company, item, unit, money_type), (price, created_at) in latest.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0005_scanjob'),
+        ('user_app', '0003_alter_message_text'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LastPrice',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('price', models.FloatField()),
+                ('bought_at', models.DateTimeField()),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='last_prices', to='user_app.company')),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='last_prices', to='app.item')),
+                ('money_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='last_prices', to='app.moneytype')),
+                ('unit', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='last_prices', to='app.unit')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('company', 'item', 'unit', 'money_type'), name='lastprice_key')],
+            },
+        ),
+        migrations.RunPython(build_last_prices, migrations.RunPython.noop),
+    ]
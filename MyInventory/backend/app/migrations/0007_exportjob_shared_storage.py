@@ -0,0 +1,31 @@
+# Generated by Django 5.2.11 on 2026-10-18 12:18
+
+import app.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0006_lastprice'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='exportjob',
+            name='file',
+            field=models.FileField(blank=True, null=True, storage=app.storage.export_storage, upload_to='exports/'),
+        ),
+        migrations.CreateModel(
+            name='StoredFileChunk',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255)),
+                ('index', models.PositiveIntegerField()),
+                ('data', models.BinaryField()),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('name', 'index'), name='storedfilechunk_name_index')],
+            },
+        ),
+    ]
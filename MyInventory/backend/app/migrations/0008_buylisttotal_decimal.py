@@ -0,0 +1,42 @@
+# Generated by Django 5.2.11 on 2026-10-18 12:20
+
+from decimal import Decimal
+
+from django.db import migrations, models
+
+
+def recompute_totals(apps, schema_editor):
+    # Float toplamlarının biriken hatası silinsin — app.totals.row_amount ile aynı hesap
+    BuyList = apps.get_model('app', 'BuyList')
+    BuyListTotal = apps.get_model('app', 'BuyListTotal')
+    totals = {}
+    rows = BuyList.objects.order_by().values_list('company_id', 'depo_id', 'money_type_id', 'item_count', 'item_price')
+    for company_id, depo_id, money_type_id, count, price in rows.iterator(chunk_size=2000):
+        amount = (Decimal(str(count)) * Decimal(str(price))).quantize(Decimal('0.000001'))
+        key = (company_id, depo_id, money_type_id)
+        total, n = totals.get(key, (0, 0))
+        totals[key] = (total + amount, n + 1)
+    BuyListTotal.objects.all().delete()
+    BuyListTotal.objects.bulk_create(
+        [
+            BuyListTotal(company_id=company, depo_id=depo, money_type_id=money_type, total=total, row_count=n)
+            for (company, depo, money_type), (total, n) in totals.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0007_exportjob_shared_storage'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='buylisttotal',
+            name='total',
+            field=models.DecimalField(decimal_places=6, default=0, max_digits=24),
+        ),
+        migrations.RunPython(recompute_totals, migrations.RunPython.noop),
+    ]
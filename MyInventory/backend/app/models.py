@@ -1,6 +1,8 @@
-from django.db import models
+from django.db import models, transaction
 from user_app.models import Company, CustomUser
+from .storage import export_storage
 import datetime
+import uuid
 
 class Depo(models.Model):
     name = models.CharField(max_length=999)
@@ -32,7 +34,23 @@ class Unit(models.Model):
     def __str__(self):
         return f"{self.unit} ({self.company.name})"
 
+class BuyListQuerySet(models.QuerySet):
+
+    def delete(self):
+        # BuyList'te satır başına post_delete yok (cascade'de Django tek DELETE atabilsin);
+        # etkilenen BuyListTotal/LastPrice satırları silmeden sonra toplu güncellenir
+        from .totals import apply_deletion, collect_deletion
+
+        with transaction.atomic(using=self.db):
+            collected = collect_deletion(self)
+            result = super().delete()
+            apply_deletion(collected)
+        return result
+
+
 class BuyList(models.Model):
+    TRACKED_FIELDS = ('company_id', 'depo_id', 'money_type_id', 'item_id', 'item_unit_id', 'item_count', 'item_price')
+
     company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='buylist')
     item = models.ForeignKey(Item, on_delete=models.CASCADE)
     item_count = models.FloatField()
@@ -42,5 +60,161 @@ class BuyList(models.Model):
     depo = models.ForeignKey(Depo, on_delete=models.CASCADE, related_name='buylist')
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = BuyListQuerySet.as_manager()
+
+    class Meta:
+        # Tüm sorgular company ile filtrelenir, sonra depo/item ve created_at
+        indexes = [
+            models.Index(fields=['company', 'depo', 'created_at'], name='buylist_company_depo_created'),
+            models.Index(fields=['company', 'item', 'created_at'], name='buylist_company_item_created'),
+            models.Index(fields=['company', 'created_at', 'id'], name='buylist_company_created_id'),
+        ]
+
     def __str__(self):
         return f"{self.item.name} x{self.item_count} ({self.company.name})"
+
+    def total_key(self):
+        return (self.company_id, self.depo_id, self.money_type_id)
+
+    def price_key(self):
+        return (self.company_id, self.item_id, self.item_unit_id, self.money_type_id)
+
+    def save(self, *args, **kwargs):
+        # post_save (BuyListTotal/LastPrice) aynı transaction içinde çalışsın. Güncellemede eski
+        # değerler kilitli satırdan okunur: aynı satırı eşzamanlı düzenleyen ikinci istek
+        # birincinin commit'ini bekler, delta'yı bayat değere göre değil güncel değere göre hesaplar
+        with transaction.atomic():
+            self._previous = None
+            if not self._state.adding and self.pk is not None:
+                self._previous = BuyList.objects.select_for_update().filter(pk=self.pk).values(
+                    *self.TRACKED_FIELDS
+                ).first()
+            super().save(*args, **kwargs)
+
+    def delete(self, using=None, keep_parents=False):
+        # BuyListQuerySet.delete üzerinden — özet/LastPrice güncellemesi tek yerde
+        result = BuyList.objects.using(using or self._state.db).filter(pk=self.pk).delete()
+        self.pk = None
+        return result
+
+
+class BuyListTotal(models.Model):
+    # BuyList'ten artımlı tutulan özet: total_price her seferinde tüm tabloyu SUM'lamasın
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='buylist_totals')
+    depo = models.ForeignKey(Depo, on_delete=models.CASCADE, related_name='totals')
+    money_type = models.ForeignKey(MoneyType, on_delete=models.CASCADE, related_name='buylist_totals')
+    total = models.DecimalField(max_digits=24, decimal_places=6, default=0)
+    row_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['company', 'depo', 'money_type'], name='buylist_total_key'),
+        ]
+
+    def __str__(self):
+        return f"{self.depo.name} / {self.money_type.type}: {self.total}"
+
+
+class LastPrice(models.Model):
+    # (item, unit, money_type) için en son alış fiyatı — BuyList eklenirken güncellenir,
+    # taramada fiyatı olmayan satırları doldurmak için MAX(created_at) sorgusu gerekmez
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='last_prices')
+    item = models.ForeignKey(Item, on_delete=models.CASCADE, related_name='last_prices')
+    unit = models.ForeignKey(Unit, on_delete=models.CASCADE, related_name='last_prices')
+    money_type = models.ForeignKey(MoneyType, on_delete=models.CASCADE, related_name='last_prices')
+    price = models.FloatField()
+    bought_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['company', 'item', 'unit', 'money_type'], name='lastprice_key'),
+        ]
+
+    def __str__(self):
+        return f"{self.item_id}/{self.unit_id}: {self.price} ({self.money_type_id})"
+
+
+class ExportJob(models.Model):
+    # Arka planda (run_export_worker) üretilen export dosyaları
+    STATUS_CHOICES = (
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    )
+    FORMAT_CHOICES = (
+        ('xlsx', 'XLSX'),
+        ('csv', 'CSV'),
+        ('ndjson', 'NDJSON'),
+    )
+    ACTIVE_STATUSES = ('queued', 'running')
+
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='export_jobs')
+    depo = models.ForeignKey(Depo, on_delete=models.CASCADE, related_name='export_jobs')
+    created_by = models.ForeignKey(CustomUser, on_delete=models.SET_NULL, null=True, blank=True)
+    format = models.CharField(max_length=10, choices=FORMAT_CHOICES, default='xlsx')
+    filters = models.JSONField(default=dict, blank=True)
+    # Aynı company/depo/format/filtre için tek aktif iş — eşzamanlı istekler birleşir
+    dedupe_key = models.CharField(max_length=64)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    rows_done = models.PositiveIntegerField(default=0)
+    rows_total = models.PositiveIntegerField(null=True, blank=True)
+    # Worker ve web ayrı makinelerde olabilir — paylaşımlı storage (varsayılan: veritabanı)
+    file = models.FileField(upload_to='exports/', storage=export_storage, blank=True, null=True)
+    error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['dedupe_key'],
+                condition=models.Q(status__in=('queued', 'running')),
+                name='exportjob_active_key',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='exportjob_status_created'),
+        ]
+
+    def __str__(self):
+        return f"Export {self.id} ({self.depo_id}, {self.format}, {self.status})"
+
+
+class StoredFileChunk(models.Model):
+    # app.storage.DatabaseStorage: dosyanın index'inci 1 MB'lık parçası
+    name = models.CharField(max_length=255)
+    index = models.PositiveIntegerField()
+    data = models.BinaryField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['name', 'index'], name='storedfilechunk_name_index'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.index}"
+
+
+class ScanJob(models.Model):
+    # Asenkron fatura taraması — resim saklanmaz, sadece sonuç satırları
+    STATUS_CHOICES = (
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    )
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='scan_jobs', null=True, blank=True)
+    created_by = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='scan_jobs')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True, default='')
+    error_status = models.PositiveSmallIntegerField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Scan {self.id} ({self.status})"
@@ -0,0 +1,46 @@
+# app/scan_cache.py
+# Aynı resim (ağ hatası sonrası tekrar yükleme, aynı şablon) için vision modeline
+# tekrar gidilmesin: sonuç satırları resim byte'larının sha256'sı altında saklanır.
+# TTL ve en fazla kayıt sayısı settings.CACHES['scans'] ile ayarlanır.
+import hashlib
+import threading
+
+from django.core.cache import caches
+
+SCAN_CACHE_ALIAS = 'scans'
+KEY_PREFIX = 'invoice-scan:'
+
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0}
+
+
+def image_digest(image_file):
+    # Yüklenen dosyayı tamamen belleğe okumadan parça parça hash'le
+    digest = hashlib.sha256()
+    for chunk in image_file.chunks():
+        digest.update(chunk)
+    image_file.seek(0)
+    return digest.hexdigest()
+
+
+def get_cached_lines(digest):
+    lines = caches[SCAN_CACHE_ALIAS].get(KEY_PREFIX + digest)
+    with _lock:
+        _stats["hits" if lines is not None else "misses"] += 1
+    return lines
+
+
+def set_cached_lines(digest, lines):
+    caches[SCAN_CACHE_ALIAS].set(KEY_PREFIX + digest, lines)
+
+
+def scan_cache_stats():
+    # Süreç (gunicorn worker) başına sayaçlar
+    with _lock:
+        hits, misses = _stats["hits"], _stats["misses"]
+    total = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_ratio": round(hits / total, 4) if total else 0.0,
+    }
@@ -0,0 +1,95 @@
+# app/scan_jobs.py
+# Fatura taramasını request worker'ından ayıran yerel thread havuzu.
+# Durum ScanJob tablosunda tutulur; böylece hangi gunicorn worker'ı poll'a
+# cevap verirse versin sonucu görür. Limitler süreç başınadır.
+# Worker süreci ölür/yeniden başlarsa havuzdaki iş kaybolur: SCAN_JOB_TIMEOUT'u
+# geçen queued/running işler expire_stale_jobs ile 'failed' olur.
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from .models import ScanJob
+from .invoice_scan import ScanError, load_pages, merge_pages, scan_pages
+
+SCAN_WORKERS = getattr(settings, 'SCAN_WORKERS', 2)
+SCAN_MAX_QUEUE = getattr(settings, 'SCAN_MAX_QUEUE', 10)
+SCAN_JOB_TIMEOUT = getattr(settings, 'SCAN_JOB_TIMEOUT', 300)
+
+_executor = ThreadPoolExecutor(max_workers=SCAN_WORKERS, thread_name_prefix='scan')
+_lock = threading.Lock()
+_pending = 0
+
+
+class ScanQueueFull(Exception):
+    pass
+
+
+def _run(job_id, pages):
+    global _pending
+    try:
+        if not ScanJob.objects.filter(pk=job_id, status='queued').update(status='running'):
+            return   # kuyrukta beklerken süresi doldu
+        try:
+            # Cache load_pages'de zaten kontrol edildi; sadece eksik sayfalar modele gider
+            result = scan_pages(pages)
+        except ScanError as e:
+            ScanJob.objects.filter(pk=job_id).update(
+                status='failed', error=e.detail, error_status=e.status_code, finished_at=timezone.now(),
+            )
+        except Exception as e:
+            # Beklenmeyen hata da işi 'running'de bırakmasın
+            ScanJob.objects.filter(pk=job_id).update(
+                status='failed', error=f"Skan xatosi: {e}", error_status=500, finished_at=timezone.now(),
+            )
+        else:
+            ScanJob.objects.filter(pk=job_id).update(
+                status='done', result=result, finished_at=timezone.now(),
+            )
+    finally:
+        with _lock:
+            _pending -= 1
+        # Thread'e ait DB bağlantısı açık kalmasın
+        connection.close()
+
+
+def expire_stale_jobs(queryset=None):
+    """SCAN_JOB_TIMEOUT'tan eski, hâlâ bitmemiş işleri 'failed' yapar. Döndürür: sayı."""
+    queryset = ScanJob.objects.all() if queryset is None else queryset
+    return queryset.filter(
+        status__in=('queued', 'running'),
+        created_at__lt=timezone.now() - timedelta(seconds=SCAN_JOB_TIMEOUT),
+    ).update(
+        status='failed', error="Skan vaqti tugadi. Qayta urinib ko'ring.",
+        error_status=504, finished_at=timezone.now(),
+    )
+
+
+def submit_scan(user, files):
+    """ScanJob oluşturup havuza verir. Kuyruk doluysa ScanQueueFull."""
+    global _pending
+    with _lock:
+        if _pending >= SCAN_WORKERS + SCAN_MAX_QUEUE:
+            raise ScanQueueFull()
+        _pending += 1
+    submitted = False
+    try:
+        # Kuyrukta ham fotoğraf değil küçültülmüş sayfalar beklesin
+        pages = load_pages(files)
+        if all(page.lines is not None for page in pages):
+            # Bütün sayfalar daha önce okunduysa kuyruğa hiç girmeden biten iş döner
+            return ScanJob.objects.create(
+                company=user.company, created_by=user, status='done',
+                result=merge_pages(pages), finished_at=timezone.now(),
+            )
+        job = ScanJob.objects.create(company=user.company, created_by=user)
+        _executor.submit(_run, job.pk, pages)
+        submitted = True
+    finally:
+        if not submitted:
+            with _lock:
+                _pending -= 1
+    return job
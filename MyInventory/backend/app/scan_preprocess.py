@@ -0,0 +1,100 @@
+# app/scan_preprocess.py
+# Telefon fotoğrafları 8-12 MB — modele göndermeden önce döndür, küçült,
+# kompakt JPEG/WEBP olarak yeniden kodla. Model gecikmesi payload ile artıyor.
+import base64
+import io
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from PIL import Image, ImageOps
+from rest_framework import status
+
+MEDIA_TYPES = {'JPEG': 'image/jpeg', 'WEBP': 'image/webp'}
+
+
+def scan_image_format(value):
+    # Yanlış değer ilk taramada KeyError vermesin — açılışta (import) hata versin
+    fmt = str(value).upper()
+    if fmt not in MEDIA_TYPES:
+        raise ImproperlyConfigured(f"SCAN_IMAGE_FORMAT {', '.join(MEDIA_TYPES)} bo'lishi kerak, berilgan: {value!r}")
+    return fmt
+
+
+SCAN_IMAGE_MAX_SIDE = getattr(settings, 'SCAN_IMAGE_MAX_SIDE', 1600)
+SCAN_IMAGE_FORMAT = scan_image_format(getattr(settings, 'SCAN_IMAGE_FORMAT', 'JPEG'))
+SCAN_IMAGE_QUALITY = getattr(settings, 'SCAN_IMAGE_QUALITY', 80)
+SCAN_IMAGE_GRAYSCALE = getattr(settings, 'SCAN_IMAGE_GRAYSCALE', False)
+
+# base64 her 3 byte'ı 4 karaktere çevirir — 3'ün katı parçalar arada '=' üretmez
+B64_CHUNK = 3 * 64 * 1024
+
+
+def prepare_image(image_file):
+    """
+    Yüklenen dosyayı (veya file-like) okuyup küçültülmüş resmi döndürür.
+    Döndürür: (bytes, media_type)
+    """
+    from .invoice_scan import ScanError
+
+    try:
+        image = Image.open(image_file)
+        # JPEG'de decode sırasında 2'nin katlarıyla küçült — tam çözünürlüğü açmaz
+        image.draft('L' if SCAN_IMAGE_GRAYSCALE else 'RGB', (SCAN_IMAGE_MAX_SIDE, SCAN_IMAGE_MAX_SIDE))
+        image = ImageOps.exif_transpose(image)
+        return encode_image(image)
+    except (OSError, SyntaxError, ValueError, Image.DecompressionBombError):
+        raise ScanError("Rasmni o'qib bo'lmadi. Boshqa rasm yuklang.", status.HTTP_400_BAD_REQUEST)
+
+
+def encode_image(image):
+    # PIL Image → (bytes, media_type); prepare_image ve PDF sayfaları ortak kullanır
+    image = image.convert('L' if SCAN_IMAGE_GRAYSCALE else 'RGB')
+    image.thumbnail((SCAN_IMAGE_MAX_SIDE, SCAN_IMAGE_MAX_SIDE), Image.LANCZOS)
+
+    out = io.BytesIO()
+    image.save(out, format=SCAN_IMAGE_FORMAT, quality=SCAN_IMAGE_QUALITY, optimize=True)
+    return out.getvalue(), MEDIA_TYPES[SCAN_IMAGE_FORMAT]
+
+
+def pdf_page_count(pdf_file):
+    """PDF'i açar; döndürür: (document, sayfa sayısı). pypdfium2 yoksa ScanError."""
+    from .invoice_scan import ScanError
+
+    try:
+        import pypdfium2 as pdfium
+    except ImportError:
+        raise ScanError("PDF skanerlash serverda o'rnatilmagan. Rasm yuklang.", status.HTTP_400_BAD_REQUEST)
+
+    pdf_file.seek(0)
+    try:
+        document = pdfium.PdfDocument(pdf_file.read())
+    except pdfium.PdfiumError:
+        raise ScanError("PDF faylni o'qib bo'lmadi.", status.HTTP_400_BAD_REQUEST)
+    return document, len(document)
+
+
+def render_pdf_page(document, index):
+    """
+    PDF sayfasını uzun kenarı SCAN_IMAGE_MAX_SIDE olacak ölçekte çizip kodlar.
+    pdfium thread-safe değil — sadece çağıran thread'de kullanılmalı.
+    Döndürür: (bytes, media_type)
+    """
+    page = document[index]
+    try:
+        # PDF birimi 1/72 inch; ölçek doğrudan hedef piksel boyutuna göre
+        scale = SCAN_IMAGE_MAX_SIDE / max(page.get_size())
+        return encode_image(page.render(scale=scale).to_pil())
+    finally:
+        page.close()
+
+
+def build_data_url(image_bytes, media_type):
+    """
+    data:...;base64,... string'ini parça parça kodlar: bytes → b64 bytes → str →
+    f-string kopyaları yerine tek bytearray ve tek decode.
+    """
+    buf = bytearray(f"data:{media_type};base64,".encode("ascii"))
+    view = memoryview(image_bytes)
+    for start in range(0, len(view), B64_CHUNK):
+        buf += base64.b64encode(view[start:start + B64_CHUNK])
+    return buf.decode("ascii")
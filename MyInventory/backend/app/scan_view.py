@@ -3,113 +3,160 @@
 # pip install groq  (tek bağımlılık)
 
 import json
-import base64
-from groq import Groq
+from itertools import chain
+
+from django.http import StreamingHttpResponse
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, permissions
+from django.shortcuts import get_object_or_404
+
+from .models import ScanJob
+from .invoice_scan import ScanError, get_scan_files, load_pages, scan_invoice, stream_scan
+from .scan_jobs import ScanQueueFull, expire_stale_jobs, submit_scan
+from .scan_cache import scan_cache_stats
+from .matcher import match_lines
+from .last_prices import prefill_prices
 
-GROQ_API_KEY = "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"
+# İş bitmediyse client'a önerilen poll aralığı (saniye)
+SCAN_JOB_POLL_INTERVAL = 2
+SCAN_MATCH_MAX_LINES = 500
 
 
 class InvoiceScanView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def post(self, request):
-        # 1. Resmi al
-        image_file = request.FILES.get("image")
-        if not image_file:
-            return Response(
-                {"detail": "Iltimos 'image' maydonida rasm yuboring."},
-                status=status.HTTP_400_BAD_REQUEST
-            )
+        # 1. Resm(lar)ni al — 'image', bir nechta 'images' yoki PDF
+        try:
+            files = get_scan_files(request)
+            # 2-4. Sahifalar parallel Groq Vision'ga + frontend formatı
+            result = scan_invoice(files)
+        except ScanError as e:
+            return Response({"detail": e.detail}, status=e.status_code)
 
-        allowed = ["image/jpeg", "image/png", "image/webp", "image/gif"]
-        if image_file.content_type not in allowed:
-            return Response(
-                {"detail": "Faqat JPG, PNG yoki WEBP yuklay olasiz."},
-                status=status.HTTP_400_BAD_REQUEST
-            )
+        # 5. Katalogdagi mavjud Item/Unit/MoneyType takliflari + narxi yo'q qatorlarga oxirgi narx
+        match_lines(request.user.company_id, result["lines"])
+        prefill_prices(request.user.company_id, result["lines"])
+        return Response(result)
 
-        # 2. Resmi base64'e çevir — server'da hiç fayl saqlanmaydi
-        image_data = base64.standard_b64encode(image_file.read()).decode("utf-8")
-        media_type = image_file.content_type
 
-        # 3. Groq Vision — direkt resmi ko'radi
+class InvoiceScanStreamView(APIView):
+    """
+    POST scan/stream/  → application/x-ndjson; her satır model yazdıkça gelir:
+      {"type": "line", "line": {"id", "desc", "qty", "price", "cur", "birlik", "warn", "page", "match"}}
+      {"type": "done", "item_count": ..., "page_count": ...}
+    Hiç satır çıkmazsa normal {"detail"} hata cevabı döner.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
         try:
-            client = Groq(api_key=GROQ_API_KEY)
-            completion = client.chat.completions.create(
-                model="meta-llama/llama-4-scout-17b-16e-instruct",
-                messages=[
-                    {
-                        "role": "user",
-                        "content": [
-                            {
-                                "type": "image_url",
-                                "image_url": {
-                                    "url": f"data:{media_type};base64,{image_data}"
-                                }
-                            },
-                            {
-                                "type": "text",
-                                "text": (
-                                    "Bu fatura yoki chek resmini analiz qil.\n"
-                                    "Rasm o'zbek, rus yoki ingliz tilida bo'lishi mumkin — barchasi ishlaydi.\n"
-                                    "Barcha mahsulot nomlarini o'zbek lotin alifbosiga o'girib yoz.\n\n"
-                                    "MUHIM QOIDALAR:\n"
-                                    "- Agar mahsulotning narxi ko'rsatilmagan bo'lsa, 'birim_fiyat' ni 0 qilib yoz — mahsulotni o'tkazib yuborme.\n"
-                                    "- Agar miqdor ko'rsatilmagan bo'lsa, 'adet' ni 1 qilib yoz.\n"
-                                    "- Agar birlik ko'rsatilmagan bo'lsa, 'birlik' ni 'dona' qilib yoz.\n"
-                                    "- Faqat sof JSON qaytadir, boshqa hech narsa yozma.\n\n"
-                                    "Aynan shu formatda qaytadir:\n"
-                                    '{"urunler": [{"ad": "Mahsulot nomi", "adet": 2, "birlik": "dona", "birim_fiyat": 15000.0}]}'
-                                )
-                            }
-                        ]
-                    }
-                ],
-                response_format={"type": "json_object"},
-                max_tokens=2048,
-            )
+            pages = load_pages(get_scan_files(request))
+        except ScanError as e:
+            return Response({"detail": e.detail}, status=e.status_code)
 
-            json_str = completion.choices[0].message.content
-            data = json.loads(json_str)
+        # İlk event'e kadar bekle — tamamen başarısızsa doğru HTTP status ile dön
+        events = stream_scan(pages)
+        first = next(events)
+        if first["type"] == "error":
+            return Response({"detail": first["detail"]}, status=first["status"])
 
-        except json.JSONDecodeError:
-            return Response(
-                {"detail": "AI javobi JSON formatida emas."},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
-        except Exception as e:
+        company_id = request.user.company_id
+
+        def encode(event):
+            if event["type"] == "line":
+                match_lines(company_id, [event["line"]])
+                prefill_prices(company_id, [event["line"]])
+            return json.dumps(event, ensure_ascii=False) + "\n"
+
+        response = StreamingHttpResponse(
+            (encode(event) for event in chain([first], events)),
+            content_type="application/x-ndjson",
+        )
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"   # nginx satırları biriktirmesin
+        return response
+
+
+class ScanJobCreateView(APIView):
+    """
+    POST scan/jobs/  (multipart 'image' / 'images' / PDF)  →  202 {"job_id": ..., "status": "queued"}
+    Sonuç GET scan/jobs/<job_id>/ ile alınır.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        try:
+            files = get_scan_files(request)
+        except ScanError as e:
+            return Response({"detail": e.detail}, status=e.status_code)
+
+        try:
+            job = submit_scan(request.user, files)
+        except ScanError as e:
+            return Response({"detail": e.detail}, status=e.status_code)
+        except ScanQueueFull:
             return Response(
-                {"detail": f"AI xatosi: {str(e)}"},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+                {"detail": "Hozir juda ko'p skan navbatda. Birozdan keyin qayta urinib ko'ring."},
+                status=status.HTTP_429_TOO_MANY_REQUESTS,
+                headers={"Retry-After": "5"},
             )
 
-        # 4. Frontend uchun formatlash
-        # Narxi 0 bo'lsa ham qo'shiladi, faqat warn=True bilan belgilanadi
-        urunler = data.get("urunler", [])
-        lines = []
-        for i, u in enumerate(urunler):
-            adet  = float(u.get("adet", 1) or 1)       # None yoki 0 bo'lsa 1
-            fiyat = float(u.get("birim_fiyat", 0) or 0) # None bo'lsa 0
-            lines.append({
-                "id":     i + 1,
-                "desc":   u.get("ad", "Noma'lum"),
-                "qty":    adet,
-                "price":  str(fiyat),
-                "cur":    "UZS",
-                "birlik": u.get("birlik", "dona") or "dona",
-                "warn":   fiyat == 0,   # Narxi yo'q bo'lsa sariq belgi
-            })
-
-        if not lines:
+        return Response({"job_id": str(job.id), "status": job.status}, status=status.HTTP_202_ACCEPTED)
+
+
+class ScanJobDetailView(APIView):
+    """
+    GET scan/jobs/<job_id>/ — hemen döner (sync worker'ı bekletmez). İş bitmediyse
+    Retry-After header'ı ile bir sonraki poll zamanı önerilir.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, job_id):
+        queryset = ScanJob.objects.filter(created_by=request.user)
+        # Worker'ı ölen iş sonsuza kadar 'running' kalmasın
+        expire_stale_jobs(queryset.filter(pk=job_id))
+        job = get_object_or_404(queryset, pk=job_id)
+
+        data = {"job_id": str(job.id), "status": job.status}
+        if job.status == 'done':
+            data.update(job.result)
+            # Eşleşme okuma anında — iş bittikten sonra eklenen Item'lar da görünsün
+            match_lines(request.user.company_id, data["lines"])
+            prefill_prices(request.user.company_id, data["lines"])
+        elif job.status == 'failed':
+            data["detail"] = job.error
+            data["error_status"] = job.error_status
+        else:
+            return Response(data, headers={"Retry-After": str(SCAN_JOB_POLL_INTERVAL)})
+        return Response(data)
+
+
+class ScanMatchView(APIView):
+    """
+    POST scan/match/  {"lines": [{"desc": "...", "birlik": "kg", "cur": "UZS"}, ...]}
+    → aynı satırlar + "match": {"item", "unit", "money_type"} (her biri {"id", "name", "score"} ya da null)
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        lines = request.data.get("lines")
+        if not isinstance(lines, list) or not all(isinstance(line, dict) for line in lines):
+            return Response({"detail": "'lines' obyektlar ro'yxati bo'lishi kerak."}, status=status.HTTP_400_BAD_REQUEST)
+        if len(lines) > SCAN_MATCH_MAX_LINES:
             return Response(
-                {"detail": "Rasmdan mahsulot topib bo'lmadi. Aniqroq rasm yuklang."},
-                status=status.HTTP_400_BAD_REQUEST
+                {"detail": f"Bir so'rovda ko'pi bilan {SCAN_MATCH_MAX_LINES} qator."},
+                status=status.HTTP_400_BAD_REQUEST,
             )
+        match_lines(request.user.company_id, lines)
+        return Response({"lines": prefill_prices(request.user.company_id, lines)})
+
+
+class ScanCacheStatsView(APIView):
+    """GET scan/cache-stats/ — bu worker sürecinin cache hit/miss sayaçları."""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        return Response(scan_cache_stats())
 
-        return Response({
-            "lines":      lines,
-            "item_count": len(lines),
-        })
\ No newline at end of file
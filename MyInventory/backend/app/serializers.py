@@ -1,5 +1,6 @@
 from rest_framework import serializers
-from app.models import BuyList, Item, Unit, MoneyType, Depo
+from django.urls import reverse
+from app.models import BuyList, Item, Unit, MoneyType, Depo, ExportJob
 
 
 class ItemSerializer(serializers.ModelSerializer):
@@ -54,6 +55,89 @@ class BuyListSerializer(serializers.ModelSerializer):
         fields = ['id', 'item', 'qty', 'narx', 'unit', 'moneytype', 'depolar', 'company', 'created_at']
 
 
+class BuyListBulkLineSerializer(serializers.Serializer):
+    """
+    buylist/bulk/ satırı — BuyListSerializer ile aynı alan adları, ama FK'lar
+    satır başına sorgu yerine context['lookups'] içindeki önceden çekilmiş
+    company id kümeleriyle doğrulanır.
+    """
+    item      = serializers.IntegerField()
+    qty       = serializers.FloatField()
+    narx      = serializers.FloatField()
+    unit      = serializers.IntegerField()
+    moneytype = serializers.IntegerField()
+    depolar   = serializers.IntegerField()
+
+    # satır alanı → (lookups anahtarı, BuyList alanı)
+    RELATED = {
+        'item': 'item_id',
+        'unit': 'item_unit_id',
+        'moneytype': 'money_type_id',
+        'depolar': 'depo_id',
+    }
+
+    def validate(self, data):
+        lookups = self.context['lookups']
+        errors = {}
+        for field in self.RELATED:
+            if data[field] not in lookups[field]:
+                errors[field] = [f"{data[field]} topilmadi."]
+        if errors:
+            raise serializers.ValidationError(errors)
+        return data
+
+    def to_buylist(self, company):
+        data = self.validated_data
+        return BuyList(
+            company=company,
+            item_count=data['qty'],
+            item_price=data['narx'],
+            **{attr: data[field] for field, attr in self.RELATED.items()},
+        )
+
+
 class BuyListTotalSerializer(serializers.Serializer):
     depo_id = serializers.IntegerField()
-    total_price = serializers.FloatField()
\ No newline at end of file
+    money_type_id = serializers.IntegerField()
+    money_type = serializers.CharField(source='money_type.type')
+    total_price = serializers.FloatField(source='total')
+    row_count = serializers.IntegerField()
+
+
+class LastPriceSerializer(serializers.Serializer):
+    item_id = serializers.IntegerField()
+    unit_id = serializers.IntegerField()
+    money_type_id = serializers.IntegerField()
+    price = serializers.FloatField()
+    bought_at = serializers.DateTimeField()
+
+
+class ExportJobSerializer(serializers.ModelSerializer):
+    depo = serializers.PrimaryKeyRelatedField(queryset=Depo.objects.all())
+    # {"date_from": "2025-01-01", "date_to": "2025-03-31", "item": "3,7"}
+    filters = serializers.DictField(child=serializers.CharField(allow_blank=True), required=False)
+    progress = serializers.SerializerMethodField()
+    download_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ExportJob
+        fields = ['id', 'depo', 'format', 'filters', 'status', 'rows_done', 'rows_total', 'progress',
+                  'download_url', 'error', 'created_at', 'started_at', 'finished_at']
+        read_only_fields = ['status', 'rows_done', 'rows_total', 'error', 'created_at', 'started_at', 'finished_at']
+
+    def validate_depo(self, depo):
+        if depo.company_id != self.context['request'].user.company_id:
+            raise serializers.ValidationError("Depo topilmadi.")
+        return depo
+
+    def get_progress(self, obj):
+        if not obj.rows_total:
+            return 1.0 if obj.status == 'done' else 0.0
+        return round(obj.rows_done / obj.rows_total, 4)
+
+    def get_download_url(self, obj):
+        if obj.status != 'done':
+            return None
+        url = reverse('export-job-download', args=[obj.id])
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
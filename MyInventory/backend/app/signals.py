@@ -0,0 +1,74 @@
+# app/signals.py
+from django.db.models.signals import post_save, post_delete, pre_delete
+from django.dispatch import receiver
+from .models import BuyList, Depo, ExportJob, Item, Unit, MoneyType
+from .totals import apply_deletion, apply_total_delta, collect_deletion, row_amount
+from .last_prices import record_last_prices, refresh_last_price
+from .matcher import invalidate_catalog
+
+
+@receiver(post_save, sender=BuyList)
+def buylist_saved(sender, instance, created, **kwargs):
+    # Eski değerler BuyList.save'de kilitli satırdan okundu (yeni satırda None)
+    old = getattr(instance, '_previous', None)
+    key, amount = instance.total_key(), row_amount(instance.item_count, instance.item_price)
+    if old is None:
+        apply_total_delta(*key, amount, 1)
+    else:
+        old_key = (old['company_id'], old['depo_id'], old['money_type_id'])
+        old_amount = row_amount(old['item_count'], old['item_price'])
+        if old_key == key:
+            apply_total_delta(*key, amount - old_amount, 0)
+        else:
+            apply_total_delta(*old_key, -old_amount, -1)
+            apply_total_delta(*key, amount, 1)
+
+    # LastPrice: yeni satır her zaman en yeni; güncellemede eski ve yeni anahtar yeniden hesaplanır
+    if old is None:
+        record_last_prices([instance])
+    else:
+        old_price_key = (old['company_id'], old['item_id'], old['item_unit_id'], old['money_type_id'])
+        if old_price_key != instance.price_key():
+            refresh_last_price(*old_price_key)
+        refresh_last_price(*instance.price_key())
+    instance._previous = None
+
+
+# BuyList silmeleri BuyListQuerySet.delete'te toplu işlenir. Depo/Item/Unit silinince cascade
+# BuyList satırlarını tek DELETE ile siler — etkilenen özetler burada bir kez güncellenir.
+# Company/MoneyType silinince BuyListTotal ve LastPrice satırları da cascade ile gider.
+BUYLIST_PARENTS = {Depo: 'depo', Item: 'item', Unit: 'item_unit'}
+
+
+@receiver(pre_delete, sender=Depo)
+@receiver(pre_delete, sender=Item)
+@receiver(pre_delete, sender=Unit)
+def buylist_parent_deleting(sender, instance, **kwargs):
+    instance._buylist_deletion = collect_deletion(BuyList.objects.filter(**{BUYLIST_PARENTS[sender]: instance}))
+
+
+@receiver(post_delete, sender=Depo)
+@receiver(post_delete, sender=Item)
+@receiver(post_delete, sender=Unit)
+def buylist_parent_deleted(sender, instance, **kwargs):
+    collected = getattr(instance, '_buylist_deletion', None)
+    if collected:
+        apply_deletion(collected)
+
+
+@receiver(post_save, sender=Item)
+@receiver(post_delete, sender=Item)
+@receiver(post_save, sender=Unit)
+@receiver(post_delete, sender=Unit)
+@receiver(post_save, sender=MoneyType)
+@receiver(post_delete, sender=MoneyType)
+def catalog_changed(sender, instance, **kwargs):
+    # Tarama eşleştiricisinin şirket index'i bir sonraki istekte yeniden kurulsun
+    invalidate_catalog(instance.company_id)
+
+
+@receiver(post_delete, sender=ExportJob)
+def export_job_deleted(sender, instance, **kwargs):
+    # Paylaşımlı storage'daki dosya iş ile birlikte silinsin
+    if instance.file:
+        instance.file.delete(save=False)
@@ -0,0 +1,90 @@
+# app/storage.py
+# Export dosyaları için storage. Worker (run_export_worker) ve web ayrı dyno/container'da
+# olabilir — ikisinin ortak gördüğü tek yer veritabanı. DatabaseStorage dosyayı 1 MB'lık
+# StoredFileChunk satırlarına yazar, okurken parça parça çeker (dosya belleğe alınmaz).
+# settings.STORAGES['exports'] ile S3 gibi başka bir paylaşımlı storage verilebilir.
+import io
+
+from django.core.files.base import File
+from django.core.files.storage import Storage, storages
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import Length
+from django.utils.deconstruct import deconstructible
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def export_storage():
+    # FileField(storage=...) için callable — migration'a backend yazılmaz
+    return storages['exports']
+
+
+def _chunks():
+    from .models import StoredFileChunk
+    return StoredFileChunk.objects
+
+
+class _ChunkReader(io.RawIOBase):
+
+    def __init__(self, name, size):
+        self.name = name
+        self.size = size
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._pos, io.SEEK_END: self.size}[whence]
+        self._pos = max(0, base + offset)
+        return self._pos
+
+    def readinto(self, buffer):
+        if self._pos >= self.size:
+            return 0
+        index, offset = divmod(self._pos, CHUNK_SIZE)
+        data = _chunks().filter(name=self.name, index=index).values_list('data', flat=True).first()
+        data = bytes(data or b'')[offset:offset + len(buffer)]
+        buffer[:len(data)] = data
+        self._pos += len(data)
+        return len(data)
+
+
+@deconstructible
+class DatabaseStorage(Storage):
+
+    def _save(self, name, content):
+        with transaction.atomic():
+            _chunks().filter(name=name).delete()
+            rows = [
+                _chunks().model(name=name, index=index, data=data)
+                for index, data in enumerate(content.chunks(CHUNK_SIZE))
+            ]
+            # Boş dosya da var sayılsın
+            _chunks().bulk_create(rows or [_chunks().model(name=name, index=0, data=b'')])
+        return name
+
+    def _open(self, name, mode='rb'):
+        if 'w' in mode or 'a' in mode:
+            raise ValueError("DatabaseStorage faqat o'qish uchun ochiladi.")
+        reader = _ChunkReader(name, self.size(name))
+        return File(io.BufferedReader(reader, CHUNK_SIZE), name=name)
+
+    def exists(self, name):
+        return _chunks().filter(name=name).exists()
+
+    def delete(self, name):
+        _chunks().filter(name=name).delete()
+
+    def size(self, name):
+        stats = _chunks().filter(name=name).aggregate(count=Count('id'), size=Sum(Length('data')))
+        if not stats['count']:
+            raise FileNotFoundError(name)
+        return stats['size'] or 0
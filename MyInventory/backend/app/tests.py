@@ -1,3 +1,797 @@
-from django.test import TestCase
+import json
+import re
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+from io import BytesIO
+from unittest.mock import patch
 
-# Create your tests here.
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image, JpegImagePlugin
+from rest_framework.test import APIClient
+
+from user_app.models import Company, CustomUser
+from .invoice_scan import ScanError, UrunlerStreamParser
+from .matcher import match_lines
+from .scan_preprocess import prepare_image, scan_image_format
+from .export_jobs import claim_next_job, reclaim_stale_jobs, run_export_job
+from .totals import rebuild_totals
+from .vision import CircuitBreaker, VisionClient, VisionUnavailable, reset_vision_client
+from .models import BuyList, BuyListTotal, ExportJob, LastPrice, Item, Unit, MoneyType, Depo, ScanJob, StoredFileChunk
+
+
+def jpeg_upload(color, size=(64, 48), name="invoice.jpg"):
+    out = BytesIO()
+    Image.new('RGB', size, color).save(out, format='JPEG')
+    return SimpleUploadedFile(name, out.getvalue(), content_type='image/jpeg')
+
+
+SCANNED = [{"id": 1, "desc": "Un", "qty": 2.0, "price": "15000.0", "cur": "UZS", "birlik": "kg", "warn": False}]
+
+
+class BuyListQueryPlanTests(TestCase):
+    """BuyList'in ana sorguları seq scan'e düşmemeli (composite index'ler)."""
+
+    COMPANIES = 20
+    ROWS_PER_DEPO = 100
+
+    @classmethod
+    def setUpTestData(cls):
+        rows = []
+        for n in range(cls.COMPANIES):
+            company = Company.objects.create(name=f"Company {n}")
+            user = CustomUser.objects.create(username=f"user{n}", company=company)
+            unit = Unit.objects.create(unit="dona", company=company)
+            money = MoneyType.objects.create(type="UZS", company=company)
+            items = [Item.objects.create(name=f"Item {n}-{i}", company=company) for i in range(5)]
+            for d in range(3):
+                depo = Depo.objects.create(name=f"Depo {n}-{d}", company=company, created_by=user)
+                for r in range(cls.ROWS_PER_DEPO):
+                    rows.append(BuyList(
+                        company=company, item=items[r % len(items)], item_count=1,
+                        item_unit=unit, item_price=r, money_type=money, depo=depo,
+                    ))
+        BuyList.objects.bulk_create(rows, batch_size=1000)
+
+        cls.company = Company.objects.first()
+        cls.depo = Depo.objects.filter(company=cls.company).first()
+        cls.item = Item.objects.filter(company=cls.company).first()
+
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+    def assertNoSeqScan(self, queryset):
+        plan = queryset.explain()
+        table = BuyList._meta.db_table
+        if connection.vendor == 'postgresql':
+            seq_scan = re.search(rf"Seq Scan on {table}\b", plan)
+        else:
+            # SQLite: SEARCH = index kullanılıyor, SCAN = tüm tabloyu geziyor
+            seq_scan = re.search(rf"\bSCAN {table}\b", plan)
+        self.assertIsNone(seq_scan, f"Sequential scan on {table}:\n{plan}")
+
+    def test_depo_export_query(self):
+        self.assertNoSeqScan(
+            BuyList.objects.filter(company=self.company, depo_id=self.depo.id)
+            .select_related('item', 'item_unit', 'money_type')
+            .order_by('created_at')
+        )
+
+    def test_list_page_query(self):
+        self.assertNoSeqScan(
+            BuyList.objects.filter(company=self.company).order_by('-created_at', '-id')[:51]
+        )
+
+    def test_item_history_query(self):
+        self.assertNoSeqScan(
+            BuyList.objects.filter(company=self.company, item=self.item).order_by('-created_at')
+        )
+
+    def test_total_price_query(self):
+        self.assertNoSeqScan(
+            BuyList.objects.filter(company=self.company, depo_id=self.depo.id).values('money_type')
+        )
+
+
+class ScanJobTests(TransactionTestCase):
+    """scan/jobs/: kuyruk → running → done/failed; poll beklemez, ölü iş timeout'la düşer."""
+
+    def setUp(self):
+        company = Company.objects.create(name="Scan Co")
+        self.user = CustomUser.objects.create(username="ali", company=company)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def wait_for(self, job_id):
+        for _ in range(100):
+            response = self.client.get(f'/scan/jobs/{job_id}/')
+            if response.json()['status'] not in ('queued', 'running'):
+                return response
+            self.assertEqual(response['Retry-After'], '2')
+            time.sleep(0.05)
+        self.fail("scan job did not finish")
+
+    def test_job_lifecycle(self):
+        with patch('app.invoice_scan.call_vision_model', return_value=SCANNED):
+            response = self.client.post('/scan/jobs/', {'image': jpeg_upload((10, 20, 30))})
+            self.assertEqual(response.status_code, 202)
+            done = self.wait_for(response.json()['job_id'])
+        self.assertEqual(done.json()['status'], 'done')
+        self.assertEqual(done.json()['lines'][0]['desc'], "Un")
+
+        with patch('app.invoice_scan.call_vision_model', side_effect=ValueError("boom")):
+            response = self.client.post('/scan/jobs/', {'image': jpeg_upload((40, 50, 60))})
+            failed = self.wait_for(response.json()['job_id'])
+        self.assertEqual(failed.json()['status'], 'failed')
+
+    def test_stale_job_expires(self):
+        job = ScanJob.objects.create(company=self.user.company, created_by=self.user, status='running')
+        ScanJob.objects.filter(pk=job.pk).update(created_at=timezone.now() - timedelta(hours=1))
+
+        data = self.client.get(f'/scan/jobs/{job.pk}/').json()
+        self.assertEqual((data['status'], data['error_status']), ('failed', 504))
+
+
+class ScanPreprocessTests(TestCase):
+    """Modele gitmeden önce: EXIF yönü, draft ile küçük decode, uzun kenar sınırı, format."""
+
+    def jpeg(self, size, orientation=None):
+        out = BytesIO()
+        exif = Image.Exif()
+        if orientation:
+            exif[0x0112] = orientation
+        Image.new('RGB', size, 'white').save(out, format='JPEG', exif=exif)
+        out.seek(0)
+        return out
+
+    def test_exif_rotation_and_max_side(self):
+        # Orientation 6: telefon dik tutulmuş, piksel yatay saklanmış
+        data, media_type = prepare_image(self.jpeg((4000, 1000), orientation=6))
+        self.assertEqual(media_type, 'image/jpeg')
+        with Image.open(BytesIO(data)) as image:
+            self.assertEqual((image.format, image.size), ('JPEG', (400, 1600)))
+
+    def test_jpeg_is_drafted_before_decode(self):
+        draft = JpegImagePlugin.JpegImageFile.draft
+        with patch.object(JpegImagePlugin.JpegImageFile, 'draft', autospec=True, side_effect=draft) as spy:
+            prepare_image(self.jpeg((3400, 3400)))
+        self.assertEqual(spy.call_args.args[1:], ('RGB', (1600, 1600)))
+
+    def test_webp_and_invalid_format(self):
+        with patch('app.scan_preprocess.SCAN_IMAGE_FORMAT', 'WEBP'):
+            data, media_type = prepare_image(self.jpeg((800, 600)))
+        self.assertEqual(media_type, 'image/webp')
+        self.assertEqual(Image.open(BytesIO(data)).size, (800, 600))
+
+        self.assertEqual(scan_image_format('webp'), 'WEBP')
+        with self.assertRaises(ImproperlyConfigured):
+            scan_image_format('PNG')
+
+    def test_unreadable_image_is_400(self):
+        with self.assertRaises(ScanError) as raised:
+            prepare_image(BytesIO(b"not an image"))
+        self.assertEqual(raised.exception.status_code, 400)
+
+
+class ScanCacheTests(TestCase):
+    """Aynı resim ikinci kez modele gitmez; anahtar resim byte'larının sha256'sı."""
+
+    def setUp(self):
+        caches['scans'].clear()
+        company = Company.objects.create(name="Cache Co")
+        self.client = APIClient()
+        self.client.force_authenticate(CustomUser.objects.create(username="ali", company=company))
+
+    def scan(self, color, name="invoice.jpg"):
+        return self.client.post('/scan/', {'image': jpeg_upload(color, name=name)})
+
+    def test_same_image_is_served_from_cache(self):
+        before = self.client.get('/scan/cache-stats/').json()
+        with patch('app.invoice_scan.call_vision_model', return_value=SCANNED) as vision:
+            first = self.scan((200, 10, 10))
+            # Dosya adı farklı, byte'lar aynı → hit
+            second = self.scan((200, 10, 10), name="qayta.jpg")
+            self.assertEqual(vision.call_count, 1)
+            self.scan((10, 200, 10))
+            self.assertEqual(vision.call_count, 2)
+        self.assertEqual(first.json()['lines'], second.json()['lines'])
+
+        stats = self.client.get('/scan/cache-stats/').json()
+        self.assertEqual((stats['hits'] - before['hits'], stats['misses'] - before['misses']), (1, 2))
+
+    def test_failed_scan_is_not_cached(self):
+        error = ScanError("AI xatosi: timeout")
+        with patch('app.invoice_scan.call_vision_model', side_effect=[error, SCANNED]) as vision:
+            self.assertEqual(self.scan((30, 30, 200)).status_code, 500)
+            self.assertEqual(self.scan((30, 30, 200)).status_code, 200)
+        self.assertEqual(vision.call_count, 2)
+
+
+class MultiPageScanTests(TestCase):
+    """Birden çok sayfa paralel okunur, sayfa sırasıyla birleşir; hatalı sayfa page_errors'a."""
+
+    def setUp(self):
+        caches['scans'].clear()
+        company = Company.objects.create(name="Pages Co")
+        self.client = APIClient()
+        self.client.force_authenticate(CustomUser.objects.create(username="ali", company=company))
+
+    def fake_vision(self, image_bytes, media_type):
+        # Sayfalar boyutlarından tanınır (paralel çağrılar sırasız gelir)
+        width = Image.open(BytesIO(image_bytes)).size[0]
+        if width == 90:
+            time.sleep(0.05)   # ilk sayfa en geç bitsin — sıra yine korunmalı
+            return [dict(SCANNED[0], desc="Un"), dict(SCANNED[0], id=2, desc="Tuz")]
+        if width in (60, 61):
+            raise ScanError("AI xatosi: timeout")
+        return [dict(SCANNED[0], desc="Shakar")]
+
+    def pages(self, *widths):
+        return [jpeg_upload((width, 0, 0), size=(width, 40)) for width in widths]
+
+    def test_pages_merge_in_order_with_errors(self):
+        with patch('app.invoice_scan.call_vision_model', side_effect=self.fake_vision):
+            response = self.client.post('/scan/', {'images': self.pages(90, 60, 70)})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual([(line['id'], line['page'], line['desc']) for line in data['lines']],
+                         [(1, 1, "Un"), (2, 1, "Tuz"), (3, 3, "Shakar")])
+        self.assertEqual((data['item_count'], data['page_count']), (3, 3))
+        self.assertEqual(data['page_errors'], [{"page": 2, "detail": "AI xatosi: timeout"}])
+
+    def test_all_pages_failing_returns_first_error(self):
+        with patch('app.invoice_scan.call_vision_model', side_effect=self.fake_vision):
+            response = self.client.post('/scan/', {'images': self.pages(60, 61)})
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(response.json()['detail'], "AI xatosi: timeout")
+
+    def test_page_limit(self):
+        with patch('app.invoice_scan.SCAN_MAX_PAGES', 2), \
+                patch('app.invoice_scan.call_vision_model', side_effect=self.fake_vision) as vision:
+            response = self.client.post('/scan/', {'images': self.pages(70, 71, 72)})
+        self.assertEqual(response.status_code, 400)
+        vision.assert_not_called()
+
+
+class FakeStreamClient:
+    # Model çıktısını verilen parçalar halinde döndürür
+    def __init__(self, chunks):
+        self.chunks = chunks
+
+    def stream(self, messages, **kwargs):
+        yield from self.chunks
+
+
+MODEL_OUTPUT = (
+    '```json\n{"urunler": [{"ad": "Un {1-nav}", "adet": 2, "birlik": "kg", "birim_fiyat": 15000},'
+    ' {"ad": "Qand \\"oq\\"", "adet": 1, "birim_fiyat": 0}, {"ad": bozuk},'
+    ' {"ad": "Tuz", "adet": 3, "birim_fiyat": 2000}]} ```'
+)
+
+
+class ScanStreamTests(TestCase):
+    """Model yazdıkça satırlar: parser parça sınırlarından ve string içeriğinden etkilenmez."""
+
+    def setUp(self):
+        caches['scans'].clear()
+        company = Company.objects.create(name="Stream Co")
+        self.client = APIClient()
+        self.client.force_authenticate(CustomUser.objects.create(username="ali", company=company))
+
+    def test_parser_handles_any_chunking(self):
+        expected = ["Un {1-nav}", 'Qand "oq"', "Tuz"]
+        for size in (1, 7, len(MODEL_OUTPUT)):
+            parser = UrunlerStreamParser()
+            items = []
+            for start in range(0, len(MODEL_OUTPUT), size):
+                items += parser.feed(MODEL_OUTPUT[start:start + size])
+            self.assertEqual([item['ad'] for item in items], expected, size)
+        # Dizi kapandıktan sonra gelenler yok sayılır
+        self.assertEqual(parser.feed('{"ad": "sonra"}'), [])
+
+    def test_ndjson_stream_view(self):
+        chunks = [MODEL_OUTPUT[i:i + 5] for i in range(0, len(MODEL_OUTPUT), 5)]
+        with patch('app.invoice_scan.get_vision_client', return_value=FakeStreamClient(chunks)):
+            response = self.client.post('/scan/stream/', {'image': jpeg_upload((1, 2, 3))})
+            self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+            events = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual([event['type'] for event in events], ['line', 'line', 'line', 'done'])
+        self.assertEqual([event['line']['id'] for event in events[:3]], [1, 2, 3])
+        self.assertTrue(events[1]['line']['warn'])
+        self.assertEqual(events[-1]['item_count'], 3)
+
+        # Tamamlanan sayfa cache'e yazıldı — ikinci istek modele gitmez
+        with patch('app.invoice_scan.get_vision_client') as client:
+            again = self.client.post('/scan/stream/', {'image': jpeg_upload((1, 2, 3))})
+            self.assertEqual(len(b''.join(again.streaming_content).splitlines()), 4)
+        client.assert_not_called()
+
+    def test_malformed_numbers_do_not_cut_stream(self):
+        output = ('{"urunler": [{"ad": "Un", "adet": "2 ta", "birim_fiyat": "15 000"},'
+                  ' {"ad": "Tuz", "adet": "~3", "birim_fiyat": "bilinmiyor"},'
+                  ' {"ad": "Qand", "adet": 4, "birim_fiyat": 9000}]}')
+        with patch('app.invoice_scan.get_vision_client', return_value=FakeStreamClient([output])):
+            response = self.client.post('/scan/stream/', {'image': jpeg_upload((7, 8, 9))})
+            events = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual([event['type'] for event in events], ['line', 'line', 'line', 'done'])
+        lines = [event['line'] for event in events[:3]]
+        self.assertEqual([(line['qty'], line['price'], line['warn']) for line in lines],
+                         [(2.0, '15000.0', True), (3.0, '0', True), (4.0, '9000.0', False)])
+
+    def test_no_lines_is_plain_error(self):
+        with patch('app.invoice_scan.get_vision_client', return_value=FakeStreamClient(['{"urunler": []}'])):
+            response = self.client.post('/scan/stream/', {'image': jpeg_upload((4, 5, 6))})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('detail', response.json())
+
+
+class MatcherTests(TestCase):
+    """Trigram eşleştirme: normalize, eşik, company sınırı; index katalog yazılınca yenilenir."""
+
+    def setUp(self):
+        indexes = patch.dict('app.matcher._indexes', clear=True)
+        indexes.start()
+        self.addCleanup(indexes.stop)
+        self.company = Company.objects.create(name="Match Co")
+        self.un = Item.objects.create(name="Un (1-nav)", company=self.company)
+        self.shakar = Item.objects.create(name="Shakar qumi", company=self.company)
+        self.kg = Unit.objects.create(unit="kg", company=self.company)
+        self.uzs = MoneyType.objects.create(type="UZS", company=self.company)
+        other = Company.objects.create(name="Boshqa")
+        Item.objects.create(name="Guruch", company=other)
+
+    def match(self, desc, birlik="kg", cur="UZS"):
+        return match_lines(self.company.id, [{"desc": desc, "birlik": birlik, "cur": cur}])[0]["match"]
+
+    def test_exact_fuzzy_and_no_match(self):
+        exact = self.match("UN 1 NAV")
+        self.assertEqual((exact["item"]["id"], exact["item"]["score"]), (self.un.id, 1.0))
+        self.assertEqual((exact["unit"]["id"], exact["money_type"]["id"]), (self.kg.id, self.uzs.id))
+
+        fuzzy = self.match("shakar qum")["item"]
+        self.assertEqual(fuzzy["id"], self.shakar.id)
+        self.assertLess(fuzzy["score"], 1.0)
+
+        # Başka company'nin item'ı ve eşik altı benzerlik eşleşmez
+        self.assertIsNone(self.match("Guruch")["item"])
+        self.assertIsNone(self.match("Sut", birlik="litr")["unit"])
+
+    def test_index_is_reused_until_catalog_changes(self):
+        self.match("Un")
+        with self.assertNumQueries(0):
+            self.match("Shakar")
+
+        Item.objects.create(name="Tuz", company=self.company)
+        with self.assertNumQueries(3):
+            self.assertEqual(self.match("tuz")["item"]["name"], "Tuz")
+
+        self.shakar.delete()
+        self.assertIsNone(self.match("Shakar qumi")["item"])
+
+    def test_match_endpoint(self):
+        client = APIClient()
+        client.force_authenticate(CustomUser.objects.create(username="ali", company=self.company))
+        response = client.post('/scan/match/', {"lines": [{"desc": "un", "birlik": "KG", "cur": "uzs"}]}, format='json')
+        self.assertEqual(response.json()["lines"][0]["match"]["unit"]["id"], self.kg.id)
+        self.assertEqual(client.post('/scan/match/', {"lines": "un"}, format='json').status_code, 400)
+
+
+class ExportJobTests(TestCase):
+    """Export işleri: dedupe, sırayla claim, hata ve dosyanın paylaşımlı storage'dan inmesi."""
+
+    def setUp(self):
+        self.company = Company.objects.create(name="Export Co")
+        self.user = CustomUser.objects.create(username="ali", company=self.company)
+        self.depo = Depo.objects.create(name="Asosiy", company=self.company, created_by=self.user)
+        unit = Unit.objects.create(unit="kg", company=self.company)
+        money = MoneyType.objects.create(type="UZS", company=self.company)
+        item = Item.objects.create(name="Un", company=self.company)
+        for price in (100, 250):
+            BuyList.objects.create(company=self.company, item=item, item_count=2, item_unit=unit,
+                                   item_price=price, money_type=money, depo=self.depo)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_job(self, **filters):
+        return self.client.post('/export-jobs/', {'depo': self.depo.id, 'format': 'csv', 'filters': filters},
+                                format='json')
+
+    def test_dedupe_claim_and_download(self):
+        first, second = self.create_job(), self.create_job()
+        self.assertEqual((first.status_code, second.status_code), (201, 200))
+        self.assertEqual(first.json()['id'], second.json()['id'])
+        other = self.create_job(date_from="2020-01-01")
+        self.assertNotEqual(other.json()['id'], first.json()['id'])
+
+        job = claim_next_job()
+        self.assertEqual((job.id, job.status), (first.json()['id'], 'running'))
+        self.assertEqual(claim_next_job().id, other.json()['id'])
+        self.assertIsNone(claim_next_job())
+
+        run_export_job(job)
+        self.assertEqual(StoredFileChunk.objects.filter(name=job.file.name).count(), 1)
+        response = self.client.get(f'/export-jobs/{job.id}/download/')
+        self.assertEqual(response.status_code, 200)
+        body = b''.join(response.streaming_content)
+        self.assertEqual(int(response['Content-Length']), len(body))
+        self.assertEqual(len(body.decode('utf-8-sig').strip().splitlines()), 3)
+
+        job.delete()
+        self.assertFalse(StoredFileChunk.objects.exists())
+
+    def test_failed_job_and_stale_reclaim(self):
+        self.create_job()
+        job = claim_next_job()
+        with patch('app.export_jobs.stream_buylist_csv', side_effect=RuntimeError("disk full")):
+            run_export_job(job)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+        self.assertIn("disk full", job.error)
+
+        # Yeni iş açılabilir (failed aktif sayılmaz); worker'ı ölen iş reclaim ile düşer
+        self.assertEqual(self.create_job().status_code, 201)
+        stuck = claim_next_job()
+        ExportJob.objects.filter(pk=stuck.pk).update(started_at=timezone.now() - timedelta(hours=2))
+        self.assertEqual(reclaim_stale_jobs(stale_minutes=60), 1)
+        stuck.refresh_from_db()
+        self.assertEqual(stuck.status, 'failed')
+
+    def test_large_xlsx_goes_to_job(self):
+        url = f'/export-buylist-as-excel/{self.depo.id}/'
+        small = self.client.get(url)
+        self.assertEqual(small.status_code, 200)
+        self.assertTrue(small['Content-Disposition'].endswith('.xlsx"'))
+
+        with patch('app.expoer_as_excel.EXPORT_XLSX_SYNC_MAX_ROWS', 1):
+            first = self.client.get(url, {'date_from': "2020-01-01"})
+            again = self.client.get(url, {'date_from': "2020-01-01"})
+        self.assertEqual(first.status_code, 202)
+        job = ExportJob.objects.get()
+        self.assertEqual((job.format, job.filters, job.status), ('xlsx', {'date_from': "2020-01-01"}, 'queued'))
+        self.assertTrue(first['Location'].endswith(f'/export-jobs/{job.id}/'))
+        # Aynı istek ikinci kez yeni iş açmaz
+        self.assertEqual(again.json()['id'], job.id)
+
+
+class StreamingExportTests(TestCase):
+    """CSV / NDJSON export stream edilir, filtreler ve company sınırı uygulanır."""
+
+    def setUp(self):
+        self.company = Company.objects.create(name="Stream Co")
+        self.user = CustomUser.objects.create(username="ali", company=self.company)
+        self.depo = Depo.objects.create(name="Asosiy", company=self.company, created_by=self.user)
+        unit = Unit.objects.create(unit="kg", company=self.company)
+        money = MoneyType.objects.create(type="UZS", company=self.company)
+        self.un = Item.objects.create(name="Un", company=self.company)
+        self.shakar = Item.objects.create(name="Shakar", company=self.company)
+        for item, price, day in ((self.un, 100, 1), (self.shakar, 250, 2), (self.un, 300, 3)):
+            row = BuyList.objects.create(company=self.company, item=item, item_count=2, item_unit=unit,
+                                         item_price=price, money_type=money, depo=self.depo)
+            BuyList.objects.filter(pk=row.pk).update(created_at=timezone.make_aware(datetime(2025, 3, day, 12)))
+        # Başka company'nin aynı depo id'sine yazılmış satırı görünmemeli
+        other = Company.objects.create(name="Boshqa")
+        BuyList.objects.create(company=other, item=self.un, item_count=1, item_unit=unit,
+                               item_price=999, money_type=money, depo=self.depo)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def export(self, fmt, **params):
+        return self.client.get(f'/export-buylist-as-excel/{self.depo.id}/', {'format': fmt, **params})
+
+    def test_csv_streams_rows_in_order(self):
+        response = self.export('csv')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], "ID,Item,Miktar,Birim,Narx,Para Birimi,Sana")
+        self.assertEqual([line.split(',')[1] for line in lines[1:]], ["Un", "Shakar", "Un"])
+        self.assertTrue(lines[1].endswith("2025-03-01T12:00:00+00:00"))
+
+    def test_ndjson_filters(self):
+        response = self.export('ndjson', date_from="2025-03-02", date_to="2025-03-03", item=f"{self.un.id}")
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([(row['item'], row['narx']) for row in rows], [("Un", 300.0)])
+        self.assertEqual(set(rows[0]), {'id', 'item', 'qty', 'unit', 'narx', 'moneytype', 'created_at'})
+
+        # date_to dahil: 2025-03-02 günü tamamı
+        self.assertEqual(len(b''.join(self.export('csv', date_to="2025-03-02").streaming_content).splitlines()), 3)
+
+    def test_bad_filters_and_format(self):
+        self.assertEqual(self.export('csv', date_from="03/01/2025").status_code, 400)
+        self.assertEqual(self.export('ndjson', item="un").status_code, 400)
+        self.assertEqual(self.export('pdf').status_code, 400)
+
+
+class BuyListBulkTests(TestCase):
+    """buylist/bulk/: hepsi ya da hiçbiri; FK'lar company içinde, sabit sayıda sorguyla."""
+
+    def setUp(self):
+        self.company = Company.objects.create(name="Bulk Co")
+        self.user = CustomUser.objects.create(username="ali", company=self.company)
+        self.depo = Depo.objects.create(name="Asosiy", company=self.company, created_by=self.user)
+        self.unit = Unit.objects.create(unit="kg", company=self.company)
+        self.money = MoneyType.objects.create(type="UZS", company=self.company)
+        self.item = Item.objects.create(name="Un", company=self.company)
+        other = Company.objects.create(name="Boshqa")
+        self.foreign_item = Item.objects.create(name="Yot", company=other)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def line(self, **overrides):
+        return {"item": self.item.id, "qty": 2, "narx": 15000, "unit": self.unit.id,
+                "moneytype": self.money.id, "depolar": self.depo.id, **overrides}
+
+    def test_all_lines_saved_with_totals_and_last_price(self):
+        lines = [self.line(), self.line(qty=3, narx=20000)]
+        response = self.client.post('/buylist/bulk/', {"lines": lines}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['count'], 2)
+        self.assertEqual(BuyList.objects.count(), 2)
+        total = BuyListTotal.objects.get(depo=self.depo)
+        self.assertEqual((total.total, total.row_count), (Decimal('90000'), 2))
+        self.assertEqual(LastPrice.objects.get(item=self.item).price, 20000)
+
+        # Satır sayısı sorgu sayısını büyütmemeli
+        with CaptureQueriesContext(connection) as few:
+            self.client.post('/buylist/bulk/', lines[:1], format='json')
+        with CaptureQueriesContext(connection) as many:
+            self.client.post('/buylist/bulk/', [self.line() for _ in range(20)], format='json')
+        self.assertEqual(len(few), len(many))
+
+    def test_one_bad_line_saves_nothing(self):
+        lines = [self.line(), self.line(item=self.foreign_item.id), self.line(qty="ko'p")]
+        response = self.client.post('/buylist/bulk/', {"lines": lines}, format='json')
+        self.assertEqual(response.status_code, 400)
+        errors = {error['index']: error['errors'] for error in response.json()['errors']}
+        self.assertEqual(set(errors), {1, 2})
+        self.assertIn('item', errors[1])
+        self.assertIn('qty', errors[2])
+        self.assertFalse(BuyList.objects.exists())
+        self.assertFalse(BuyListTotal.objects.exists())
+
+    def test_empty_and_oversized_requests(self):
+        self.assertEqual(self.client.post('/buylist/bulk/', {"lines": []}, format='json').status_code, 400)
+        with patch('app.views.BuyListViewSet.BULK_MAX_LINES', 2):
+            response = self.client.post('/buylist/bulk/', [self.line()] * 3, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(BuyList.objects.exists())
+
+
+class BuyListTotalTests(TestCase):
+    """BuyListTotal artımlı tutulmalı: Decimal, bayat değerden delta yok, cascade toplu."""
+
+    def setUp(self):
+        self.company = Company.objects.create(name="Total Co")
+        self.user = CustomUser.objects.create(username="ali", company=self.company)
+        self.depo = Depo.objects.create(name="Asosiy", company=self.company, created_by=self.user)
+        self.other_depo = Depo.objects.create(name="Filial", company=self.company, created_by=self.user)
+        self.unit = Unit.objects.create(unit="kg", company=self.company)
+        self.money = MoneyType.objects.create(type="UZS", company=self.company)
+        self.item = Item.objects.create(name="Un", company=self.company)
+
+    def add(self, count=1, price=0.1, depo=None, item=None):
+        return BuyList.objects.create(company=self.company, item=item or self.item, item_count=count,
+                                      item_unit=self.unit, item_price=price, money_type=self.money,
+                                      depo=depo or self.depo)
+
+    def total(self, depo=None):
+        row = BuyListTotal.objects.filter(depo=depo or self.depo, money_type=self.money).first()
+        return (row.total, row.row_count) if row else (Decimal(0), 0)
+
+    def test_decimal_totals_and_moves(self):
+        rows = [self.add(count=3, price=0.1) for _ in range(10)]
+        self.assertEqual(self.total(), (Decimal('3'), 10))
+
+        rows[0].depo = self.other_depo
+        rows[0].save()
+        self.assertEqual(self.total(), (Decimal('2.7'), 9))
+        self.assertEqual(self.total(self.other_depo), (Decimal('0.3'), 1))
+
+        rows[1].delete()
+        BuyList.objects.filter(pk=rows[2].pk).delete()
+        self.assertEqual(self.total(), (Decimal('2.1'), 7))
+
+        incremental = self.total()
+        rebuild_totals(self.company.id)
+        self.assertEqual(self.total(), incremental)
+
+    def test_stale_instances_do_not_drift(self):
+        row = self.add(count=2, price=10)
+        first, second = BuyList.objects.get(pk=row.pk), BuyList.objects.get(pk=row.pk)
+        first.item_price = 20
+        first.save()
+        # second hâlâ price=10 görüyor — delta kilitli satırdaki 20'ye göre hesaplanmalı
+        second.item_price = 30
+        second.save()
+        self.assertEqual(self.total(), (Decimal('60'), 1))
+
+    def test_parent_cascades_are_bulk(self):
+        def delete_depo_queries(rows):
+            depo = Depo.objects.create(name=f"D{rows}", company=self.company, created_by=self.user)
+            for _ in range(rows):
+                self.add(price=5, depo=depo)
+            with CaptureQueriesContext(connection) as ctx:
+                depo.delete()
+            return len(ctx.captured_queries)
+
+        self.assertEqual(delete_depo_queries(3), delete_depo_queries(30))
+
+        flour = self.add(count=1, price=7)
+        sugar = Item.objects.create(name="Shakar", company=self.company)
+        self.add(count=2, price=4, item=sugar)
+        self.add(count=1, price=5, item=sugar)
+        sugar.delete()
+        self.assertEqual(self.total(), (Decimal('7'), 1))
+        self.assertEqual(LastPrice.objects.get(item=flour.item).price, 7)
+        self.assertFalse(LastPrice.objects.filter(item_id=sugar.id).exists())
+
+    def test_total_price_endpoint(self):
+        self.add(count=4, price=2.5)
+        client = APIClient()
+        client.force_authenticate(self.user)
+        data = client.get('/buylist/total_price/', {'depo': self.depo.id}).json()
+        self.assertNotIn('total', data)
+        self.assertEqual(data['by_currency'], {"UZS": 10.0})
+        self.assertEqual(client.get('/buylist/total_price/', {'depo': 'abc'}).status_code, 400)
+
+
+class LastPriceTests(TestCase):
+    """LastPrice her anahtarda en son alış: ekleme upsert, güncelleme/silmede yeniden hesap, prefill."""
+
+    def setUp(self):
+        indexes = patch.dict('app.matcher._indexes', clear=True)
+        indexes.start()
+        self.addCleanup(indexes.stop)
+        self.company = Company.objects.create(name="Price Co")
+        self.user = CustomUser.objects.create(username="ali", company=self.company)
+        self.depo = Depo.objects.create(name="Asosiy", company=self.company, created_by=self.user)
+        self.kg = Unit.objects.create(unit="kg", company=self.company)
+        self.qop = Unit.objects.create(unit="qop", company=self.company)
+        self.uzs = MoneyType.objects.create(type="UZS", company=self.company)
+        self.un = Item.objects.create(name="Un", company=self.company)
+
+    def buy(self, price, unit=None):
+        return BuyList.objects.create(company=self.company, item=self.un, item_count=1, item_unit=unit or self.kg,
+                                      item_price=price, money_type=self.uzs, depo=self.depo)
+
+    def price(self, unit=None):
+        row = LastPrice.objects.filter(item=self.un, unit=unit or self.kg).first()
+        return row and row.price
+
+    def test_upsert_update_and_refresh_on_delete(self):
+        first, second = self.buy(100), self.buy(120)
+        self.buy(9000, unit=self.qop)
+        self.assertEqual((self.price(), self.price(self.qop), LastPrice.objects.count()), (120, 9000, 2))
+
+        second.item_price = 130
+        second.save()
+        self.assertEqual(self.price(), 130)
+        # Eski satırı düzeltmek son fiyatı değiştirmez
+        first.item_price = 90
+        first.save()
+        self.assertEqual(self.price(), 130)
+
+        second.delete()
+        self.assertEqual(self.price(), 90)
+        BuyList.objects.filter(item_unit=self.kg).delete()
+        self.assertIsNone(self.price())
+        self.assertEqual(self.price(self.qop), 9000)
+
+    def test_endpoint_and_prefill(self):
+        self.buy(100)
+        self.buy(9000, unit=self.qop)
+        LastPrice.objects.filter(unit=self.kg).update(bought_at=timezone.now() - timedelta(days=1))
+        client = APIClient()
+        client.force_authenticate(self.user)
+        prices = client.get('/buylist/last_price/', {'item': str(self.un.id), 'unit': self.kg.id}).json()
+        self.assertEqual([(row['unit_id'], row['price']) for row in prices], [(self.kg.id, 100.0)])
+        self.assertEqual(client.get('/buylist/last_price/', {'item': "un"}).status_code, 400)
+
+        lines = [dict(SCANNED[0], price="0.0", warn=True, birlik="qop"),
+                 dict(SCANNED[0], price="0.0", warn=True, birlik="litr"),
+                 dict(SCANNED[0], price="5.0", warn=False)]
+        filled = client.post('/scan/match/', {"lines": lines}, format='json').json()["lines"]
+        self.assertEqual((filled[0]["price"], filled[0]["price_source"]), ("9000.0", "last_price"))
+        self.assertTrue(filled[0]["warn"])
+        # Birimi eşleşmeyen satıra fiyat yazılmaz, en yeni fiyat sadece ipucu; fiyatı olan satıra dokunulmaz
+        self.assertEqual((filled[1]["price"], filled[1]["last_price"]["unit_id"]), ("0.0", self.qop.id))
+        self.assertNotIn("price_source", filled[1])
+        self.assertEqual(filled[2]["price"], "5.0")
+
+
+class MalformedBackend:
+    # Sağlayıcı cevap verdi ama payload bozuk (choices yok)
+    def complete(self, messages, timeout, **options):
+        return {}["choices"]
+
+    def stream(self, messages, timeout, **options):
+        yield "{"
+        raise ValueError("bad chunk")
+
+
+class CircuitBreakerTests(TestCase):
+    """Half-open denemesi hangi hatayla biterse bitsin breaker asılı kalmamalı."""
+
+    def test_unexpected_error_in_trial_reopens_breaker(self):
+        breaker = CircuitBreaker(threshold=1, reset_timeout=0)
+        breaker.record_failure()
+        client = VisionClient(MalformedBackend(), deadline=5, max_retries=0, breaker=breaker)
+
+        for _ in range(2):
+            with self.assertRaises(KeyError):
+                client.complete([])
+            with self.assertRaises(ValueError):
+                list(client.stream([]))
+        # reset_timeout=0: her hata sonrası yeni deneme hakkı var
+        self.assertTrue(breaker.allow())
+
+    def test_open_breaker_rejects(self):
+        breaker = CircuitBreaker(threshold=1, reset_timeout=60)
+        client = VisionClient(MalformedBackend(), deadline=5, max_retries=0, breaker=breaker)
+        with self.assertRaises(KeyError):
+            client.complete([])
+        self.assertEqual(breaker.state, 'open')
+        with self.assertRaises(VisionUnavailable):
+            client.complete([])
+
+    @override_settings(GROQ_API_KEY=None, VISION_BACKEND='app.vision.GroqBackend')
+    def test_missing_api_key_is_503(self):
+        reset_vision_client()
+        self.addCleanup(reset_vision_client)
+        caches['scans'].clear()
+        client = APIClient()
+        client.force_authenticate(CustomUser.objects.create(username="ali", company=Company.objects.create(name="K")))
+        response = client.post('/scan/', {'image': jpeg_upload((90, 90, 90))})
+        self.assertEqual(response.status_code, 503)
+        self.assertIn("GROQ_API_KEY", response.json()['detail'])
+
+
+class KeysetPaginationTests(TestCase):
+    """Cursor sayfaları: (created_at, id) sırası, aynı created_at'te kayıp/tekrar yok, geri gidiş."""
+
+    def setUp(self):
+        company = Company.objects.create(name="Page Co")
+        self.user = CustomUser.objects.create(username="ali", company=company)
+        depo = Depo.objects.create(name="Asosiy", company=company, created_by=self.user)
+        unit = Unit.objects.create(unit="kg", company=company)
+        money = MoneyType.objects.create(type="UZS", company=company)
+        item = Item.objects.create(name="Un", company=company)
+        for n in range(11):
+            BuyList.objects.create(company=company, item=item, item_count=1, item_unit=unit,
+                                   item_price=n, money_type=money, depo=depo)
+        # 7 satır aynı created_at'te — sayfa sınırı bu grubun ortasına düşer
+        now = timezone.now()
+        ids = list(BuyList.objects.order_by('id').values_list('id', flat=True))
+        BuyList.objects.filter(id__in=ids[2:9]).update(created_at=now)
+        BuyList.objects.filter(id__in=ids[9:]).update(created_at=now + timedelta(seconds=1))
+        self.expected = list(BuyList.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_forward_and_reverse_pages(self):
+        pages, url = [], '/buylist/?page_size=3'
+        while url:
+            data = self.client.get(url).json()
+            pages.append([row['id'] for row in data['results']])
+            url = data['next']
+        self.assertEqual([i for page in pages for i in page], self.expected)
+        self.assertEqual([len(page) for page in pages], [3, 3, 3, 2])
+
+        # Son sayfadan previous ile başa dön — aynı sayfalar
+        back, url = [], data['previous']
+        while url:
+            data = self.client.get(url).json()
+            back.insert(0, [row['id'] for row in data['results']])
+            url = data['previous']
+        self.assertEqual(back, pages[:-1])
+
+    def test_invalid_cursor(self):
+        self.assertEqual(self.client.get('/buylist/?cursor=bad').status_code, 404)
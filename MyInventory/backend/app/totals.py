@@ -0,0 +1,104 @@
+# app/totals.py
+# BuyListTotal — (company, depo, money_type) bazında artımlı toplam.
+# Tutarlar Decimal: float toplamlarında her güncellemede biriken yuvarlama hatası olmasın.
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from .models import BuyList, BuyListTotal
+from .last_prices import refresh_last_prices
+
+AMOUNT_PLACES = Decimal('0.000001')
+
+
+def row_amount(item_count, item_price):
+    # str(float) en kısa gösterim — 0.1 * 3 tam 0.3 olur
+    return (Decimal(str(item_count)) * Decimal(str(item_price))).quantize(AMOUNT_PLACES)
+
+
+def apply_total_delta(company_id, depo_id, money_type_id, amount, count):
+    """Tek satırlık UPDATE; ekleme sırasında satır yoksa oluşturur."""
+    if not amount and not count:
+        return
+    key = dict(company_id=company_id, depo_id=depo_id, money_type_id=money_type_id)
+    updated = BuyListTotal.objects.filter(**key).update(
+        total=F('total') + amount,
+        row_count=F('row_count') + count,
+    )
+    if updated or count < 0:
+        # Silinen satırın özeti yoksa (depo/company cascade ile birlikte silinmiş) yapacak bir şey yok
+        return
+    try:
+        with transaction.atomic():
+            BuyListTotal.objects.create(total=amount, row_count=count, **key)
+    except IntegrityError:
+        BuyListTotal.objects.filter(**key).update(
+            total=F('total') + amount,
+            row_count=F('row_count') + count,
+        )
+
+
+def apply_bulk_totals(buylist_rows):
+    """bulk_create sinyal göndermez — eklenen satırları anahtar başına tek UPDATE ile işle."""
+    deltas = {}
+    for row in buylist_rows:
+        total, count = deltas.get(row.total_key(), (0, 0))
+        deltas[row.total_key()] = (total + row_amount(row.item_count, row.item_price), count + 1)
+    for (company_id, depo_id, money_type_id), (amount, count) in deltas.items():
+        apply_total_delta(company_id, depo_id, money_type_id, amount, count)
+
+
+def collect_deletion(queryset):
+    """
+    Silinecek BuyList satırlarını kilitleyip özet anahtarı başına (tutar, adet) ve LastPrice
+    anahtarlarını toplar. Satır başına sinyal yerine apply_deletion ile silmeden sonra
+    toplu işlenir. Çağıran transaction içinde olmalı.
+    """
+    deltas, price_keys = {}, set()
+    rows = queryset.order_by().select_for_update().values_list(
+        'company_id', 'depo_id', 'money_type_id', 'item_id', 'item_unit_id', 'item_count', 'item_price',
+    )
+    for company_id, depo_id, money_type_id, item_id, unit_id, count, price in rows.iterator(chunk_size=2000):
+        key = (company_id, depo_id, money_type_id)
+        total, n = deltas.get(key, (0, 0))
+        deltas[key] = (total + row_amount(count, price), n + 1)
+        price_keys.add((company_id, item_id, unit_id, money_type_id))
+    return deltas, price_keys
+
+
+def apply_deletion(collected):
+    deltas, price_keys = collected
+    for (company_id, depo_id, money_type_id), (amount, count) in deltas.items():
+        apply_total_delta(company_id, depo_id, money_type_id, -amount, -count)
+    refresh_last_prices(price_keys)
+
+
+def _bucket_totals(buylist):
+    totals = {}
+    rows = buylist.order_by().values_list('company_id', 'depo_id', 'money_type_id', 'item_count', 'item_price')
+    for company_id, depo_id, money_type_id, count, price in rows.iterator(chunk_size=2000):
+        key = (company_id, depo_id, money_type_id)
+        total, n = totals.get(key, (0, 0))
+        totals[key] = (total + row_amount(count, price), n + 1)
+    return totals
+
+
+def rebuild_totals(company_id=None):
+    """BuyListTotal'ı BuyList'ten baştan hesapla. Döndürür: yazılan satır sayısı."""
+    buylist = BuyList.objects.all()
+    totals = BuyListTotal.objects.all()
+    if company_id is not None:
+        buylist = buylist.filter(company_id=company_id)
+        totals = totals.filter(company_id=company_id)
+
+    with transaction.atomic():
+        rows = _bucket_totals(buylist)
+        totals.delete()
+        objs = BuyListTotal.objects.bulk_create(
+            [
+                BuyListTotal(company_id=company, depo_id=depo, money_type_id=money_type, total=total, row_count=n)
+                for (company, depo, money_type), (total, n) in rows.items()
+            ],
+            batch_size=1000,
+        )
+    return len(objs)
@@ -1,17 +1,23 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import DepoViewSet, ItemViewSet, UnitViewSet, MoneyTypeViewSet, BuyListViewSet,ExportBuyListAsExcelView
-from .scan_view import InvoiceScanView
+from .views import DepoViewSet, ItemViewSet, UnitViewSet, MoneyTypeViewSet, BuyListViewSet,ExportBuyListAsExcelView, ExportJobViewSet
+from .scan_view import InvoiceScanView, InvoiceScanStreamView, ScanJobCreateView, ScanJobDetailView, ScanMatchView, ScanCacheStatsView
 router = DefaultRouter()
 router.register(r'depolar', DepoViewSet, basename='depo')
 router.register(r'itemler', ItemViewSet, basename='item')
 router.register(r'unitler', UnitViewSet, basename='unit')
 router.register(r'moneytypes', MoneyTypeViewSet, basename='moneytype')
 router.register(r'buylist', BuyListViewSet, basename='buylist')
+router.register(r'export-jobs', ExportJobViewSet, basename='export-job')
 
 
 urlpatterns = [
     path('', include(router.urls)),
     path('scan/', InvoiceScanView.as_view(), name='invoice-scan'),
+    path('scan/stream/', InvoiceScanStreamView.as_view(), name='invoice-scan-stream'),
+    path('scan/jobs/', ScanJobCreateView.as_view(), name='scan-job-create'),
+    path('scan/jobs/<uuid:job_id>/', ScanJobDetailView.as_view(), name='scan-job-detail'),
+    path('scan/match/', ScanMatchView.as_view(), name='scan-match'),
+    path('scan/cache-stats/', ScanCacheStatsView.as_view(), name='scan-cache-stats'),
     path('export-buylist-as-excel/<int:depo_id>/', ExportBuyListAsExcelView.as_view(), name='export-buylist-as-excel'),
 ]
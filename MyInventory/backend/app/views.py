@@ -1,19 +1,27 @@
 # app/views.py
-from rest_framework import viewsets
+import os
+from rest_framework import viewsets, status, mixins
 from rest_framework.permissions import IsAuthenticated
-from .models import BuyList, Item, Unit, MoneyType, Depo
-from .serializers import BuyListSerializer, ItemSerializer, UnitSerializer, MoneyTypeSerializer, DepoSerializer,BuyListTotalSerializer
-from django.db.models import F, Sum, DecimalField,ExpressionWrapper
-from django.db.models.functions import Coalesce
+from .models import BuyList, BuyListTotal, LastPrice, Item, Unit, MoneyType, Depo, ExportJob
+from .serializers import BuyListSerializer, ItemSerializer, UnitSerializer, MoneyTypeSerializer, DepoSerializer,BuyListTotalSerializer, ExportJobSerializer, BuyListBulkLineSerializer, LastPriceSerializer
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from .scan_view import InvoiceScanView
-from .expoer_as_excel import export_buylist_as_excel
+from .expoer_as_excel import EXPORT_FORMATS, exceeds_sync_limit, get_export_queryset
+from .export_jobs import get_or_create_export_job
+from .totals import apply_bulk_totals
+from .last_prices import record_last_prices
+from django.db import transaction
+from django.http import FileResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
 from rest_framework.views import APIView
+from .pagination import KeysetCursorPagination, IdCursorPagination
 
 class ItemViewSet(viewsets.ModelViewSet):
     serializer_class = ItemSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = IdCursorPagination
 
     def get_queryset(self):
         if getattr(self, 'swagger_fake_view', False):
@@ -52,6 +60,7 @@ class MoneyTypeViewSet(viewsets.ModelViewSet):
 class DepoViewSet(viewsets.ModelViewSet):
     serializer_class = DepoSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetCursorPagination
 
     def get_queryset(self):
         if getattr(self, 'swagger_fake_view', False):
@@ -65,6 +74,7 @@ class DepoViewSet(viewsets.ModelViewSet):
 class BuyListViewSet(viewsets.ModelViewSet):
     serializer_class = BuyListSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetCursorPagination
 
     def get_queryset(self):
         if getattr(self, 'swagger_fake_view', False):
@@ -74,27 +84,170 @@ class BuyListViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(company=self.request.user.company)
 
-    @action(detail=False, methods=['get'])
-    def total_price(self, request):
-        queryset = self.get_queryset()
+    BULK_MAX_LINES = 500
+
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def bulk(self, request):
+        """
+        Tarama sonucu satırlarını tek seferde kaydeder:
+        [{"item": 1, "qty": 2, "narx": 15000, "unit": 1, "moneytype": 1, "depolar": 1}, ...]
+        veya {"lines": [...]}. Hatalı satır varsa hiçbir satır kaydedilmez.
+        """
+        lines = request.data if isinstance(request.data, list) else request.data.get('lines')
+        if not isinstance(lines, list) or not lines:
+            return Response({"detail": "Satırlar listesi ('lines') gerekli."}, status=status.HTTP_400_BAD_REQUEST)
+        if len(lines) > self.BULK_MAX_LINES:
+            return Response(
+                {"detail": f"Bir seferde en fazla {self.BULK_MAX_LINES} satır gönderilebilir."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
 
-        total_expression = ExpressionWrapper(
-            F('item_count') * F('item_price'),
-            output_field=DecimalField(max_digits=18, decimal_places=2)
+        # Tüm satırların FK id'leri için model başına tek sorgu
+        company = request.user.company
+        wanted = {field: set() for field in BuyListBulkLineSerializer.RELATED}
+        for line in lines:
+            if isinstance(line, dict):
+                for field in wanted:
+                    try:
+                        wanted[field].add(int(line.get(field)))
+                    except (TypeError, ValueError):
+                        pass
+        models_by_field = {'item': Item, 'unit': Unit, 'moneytype': MoneyType, 'depolar': Depo}
+        lookups = {
+            field: set(model.objects.filter(company=company, id__in=wanted[field]).values_list('id', flat=True))
+            for field, model in models_by_field.items()
+        }
+
+        valid, errors = [], []
+        for index, line in enumerate(lines):
+            serializer = BuyListBulkLineSerializer(data=line, context={'lookups': lookups})
+            if serializer.is_valid():
+                valid.append(serializer)
+            else:
+                errors.append({"index": index, "errors": serializer.errors})
+        if errors:
+            return Response({"errors": errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        with transaction.atomic():
+            # bulk_create sinyal göndermez — BuyListTotal ve LastPrice burada güncellenir
+            created = BuyList.objects.bulk_create([s.to_buylist(company) for s in valid])
+            apply_bulk_totals(created)
+            record_last_prices(created)
+
+        return Response(
+            {"created": BuyListSerializer(created, many=True).data, "count": len(created)},
+            status=status.HTTP_201_CREATED
         )
 
-        total = queryset.aggregate(
-            total=Coalesce(
-                Sum(total_expression),
-                0
-            )
-        )
+    @action(detail=False, methods=['get'])
+    def total_price(self, request):
+        # BuyListTotal özetinden okunur (depo x para birimi satırı) — BuyList'te SUM yok
+        totals = BuyListTotal.objects.filter(company=request.user.company).select_related('money_type')
+        depo_id = request.query_params.get('depo')
+        if depo_id:
+            try:
+                totals = totals.filter(depo_id=int(depo_id))
+            except ValueError:
+                return Response({"detail": "depo son bo'lishi kerak."}, status=status.HTTP_400_BAD_REQUEST)
+        totals = list(totals)
+
+        by_currency = {}
+        for t in totals:
+            by_currency[t.money_type.type] = by_currency.get(t.money_type.type, 0) + t.total
+
+        # Farklı para birimleri toplanmaz — toplam sadece para birimi başına
+        return Response({
+            "by_currency": by_currency,
+            "totals": BuyListTotalSerializer(totals, many=True).data,
+        })
 
-        return Response(total)
+    @action(detail=False, methods=['get'])
+    def last_price(self, request):
+        """
+        ?item=3,7[&unit=1][&money_type=2] — LastPrice tablosundan tek sorgu, en yeni önce.
+        """
+        try:
+            item_ids = [int(i) for i in request.query_params.get('item', '').split(',') if i.strip()]
+            extra = {
+                f"{param}_id": int(request.query_params[param])
+                for param in ('unit', 'money_type') if request.query_params.get(param)
+            }
+        except ValueError:
+            return Response({"detail": "item, unit, money_type sonlar bo'lishi kerak."}, status=status.HTTP_400_BAD_REQUEST)
+        if not item_ids:
+            return Response({"detail": "'item' parametri kerak."}, status=status.HTTP_400_BAD_REQUEST)
+
+        prices = LastPrice.objects.filter(
+            company=request.user.company, item_id__in=item_ids, **extra
+        ).order_by('item_id', '-bought_at')
+        return Response(LastPriceSerializer(prices, many=True).data)
 
 
 class ExportBuyListAsExcelView(APIView):
     permission_classes = [IsAuthenticated]
 
+    def perform_content_negotiation(self, request, force=False):
+        # ?format=csv DRF'in URL format override'ı ile çakışıyor — renderer aramadan geç
+        return super().perform_content_negotiation(request, force=True)
+
     def get(self, request, depo_id):
-        return export_buylist_as_excel(request, depo_id)    
\ No newline at end of file
+        # ?format=xlsx (varsayılan) | csv | ndjson
+        fmt = request.query_params.get('format', 'xlsx')
+        export = EXPORT_FORMATS.get(fmt)
+        if export is None:
+            return Response(
+                {"detail": f"Format faqat: {', '.join(EXPORT_FORMATS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if fmt == 'xlsx' and exceeds_sync_limit(get_export_queryset(request, depo_id)):
+            # Büyük xlsx istek içinde hazırlanmaz — arka plan işi açılır, istemci iş durumunu izler
+            depo = get_object_or_404(Depo, pk=depo_id, company=request.user.company)
+            job, _ = get_or_create_export_job(request.user, depo, fmt, request.query_params)
+            data = ExportJobSerializer(job, context={'request': request}).data
+            response = Response(data, status=status.HTTP_202_ACCEPTED)
+            response['Location'] = request.build_absolute_uri(reverse('export-job-detail', args=[job.id]))
+            return response
+        return export(request, depo_id)
+
+
+class ExportJobViewSet(mixins.CreateModelMixin,
+                       mixins.RetrieveModelMixin,
+                       mixins.ListModelMixin,
+                       viewsets.GenericViewSet):
+    """
+    POST   /export-jobs/               {"depo": 1, "format": "xlsx", "filters": {...}}
+    GET    /export-jobs/<id>/          status, rows_done / rows_total, download_url
+    GET    /export-jobs/<id>/download/
+    İşleri `python manage.py run_export_worker` süreci çalıştırır.
+    """
+    serializer_class = ExportJobSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = KeysetCursorPagination
+
+    def get_queryset(self):
+        if getattr(self, 'swagger_fake_view', False):
+            return ExportJob.objects.none()
+        return ExportJob.objects.filter(company=self.request.user.company)
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        job, created = get_or_create_export_job(
+            request.user,
+            serializer.validated_data['depo'],
+            serializer.validated_data.get('format', 'xlsx'),
+            serializer.validated_data.get('filters', {}),
+        )
+        # Aynı iş zaten kuyruktaysa yeni iş açılmaz, mevcut iş döner
+        return Response(
+            self.get_serializer(job).data,
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK
+        )
+
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        job = self.get_object()
+        if job.status != 'done' or not job.file:
+            return Response({"detail": "Export hali tayyor emas."}, status=status.HTTP_409_CONFLICT)
+        return FileResponse(job.file.open('rb'), as_attachment=True, filename=os.path.basename(job.file.name))
+
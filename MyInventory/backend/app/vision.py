@@ -0,0 +1,261 @@
+# app/vision.py
+# Vision model sağlayıcısı için süreç genelinde tek istemci:
+#   - keep-alive bağlantı havuzu (her istekte yeni Groq()/TLS handshake yok)
+#   - çağrı başına deadline, jitter'lı sınırlı retry
+#   - sağlayıcı bozukken hızlıca hata dönen circuit breaker
+# Backend settings.VISION_BACKEND ile değiştirilebilir; VISION_BASE_URL ile
+# GroqBackend yerel bir stand-in sunucuya yönlendirilebilir (benchmarks/vision_standin_server.py).
+import random
+import threading
+import time
+
+import httpx
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+class VisionError(Exception):
+    def __init__(self, message, retryable=False):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class VisionUnavailable(VisionError):
+    """Circuit açık ya da deadline doldu — sağlayıcı şu an kullanılamıyor."""
+
+
+class VisionNotConfigured(VisionUnavailable):
+    """Sağlayıcı anahtarı (GROQ_API_KEY) verilmemiş."""
+
+
+class VisionBackend:
+    """
+    Backend arayüzü. complete() modelin metin cevabını döndürür; hata durumunda
+    VisionError fırlatır (geçici hatalarda retryable=True).
+    """
+
+    def complete(self, messages, timeout, **options):
+        raise NotImplementedError
+
+    def stream(self, messages, timeout, **options):
+        """Cevabı geldikçe metin parçaları olarak yield eder."""
+        raise NotImplementedError
+
+
+class GroqBackend(VisionBackend):
+
+    def __init__(self):
+        if not settings.GROQ_API_KEY:
+            raise VisionNotConfigured("GROQ_API_KEY is not set")
+        from groq import Groq
+        self.model = settings.VISION_MODEL
+        self.http_client = httpx.Client(
+            limits=httpx.Limits(
+                max_connections=settings.VISION_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.VISION_MAX_CONNECTIONS,
+            ),
+            timeout=settings.VISION_TIMEOUT,
+        )
+        self.client = Groq(
+            api_key=settings.GROQ_API_KEY,
+            base_url=settings.VISION_BASE_URL or None,
+            max_retries=0,   # retry VisionClient'ta
+            http_client=self.http_client,
+        )
+
+    def complete(self, messages, timeout, **options):
+        import groq
+        try:
+            completion = self.client.chat.completions.create(
+                model=self.model, messages=messages, timeout=timeout, **options
+            )
+        except (groq.APITimeoutError, groq.APIConnectionError, groq.RateLimitError, groq.InternalServerError) as e:
+            raise VisionError(str(e), retryable=True) from e
+        except groq.GroqError as e:
+            raise VisionError(str(e)) from e
+        return completion.choices[0].message.content
+
+    def stream(self, messages, timeout, **options):
+        import groq
+        try:
+            with self.client.chat.completions.create(
+                model=self.model, messages=messages, timeout=timeout, stream=True, **options
+            ) as chunks:
+                for chunk in chunks:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+        except (groq.APITimeoutError, groq.APIConnectionError, groq.RateLimitError, groq.InternalServerError) as e:
+            raise VisionError(str(e), retryable=True) from e
+        except groq.GroqError as e:
+            raise VisionError(str(e)) from e
+
+
+class CircuitBreaker:
+    """
+    Art arda `threshold` hata → `reset_timeout` saniye boyunca açık (çağrı yapılmaz).
+    Süre dolunca tek bir deneme çağrısına izin verilir (half-open).
+    """
+
+    def __init__(self, threshold, reset_timeout):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial_running = False
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state()
+
+    def _state(self):
+        if self._opened_at is None:
+            return 'closed'
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return 'half-open'
+        return 'open'
+
+    def allow(self):
+        with self._lock:
+            state = self._state()
+            if state == 'closed':
+                return True
+            if state == 'half-open' and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial_running or self._failures >= self.threshold:
+                self._opened_at = time.monotonic()
+            self._trial_running = False
+
+
+class VisionClient:
+
+    def __init__(self, backend, deadline, max_retries, breaker, backoff_base=0.5, backoff_cap=4.0):
+        self.backend = backend
+        self.deadline = deadline
+        self.max_retries = max_retries
+        self.breaker = breaker
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+
+    def complete(self, messages, **options):
+        deadline = time.monotonic() + self.deadline
+        last_error = None
+
+        for attempt in range(self.max_retries + 1):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            if not self.breaker.allow():
+                raise VisionUnavailable("Vision provider circuit is open")
+            settled = False
+            try:
+                result = self.backend.complete(messages, timeout=remaining, **options)
+            except VisionError as e:
+                settled = True
+                if not e.retryable:
+                    # Sağlayıcı cevap verdi (ör. 400) — breaker için sağlıklı sayılır
+                    self.breaker.record_success()
+                    raise
+                self.breaker.record_failure()
+                last_error = e
+            else:
+                settled = True
+                self.breaker.record_success()
+                return result
+            finally:
+                if not settled:
+                    # Beklenmeyen hata (bozuk payload, JSON vb.) — half-open denemesi asılı kalmasın
+                    self.breaker.record_failure()
+
+            # Full jitter: 0 .. min(cap, base * 2^attempt), deadline'ı aşmadan
+            if attempt < self.max_retries:
+                delay = random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+                time.sleep(max(0, min(delay, deadline - time.monotonic())))
+
+        raise VisionUnavailable(f"Vision provider failed: {last_error or 'deadline exceeded'}")
+
+    def stream(self, messages, **options):
+        """
+        complete() ile aynı deadline/retry/breaker; ancak ilk parça geldikten sonra
+        retry yapılmaz (frontend o parçaları zaten gördü) — hata olduğu gibi fırlar.
+        """
+        deadline = time.monotonic() + self.deadline
+        last_error = None
+
+        for attempt in range(self.max_retries + 1):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            if not self.breaker.allow():
+                raise VisionUnavailable("Vision provider circuit is open")
+            started = settled = False
+            try:
+                for text in self.backend.stream(messages, timeout=remaining, **options):
+                    started = True
+                    yield text
+            except VisionError as e:
+                settled = True
+                if not e.retryable:
+                    self.breaker.record_success()
+                    raise
+                self.breaker.record_failure()
+                if started:
+                    raise
+                last_error = e
+            except GeneratorExit:
+                # İstemci bağlantıyı kapattı — sağlayıcının suçu değil
+                settled = True
+                self.breaker.record_success()
+                raise
+            else:
+                settled = True
+                self.breaker.record_success()
+                return
+            finally:
+                if not settled:
+                    self.breaker.record_failure()
+
+            if attempt < self.max_retries:
+                delay = random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+                time.sleep(max(0, min(delay, deadline - time.monotonic())))
+
+        raise VisionUnavailable(f"Vision provider failed: {last_error or 'deadline exceeded'}")
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_vision_client():
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                backend = import_string(settings.VISION_BACKEND)()
+                _client = VisionClient(
+                    backend,
+                    deadline=settings.VISION_TIMEOUT,
+                    max_retries=settings.VISION_MAX_RETRIES,
+                    breaker=CircuitBreaker(settings.VISION_BREAKER_THRESHOLD, settings.VISION_BREAKER_RESET),
+                )
+    return _client
+
+
+def reset_vision_client():
+    # Testler / settings değişikliği için
+    global _client
+    with _client_lock:
+        _client = None
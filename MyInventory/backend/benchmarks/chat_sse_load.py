@@ -0,0 +1,162 @@
+# Chat SSE yük testi — tek uvicorn worker'ı kaç boşta bağlantı tutabiliyor ve
+# yeni bir mesaj hepsine ne kadar sürede ulaşıyor.
+#
+#   python benchmarks/chat_sse_load.py --connections 2000
+#   python benchmarks/chat_sse_load.py --connections 5000 --hold 60
+#
+# Geçici bir sqlite veritabanı üzerinde `uvicorn config.asgi:application` (tek worker)
+# başlatır, N SSE bağlantısı açar, sunucunun RSS'ini ölçer, sonra HTTP üzerinden bir
+# direct-message gönderip fan-out gecikmesini ölçer. Gerçek DB'ye dokunmaz.
+
+import argparse
+import asyncio
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+
+def raise_fd_limit():
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    return hard
+
+
+def server_stats(pid):
+    # Linux /proc: RSS (MB) ve thread sayısı
+    stats = {}
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            stats[key] = value.split()[0] if value.split() else ""
+    return f"RSS {int(stats['VmRSS']) / 1024:.1f} MB, {stats['Threads']} threads"
+
+
+def prepare_database(env):
+    # migrate + iki kullanıcı, token'lar ve bir sohbet
+    subprocess.run([sys.executable, "manage.py", "migrate", "-v", "0"], cwd=BACKEND_DIR, env=env, check=True)
+    script = (
+        "import django; django.setup()\n"
+        "from rest_framework.authtoken.models import Token\n"
+        "from user_app.models import Company, CustomUser\n"
+        "c = Company.objects.create(name='Load')\n"
+        "a = CustomUser.objects.create(username='listener', company=c)\n"
+        "b = CustomUser.objects.create(username='sender', company=c)\n"
+        "print(Token.objects.create(user=a).key, Token.objects.create(user=b).key, a.id)\n"
+    )
+    out = subprocess.run([sys.executable, "-c", script], cwd=BACKEND_DIR, env=env, check=True,
+                         capture_output=True, text=True).stdout.split()
+    return out[0], out[1], int(out[2])
+
+
+class SSEClient:
+
+    def __init__(self, host, port, path, token):
+        self.host, self.port, self.path, self.token = host, port, path, token
+        self.connected = asyncio.Event()
+        self.message_at = None
+        self.reader = self.writer = None
+
+    async def run(self):
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        self.writer.write(
+            f"GET {self.path} HTTP/1.1\r\nHost: {self.host}\r\nAccept: text/event-stream\r\n"
+            f"Authorization: Token {self.token}\r\n\r\n".encode()
+        )
+        await self.writer.drain()
+        while True:
+            line = await self.reader.readline()
+            if not line:
+                return
+            if line.startswith(b"event: unread_count"):
+                self.connected.set()
+            elif line.startswith(b"event: message") and self.message_at is None:
+                self.message_at = time.perf_counter()
+
+    def close(self):
+        if self.writer:
+            self.writer.close()
+
+
+def send_message(base_url, token, receiver_id):
+    request = urllib.request.Request(
+        f"{base_url}/user_app/messages/direct-message/",
+        data=json.dumps({"receiver_id": receiver_id, "text": "load test"}).encode(),
+        headers={"Authorization": f"Token {token}", "Content-Type": "application/json"},
+    )
+    with urllib.request.urlopen(request) as response:
+        return response.status
+
+
+async def load(args, port, listener_token, sender_token, listener_id, server_pid):
+    clients = [SSEClient("127.0.0.1", port, "/user_app/events/", listener_token) for _ in range(args.connections)]
+    tasks = []
+    started = time.perf_counter()
+    for start in range(0, len(clients), args.ramp):
+        batch = clients[start:start + args.ramp]
+        tasks += [asyncio.create_task(c.run()) for c in batch]
+        await asyncio.wait([asyncio.create_task(c.connected.wait()) for c in batch], timeout=30)
+    connected = sum(c.connected.is_set() for c in clients)
+    print(f"connected: {connected}/{args.connections} in {time.perf_counter() - started:.1f}s")
+    print(f"server with {connected} idle connections: {server_stats(server_pid)}")
+
+    await asyncio.sleep(args.hold)
+    alive = sum(not t.done() for t in tasks)
+    print(f"still open after {args.hold}s idle: {alive}")
+
+    sent_at = time.perf_counter()
+    status = await asyncio.to_thread(send_message, f"http://127.0.0.1:{port}", sender_token, listener_id)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline and any(c.message_at is None for c in clients if c.connected.is_set()):
+        await asyncio.sleep(0.05)
+    latencies = sorted((c.message_at - sent_at) * 1000 for c in clients if c.message_at is not None)
+    print(f"direct-message HTTP {status}; delivered to {len(latencies)}/{connected}")
+    if latencies:
+        print(f"fan-out latency ms: p50={latencies[len(latencies) // 2]:.0f} "
+              f"p99={latencies[int(len(latencies) * 0.99) - 1]:.0f} max={latencies[-1]:.0f}")
+
+    for c in clients:
+        c.close()
+    for t in tasks:
+        t.cancel()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--connections', type=int, default=1000)
+    parser.add_argument('--hold', type=float, default=10, help="Boşta bekleme süresi (saniye)")
+    parser.add_argument('--ramp', type=int, default=200, help="Aynı anda açılan bağlantı sayısı")
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+
+    print(f"fd limit: {raise_fd_limit()}")
+    tmpdir = tempfile.mkdtemp()
+    env = dict(os.environ)
+    env.setdefault('FIELD_ENCRYPTION_KEY', 'V3jSZRU41-AUDOph-HQ5vhuXZHGKAZ_aXNRNZir9N0s=')
+    env.update(DJANGO_SETTINGS_MODULE='config.settings', DATABASE_URL=f"sqlite:///{tmpdir}/load.sqlite3",
+               CHAT_EVENTS_HEARTBEAT='15', CHAT_BROKER='user_app.realtime.LocalBroker')   # tek süreç
+    listener_token, sender_token, listener_id = prepare_database(env)
+
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "config.asgi:application", "--port", str(args.port),
+         "--log-level", "warning", "--backlog", "4096"],
+        cwd=BACKEND_DIR, env=env,
+    )
+    try:
+        time.sleep(3)
+        print(f"server idle: {server_stats(server.pid)}")
+        asyncio.run(load(args, args.port, listener_token, sender_token, listener_id, server.pid))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == '__main__':
+    main()
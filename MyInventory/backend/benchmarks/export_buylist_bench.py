@@ -0,0 +1,107 @@
+# BuyList Excel export benchmark — satır/saniye ve peak RSS
+#
+#   python benchmarks/export_buylist_bench.py --rows 200000
+#   python benchmarks/export_buylist_bench.py --rows 200000 --legacy   # eski in-memory Workbook
+#
+# Geçici bir test veritabanı oluşturur (gerçek DB'ye dokunmaz). Peak RSS süreç
+# genelinde ölçüldüğü için iki mod ayrı süreçlerde çalıştırılmalı.
+
+import argparse
+import os
+import resource
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+os.environ.setdefault('FIELD_ENCRYPTION_KEY', 'V3jSZRU41-AUDOph-HQ5vhuXZHGKAZ_aXNRNZir9N0s=')
+
+import django
+django.setup()
+
+from django.db import connection
+from django.test.utils import setup_test_environment
+
+
+def peak_rss_mb():
+    # Linux'ta ru_maxrss KB cinsinden
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def seed(rows):
+    from user_app.models import Company, CustomUser
+    from app.models import BuyList, Item, Unit, MoneyType, Depo
+
+    company = Company.objects.create(name="Bench")
+    user = CustomUser.objects.create(username="bench", company=company)
+    depo = Depo.objects.create(name="Bench depo", company=company, created_by=user)
+    unit = Unit.objects.create(unit="dona", company=company)
+    money = MoneyType.objects.create(type="UZS", company=company)
+    items = Item.objects.bulk_create([Item(name=f"Mahsulot {i}", company=company) for i in range(500)])
+
+    batch = []
+    for n in range(rows):
+        batch.append(BuyList(
+            company=company, item=items[n % len(items)], item_count=n % 17 + 1,
+            item_unit=unit, item_price=1000 + n, money_type=money, depo=depo,
+        ))
+        if len(batch) == 5000:
+            # bulk_create sinyal göndermez; benchmark için özet tabloya gerek yok
+            BuyList.objects.bulk_create(batch)
+            batch = []
+    BuyList.objects.bulk_create(batch)
+    return company, depo
+
+
+def legacy_export(queryset, fileobj):
+    from openpyxl import Workbook
+    wb = Workbook()
+    ws = wb.active
+    ws.append(["ID", "Item", "Miktar", "Birim", "Narx", "Para Birimi", "Sana"])
+    count = 0
+    for b in queryset.select_related('item', 'item_unit', 'money_type'):
+        ws.append([b.id, b.item.name, float(b.item_count), b.item_unit.unit,
+                   float(b.item_price), b.money_type.type, b.created_at.strftime("%Y-%m-%d")])
+        count += 1
+    wb.save(fileobj)
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=50000)
+    parser.add_argument('--legacy', action='store_true')
+    args = parser.parse_args()
+
+    from app.models import BuyList
+    from app.expoer_as_excel import buylist_export_rows, write_buylist_xlsx
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        company, depo = seed(args.rows)
+        queryset = BuyList.objects.filter(company=company, depo=depo).order_by('created_at', 'id')
+        rss_before = peak_rss_mb()
+
+        with tempfile.TemporaryFile() as tmp:
+            started = time.perf_counter()
+            if args.legacy:
+                count = legacy_export(queryset, tmp)
+            else:
+                count = write_buylist_xlsx(buylist_export_rows(queryset), tmp)
+            elapsed = time.perf_counter() - started
+            size = tmp.tell()
+
+        print(f"mode:        {'legacy' if args.legacy else 'write-only'}")
+        print(f"rows:        {count}")
+        print(f"seconds:     {elapsed:.2f}")
+        print(f"rows/sec:    {count / elapsed:,.0f}")
+        print(f"file size:   {size / 1024 / 1024:.1f} MB")
+        print(f"peak RSS:    {rss_before:.0f} MB before export -> {peak_rss_mb():.0f} MB after")
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+# Mesaj serialize benchmark — şifreli Message.text ile mesaj/saniye
+#
+#   python benchmarks/message_decrypt_bench.py --messages 20000
+#   python benchmarks/message_decrypt_bench.py --messages 20000 --text-length 400
+#
+# Sabit FIELD_ENCRYPTION_KEY ile geçici bir test veritabanı oluşturur (gerçek DB'ye
+# dokunmaz) ve aynı mesajları üç yoldan serialize eder:
+#   eager  — eski yol: her satır yüklenirken from_db_value'da çözülür
+#   lazy   — with_ciphertext: ham ciphertext, çözme serializer'da (LRU boş)
+#   warm   — aynı okuma tekrar, LRU dolu (sohbeti tekrar açan kullanıcı)
+# Ayrıca sadece metadata isteyen okuma (text render edilmez) için eager vs lazy.
+
+import argparse
+import gc
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+os.environ['FIELD_ENCRYPTION_KEY'] = 'V3jSZRU41-AUDOph-HQ5vhuXZHGKAZ_aXNRNZir9N0s='
+os.environ.setdefault('MESSAGE_TEXT_CACHE_SIZE', '50000')
+
+import django
+django.setup()
+
+from django.db import connection
+from django.test.utils import setup_test_environment
+
+
+def seed(count, text_length):
+    from user_app.models import Company, Conversation, CustomUser, Message
+
+    company = Company.objects.create(name="Bench")
+    users = [CustomUser.objects.create(username=f"bench{i}", company=company) for i in range(2)]
+    conversation = Conversation.objects.create()
+    conversation.participants.set(users)
+    body = ("Salom, bugun omborga yangi mahsulot keldi. " * 20)[:text_length]
+    batch = [Message(conversation=conversation, sender=users[n % 2], text=f"{n} {body}") for n in range(count)]
+    # bulk_create sinyal göndermez; get_db_prep_save yine her satırı şifreler
+    Message.objects.bulk_create(batch, batch_size=2000)
+    return conversation
+
+
+def timed(label, count, fn, repeat, before=None):
+    # En iyi `repeat` koşu; `before` her koşudan önce (ör. cache temizliği), süreye dahil değil
+    elapsed = float('inf')
+    for _ in range(repeat):
+        if before:
+            before()
+        gc.collect()
+        started = time.perf_counter()
+        fn()
+        elapsed = min(elapsed, time.perf_counter() - started)
+    print(f"{label:<28} {elapsed:7.3f}s  {count / elapsed:10.0f} msg/s")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--messages', type=int, default=20000)
+    parser.add_argument('--text-length', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    from user_app.models import Message
+    from user_app.message_text import plaintext_cache, with_ciphertext
+    from user_app.serializers import MessageSerializer
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        conversation = seed(args.messages, args.text_length)
+        base = Message.objects.filter(conversation=conversation).select_related('sender').order_by('id')
+        n = args.messages
+
+        def serialize(queryset):
+            return MessageSerializer(list(queryset.all()), many=True).data
+
+        def metadata(queryset):
+            return [(m.id, m.sender_id, m.created_at) for m in queryset.all()]
+
+        r = args.repeat
+        eager = timed("eager (before)", n, lambda: serialize(base), r)
+        lazy = timed("lazy, cold cache", n, lambda: serialize(with_ciphertext(base)), r, before=plaintext_cache.clear)
+        warm = timed("lazy, warm cache", n, lambda: serialize(with_ciphertext(base)), r)
+        print(f"cache: {len(plaintext_cache)} entries")
+        print(f"speedup: cold {eager / lazy:.2f}x, warm {eager / warm:.2f}x")
+
+        meta_eager = timed("metadata only, eager", n, lambda: metadata(base), r)
+        meta_lazy = timed("metadata only, lazy", n, lambda: metadata(with_ciphertext(base)), r)
+        print(f"speedup: metadata {meta_eager / meta_lazy:.2f}x")
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+# Fatura resmi ön işleme benchmark'ı — payload boyutu, hazırlama süresi, bellek
+#
+#   python benchmarks/scan_preprocess_bench.py
+#   python benchmarks/scan_preprocess_bench.py --image fatura.jpg
+#   python benchmarks/scan_preprocess_bench.py --image fatura.jpg --live   # gerçek model gecikmesi
+#
+# --image verilmezse 4032x3024 sentetik bir "telefon fotoğrafı" üretilir.
+
+import argparse
+import base64
+import io
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+os.environ.setdefault('FIELD_ENCRYPTION_KEY', 'V3jSZRU41-AUDOph-HQ5vhuXZHGKAZ_aXNRNZir9N0s=')
+
+import django
+django.setup()
+
+from PIL import Image, ImageDraw
+
+
+def synthetic_photo():
+    # Gürültülü kağıt + satır satır yazı: telefon fotoğrafı kadar iyi sıkışmayan bir resim
+    width, height = 4032, 3024
+    image = Image.effect_noise((width, height), 40).convert('RGB')
+    draw = ImageDraw.Draw(image)
+    for row in range(60):
+        y = 100 + row * 45
+        draw.text((200, y), f"Mahsulot {row:02d}   {row % 7 + 1} dona   {15000 + row * 250:,} so'm", fill=(20, 20, 20))
+    out = io.BytesIO()
+    image.save(out, format='JPEG', quality=95)
+    return out.getvalue()
+
+
+def legacy_payload(raw):
+    image_data = base64.standard_b64encode(raw).decode("utf-8")
+    return f"data:image/jpeg;base64,{image_data}"
+
+
+def new_payload(raw):
+    from app.scan_preprocess import prepare_image, build_data_url
+    image_bytes, media_type = prepare_image(io.BytesIO(raw))
+    return build_data_url(image_bytes, media_type)
+
+
+def measure(fn, raw, repeat):
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        payload = fn(raw)
+        times.append(time.perf_counter() - started)
+    tracemalloc.start()
+    fn(raw)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return payload, statistics.median(times), peak
+
+
+def live_latency(raw, repeat):
+    from app.invoice_scan import call_vision_model
+    from app.scan_preprocess import prepare_image
+    prepared_bytes, media_type = prepare_image(io.BytesIO(raw))
+    result = {}
+    for name, (data, mt) in (('legacy', (raw, 'image/jpeg')), ('new', (prepared_bytes, media_type))):
+        times = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            call_vision_model(data, mt)
+            times.append(time.perf_counter() - started)
+        result[name] = statistics.median(times)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--image', help="Gerçek bir fatura fotoğrafı")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--live', action='store_true', help="Groq'a gerçek istek atıp gecikmeyi ölç")
+    args = parser.parse_args()
+
+    if args.image:
+        with open(args.image, 'rb') as f:
+            raw = f.read()
+    else:
+        raw = synthetic_photo()
+
+    legacy, legacy_time, legacy_peak = measure(legacy_payload, raw, args.repeat)
+    new, new_time, new_peak = measure(new_payload, raw, args.repeat)
+
+    mb = 1024 * 1024
+    print(f"upload:            {len(raw) / mb:.2f} MB")
+    print(f"legacy payload:    {len(legacy) / mb:.2f} MB  prep {legacy_time * 1000:.0f} ms  peak alloc {legacy_peak / mb:.1f} MB")
+    print(f"new payload:       {len(new) / mb:.2f} MB  prep {new_time * 1000:.0f} ms  peak alloc {new_peak / mb:.1f} MB")
+    print(f"bytes saved:       {(len(legacy) - len(new)) / mb:.2f} MB ({100 * (1 - len(new) / len(legacy)):.1f}%)")
+
+    if args.live:
+        latency = live_latency(raw, args.repeat)
+        print(f"model latency:     legacy {latency['legacy']:.2f} s -> new {latency['new']:.2f} s")
+
+
+if __name__ == '__main__':
+    main()
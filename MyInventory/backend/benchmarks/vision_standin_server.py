@@ -0,0 +1,104 @@
+# Yerel vision stand-in sunucusu — Groq/OpenAI chat.completions cevabını taklit eder.
+# Yük testleri ve testlerde gerçek API yerine kullanılır:
+#
+#   python benchmarks/vision_standin_server.py --port 9100 --delay 2 --fail-rate 0.1
+#   python benchmarks/vision_standin_server.py --chunk-delay 0.05   # "stream": true için token hızı
+#   GROQ_API_KEY=standin VISION_BASE_URL=http://127.0.0.1:9100 python manage.py runserver
+#
+# GroqBackend istekleri <base_url>/openai/v1/chat/completions adresine gönderir.
+
+import argparse
+import json
+import random
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CANNED = {"urunler": [
+    {"ad": "Shakar", "adet": 2, "birlik": "kg", "birim_fiyat": 14000.0},
+    {"ad": "Un", "adet": 1, "birlik": "qop", "birim_fiyat": 185000.0},
+    {"ad": "Choy", "adet": 3, "birlik": "dona", "birim_fiyat": 0},
+]}
+
+
+class Handler(BaseHTTPRequestHandler):
+    delay = 0.0
+    fail_rate = 0.0
+    chunk_delay = 0.0
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        time.sleep(self.delay)
+
+        if random.random() < self.fail_rate:
+            return self._send_json(500, {"error": {"message": "stand-in failure", "type": "server_error"}})
+        if not self.path.endswith("/chat/completions"):
+            return self._send_json(404, {"error": {"message": "not found"}})
+
+        if request.get("stream"):
+            return self._send_stream(request)
+
+        self._send_json(200, {
+            "id": "standin",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "standin"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": json.dumps(CANNED)},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+        })
+
+
+    def _send_stream(self, request):
+        # SSE: içerik birkaç karakterlik delta'lara bölünür, sonunda [DONE]
+        content = json.dumps(CANNED, ensure_ascii=False)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        for start in range(0, len(content), 8):
+            chunk = {
+                "id": "standin",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": request.get("model", "standin"),
+                "choices": [{"index": 0, "delta": {"content": content[start:start + 8]}, "finish_reason": None}],
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            self.wfile.flush()
+            time.sleep(self.chunk_delay)
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.close_connection = True
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--port', type=int, default=9100)
+    parser.add_argument('--delay', type=float, default=0.0, help="Cevap öncesi bekleme (saniye)")
+    parser.add_argument('--fail-rate', type=float, default=0.0, help="500 dönen isteklerin oranı (0-1)")
+    parser.add_argument('--chunk-delay', type=float, default=0.0, help="Stream'de delta'lar arası bekleme (saniye)")
+    args = parser.parse_args()
+
+    Handler.delay = args.delay
+    Handler.fail_rate = args.fail_rate
+    Handler.chunk_delay = args.chunk_delay
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), Handler)
+    print(f"vision stand-in: http://127.0.0.1:{args.port}  (delay={args.delay}s fail_rate={args.fail_rate})")
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
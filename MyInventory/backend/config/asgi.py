@@ -13,4 +13,39 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from django.core.handlers.asgi import ASGIHandler                # noqa: E402  (setup'tan sonra)
+from django.core.handlers.exception import convert_exception_to_response   # noqa: E402
+from corsheaders.middleware import CorsMiddleware                # noqa: E402
+
+CHAT_EVENTS_PATH = '/user_app/events/'
+
+
+class ChatEventsHandler(ASGIHandler):
+    """
+    Sadece user_app/events/ (SSE) için. Normal handler her isteğe bir
+    ThreadSensitiveContext açar; sync middleware'ler ve request_started receiver'ları
+    o isteğe ait thread'de çalışır ve thread istek bitene kadar yaşar — uzun süren SSE
+    bağlantısında bu, açık bağlantı başına bir thread demek. Burada middleware zinciri
+    yalnız CORS (auth view'da yapılır), kısa sync işler ortak thread'de çalışır.
+    """
+
+    async def __call__(self, scope, receive, send):
+        await self.handle(scope, receive, send)
+
+    def load_middleware(self, is_async=False):
+        self._view_middleware = []
+        self._template_response_middleware = []
+        self._exception_middleware = []
+        handler = convert_exception_to_response(self._get_response_async)
+        self._middleware_chain = convert_exception_to_response(CorsMiddleware(handler))
+
+
+chat_events_application = ChatEventsHandler()
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'http' and scope['path'] == CHAT_EVENTS_PATH:
+        return await chat_events_application(scope, receive, send)
+    return await django_application(scope, receive, send)
@@ -3,6 +3,7 @@ Django settings for config project.
 """
 
 from pathlib import Path
+import json
 import os
 import dj_database_url
 
@@ -69,7 +70,7 @@ CSRF_TRUSTED_ORIGINS = [
 # ─── REST FRAMEWORK ───────────────────────────────────────────────────────────
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'user_app.authentication.CachedTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
@@ -77,6 +78,92 @@ REST_FRAMEWORK = {
     ],
 }
 
+# ─── INVOICE SCAN ─────────────────────────────────────────────────────────────
+# Vision sağlayıcısı (app/vision.py). VISION_BASE_URL ile yerel stand-in sunucuya yönlendirilebilir.
+GROQ_API_KEY = os.environ.get('GROQ_API_KEY')    # yoksa tarama 503 döner
+VISION_BACKEND = os.environ.get('VISION_BACKEND', 'app.vision.GroqBackend')
+VISION_BASE_URL = os.environ.get('VISION_BASE_URL')
+VISION_MODEL = os.environ.get('VISION_MODEL', 'meta-llama/llama-4-scout-17b-16e-instruct')
+VISION_TIMEOUT = float(os.environ.get('VISION_TIMEOUT', 30))            # çağrı başına deadline (retry'lar dahil)
+VISION_MAX_RETRIES = int(os.environ.get('VISION_MAX_RETRIES', 2))
+VISION_MAX_CONNECTIONS = int(os.environ.get('VISION_MAX_CONNECTIONS', 10))
+VISION_BREAKER_THRESHOLD = int(os.environ.get('VISION_BREAKER_THRESHOLD', 5))
+VISION_BREAKER_RESET = float(os.environ.get('VISION_BREAKER_RESET', 30))
+
+# Asenkron tarama (scan/jobs/) — gunicorn worker süreci başına limitler
+SCAN_WORKERS = int(os.environ.get('SCAN_WORKERS', 2))
+SCAN_MAX_QUEUE = int(os.environ.get('SCAN_MAX_QUEUE', 10))
+SCAN_JOB_TIMEOUT = int(os.environ.get('SCAN_JOB_TIMEOUT', 300))    # bu süreyi geçen queued/running iş 'failed' olur
+# Çok sayfalı tarama: istek başına sayfa sınırı, süreç genelinde paralel sayfa sayısı
+SCAN_MAX_PAGES = int(os.environ.get('SCAN_MAX_PAGES', 10))
+SCAN_PAGE_CONCURRENCY = int(os.environ.get('SCAN_PAGE_CONCURRENCY', 4))
+# Modele gönderilmeden önce resim küçültme (app/scan_preprocess.py)
+SCAN_IMAGE_MAX_SIDE = int(os.environ.get('SCAN_IMAGE_MAX_SIDE', 1600))
+SCAN_IMAGE_FORMAT = os.environ.get('SCAN_IMAGE_FORMAT', 'JPEG')    # JPEG | WEBP (başka değer açılışta hata)
+SCAN_IMAGE_QUALITY = int(os.environ.get('SCAN_IMAGE_QUALITY', 80))
+SCAN_IMAGE_GRAYSCALE = os.environ.get('SCAN_IMAGE_GRAYSCALE', 'False') == 'True'
+# Taranan satırları katalogla eşleştirme (app/matcher.py)
+MATCHER_MIN_SCORE = float(os.environ.get('MATCHER_MIN_SCORE', 0.45))
+MATCHER_INDEX_TTL = int(os.environ.get('MATCHER_INDEX_TTL', 300))      # saniye; paylaşımlı cache yoksa üst sınır
+
+# ─── CHAT REALTIME ────────────────────────────────────────────────────────────
+# user_app/events/ (SSE) — web ile aynı ASGI uygulaması: gunicorn config.asgi:application
+# -k uvicorn_worker.UvicornWorker. Boşsa: PostgreSQL'de user_app.realtime.PgNotifyBroker
+# (worker süreçleri arasında dağıtır), diğerlerinde LocalBroker (sadece tek süreç / runserver)
+CHAT_BROKER = os.environ.get('CHAT_BROKER') or None
+CHAT_EVENTS_HEARTBEAT = int(os.environ.get('CHAT_EVENTS_HEARTBEAT', 25))   # saniye
+# Çözülmüş mesaj metni LRU'su (süreç başına, kayıt sayısı); 0 = kapalı
+MESSAGE_TEXT_CACHE_SIZE = int(os.environ.get('MESSAGE_TEXT_CACHE_SIZE', 5000))
+# Mesaj araması (blind index) HMAC anahtarı; boşsa FIELD_ENCRYPTION_KEY'den türetilir.
+# Değiştirilirse: python manage.py rebuild_message_search
+MESSAGE_SEARCH_KEY = os.environ.get('MESSAGE_SEARCH_KEY')
+
+# ─── CHAT ATTACHMENTS ─────────────────────────────────────────────────────────
+CHAT_ATTACHMENT_MAX_SIZE = int(os.environ.get('CHAT_ATTACHMENT_MAX_SIZE', 50 * 1024 * 1024))   # bayt
+CHAT_UPLOAD_CHUNK_SIZE = int(os.environ.get('CHAT_UPLOAD_CHUNK_SIZE', 5 * 1024 * 1024))       # parça başına üst sınır
+# Yarım yüklemeler burada birikir; birden fazla sunucu varsa paylaşımlı disk olmalı
+CHAT_UPLOAD_TEMP_DIR = os.environ.get('CHAT_UPLOAD_TEMP_DIR', str(BASE_DIR / 'chat_uploads'))
+# nginx önündeyse: internal location prefix'i (ör. /protected-media/) — dosyayı nginx gönderir
+CHAT_ATTACHMENT_ACCEL_REDIRECT = os.environ.get('CHAT_ATTACHMENT_ACCEL_REDIRECT')
+# Apache mod_xsendfile / lighttpd: 'X-Sendfile'
+CHAT_ATTACHMENT_SENDFILE_HEADER = os.environ.get('CHAT_ATTACHMENT_SENDFILE_HEADER')
+CHAT_THUMBNAIL_SIZE = int(os.environ.get('CHAT_THUMBNAIL_SIZE', 320))
+CHAT_THUMBNAIL_WORKERS = int(os.environ.get('CHAT_THUMBNAIL_WORKERS', 1))   # 0 = commit'ten sonra aynı thread'de
+
+# ─── CACHE ────────────────────────────────────────────────────────────────────
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Fatura tarama sonuçları (resim sha256 → satırlar), LRU ile en fazla MAX_ENTRIES
+    'scans': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'invoice-scans',
+        'TIMEOUT': int(os.environ.get('SCAN_CACHE_TTL', 60 * 60 * 24)),
+        'OPTIONS': {'MAX_ENTRIES': int(os.environ.get('SCAN_CACHE_MAX_ENTRIES', 1000))},
+    },
+}
+# Auth token → user (+ company) cache'i. AUTH_TOKEN_CACHE_URL (redis) verilirse paylaşımlı:
+# logout / şifre değişikliği / pasifleştirme tüm worker'larda anında geçerli.
+# Verilmezse süreç içi, sınırlı (MAX_ENTRIES) ve çok kısa TTL: diğer worker'lar iptal edilmiş
+# token'ı en fazla AUTH_TOKEN_LOCAL_CACHE_TTL saniye kabul eder (checks.py W002 üst sınırı denetler).
+AUTH_TOKEN_CACHE_URL = os.environ.get('AUTH_TOKEN_CACHE_URL')      # ör. redis://redis:6379/1
+if AUTH_TOKEN_CACHE_URL:
+    CACHES['auth_tokens'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': AUTH_TOKEN_CACHE_URL,
+        'TIMEOUT': int(os.environ.get('AUTH_TOKEN_CACHE_TTL', 60)),
+    }
+else:
+    CACHES['auth_tokens'] = {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'auth-tokens',
+        'TIMEOUT': int(os.environ.get('AUTH_TOKEN_LOCAL_CACHE_TTL', 5)),
+        'OPTIONS': {'MAX_ENTRIES': int(os.environ.get('AUTH_TOKEN_LOCAL_CACHE_MAX_ENTRIES', 1000))},
+    }
+# Başka bir alias da verilebilir; AUTH_TOKEN_CACHE= (boş) → cache yok, istek başına tek sorgu
+AUTH_TOKEN_CACHE = os.environ.get('AUTH_TOKEN_CACHE', 'auth_tokens') or None
+
 # ─── DATABASE ─────────────────────────────────────────────────────────────────
 DATABASE_URL = os.environ.get('DATABASE_URL')
 
@@ -131,6 +218,23 @@ STATICFILES_DIRS = [
 ]
 
 STATIC_ROOT = BASE_DIR / "staticfiles"
+
+# Yüklenen dosyalar (mesaj ekleri, export dosyaları)
+MEDIA_URL = 'media/'
+MEDIA_ROOT = BASE_DIR / "media"
+
+# Export dosyaları (run_export_worker yazar, web indirir) — iki süreç ayrı makinede olabilir,
+# bu yüzden varsayılan veritabanı (app.storage.DatabaseStorage). S3 vb. için backend + OPTIONS (JSON).
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+    'exports': {
+        'BACKEND': os.environ.get('EXPORT_STORAGE_BACKEND', 'app.storage.DatabaseStorage'),
+        'OPTIONS': json.loads(os.environ.get('EXPORT_STORAGE_OPTIONS', '{}')),
+    },
+}
+# Bundan fazla satırlı xlsx istekte hazırlanmaz, export job'a yönlenir (202)
+EXPORT_XLSX_SYNC_MAX_ROWS = int(os.environ.get('EXPORT_XLSX_SYNC_MAX_ROWS', 20000))
 # ─── I18N ─────────────────────────────────────────────────────────────────────
 LANGUAGE_CODE = 'en-us'
 TIME_ZONE = 'UTC'
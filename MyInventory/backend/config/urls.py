@@ -9,6 +9,7 @@ from django.conf.urls.static import static
 from django.http import HttpResponse
 from django.urls import path
 from django.conf import settings
+from user_app.readiness import readyz
 from rest_framework_simplejwt.views import (
     TokenObtainPairView,
     TokenRefreshView,
@@ -30,6 +31,7 @@ schema_view = get_schema_view(
 urlpatterns = [
     path('admin/', admin.site.urls),
     path("healthz/", lambda request: HttpResponse("OK")),
+    path("readyz/", readyz, name='readyz'),
     path('admin/logout/', admin.site.logout, name='admin-logout'),
     path('accounts/', include('django.contrib.auth.urls')),
     path('', include('app.urls')),
@@ -0,0 +1,354 @@
+# user_app/attachments.py
+# Chat ekleri: parça parça devam ettirilebilir yükleme, Range/ETag destekli indirme
+# ve resim ekleri için arka planda thumbnail.
+#
+# Yükleme:  POST attachments/uploads/  {filename, size, content_type}  → upload_id
+#           PUT  attachments/uploads/<id>/  gövde = parça, Content-Range: bytes a-b/size
+#           GET  attachments/uploads/<id>/  → received (koparsa buradan devam)
+#           direct-message {upload_id: ...}  → ek mesaja bağlanır
+# İndirme:  GET messages/<id>/attachment/  — Range (tek aralık), If-Range, If-None-Match.
+#           CHAT_ATTACHMENT_ACCEL_REDIRECT / CHAT_ATTACHMENT_SENDFILE_HEADER ayarlıysa
+#           dosyayı nginx / Apache gönderir; yoksa tam dosya FileResponse (gunicorn
+#           wsgi.file_wrapper → sendfile), aralık ise parça parça stream.
+import logging
+import mimetypes
+import os
+import re
+import shutil
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.text import get_valid_filename
+
+from .models import AttachmentUpload, Message
+
+logger = logging.getLogger(__name__)
+
+CHAT_ATTACHMENT_MAX_SIZE = getattr(settings, 'CHAT_ATTACHMENT_MAX_SIZE', 50 * 1024 * 1024)
+CHAT_UPLOAD_CHUNK_SIZE = getattr(settings, 'CHAT_UPLOAD_CHUNK_SIZE', 5 * 1024 * 1024)
+CHAT_UPLOAD_TEMP_DIR = str(getattr(settings, 'CHAT_UPLOAD_TEMP_DIR', settings.BASE_DIR / 'chat_uploads'))
+CHAT_THUMBNAIL_SIZE = getattr(settings, 'CHAT_THUMBNAIL_SIZE', 320)
+
+IO_BLOCK = 64 * 1024
+# Sadece bunlar tarayıcıda açılır; content_type istemciden gelir — SVG/HTML vb. script
+# çalıştırabilir, her zaman indirme olarak verilir
+INLINE_CONTENT_TYPES = {'image/jpeg', 'image/png', 'image/gif', 'image/webp'}
+_CONTENT_RANGE = re.compile(r"^bytes (\d+)-(\d+)/(\d+)$")
+_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class UploadError(Exception):
+    def __init__(self, detail, status_code=400, **extra):
+        super().__init__(detail)
+        self.detail = detail
+        self.status_code = status_code
+        self.extra = extra
+
+
+# ─── yükleme ──────────────────────────────────────────────────────────────────
+
+def partial_path(upload):
+    return os.path.join(CHAT_UPLOAD_TEMP_DIR, str(upload.id))
+
+
+def upload_state(upload):
+    return {
+        "upload_id": str(upload.id),
+        "filename": upload.filename,
+        "size": upload.size,
+        "received": upload.received,
+        "complete": upload.complete,
+        "chunk_size": CHAT_UPLOAD_CHUNK_SIZE,
+    }
+
+
+def start_upload(user, filename, size, content_type=''):
+    try:
+        size = int(size)
+    except (TypeError, ValueError):
+        raise UploadError("size (bayt) kerak.")
+    if not filename:
+        raise UploadError("filename kerak.")
+    if size <= 0 or size > CHAT_ATTACHMENT_MAX_SIZE:
+        raise UploadError(f"Fayl hajmi 1..{CHAT_ATTACHMENT_MAX_SIZE} bayt bo'lishi kerak.", status_code=413)
+    content_type = content_type or mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    upload = AttachmentUpload.objects.create(
+        user=user, filename=get_valid_filename(os.path.basename(filename))[:255],
+        content_type=content_type[:100], size=size,
+    )
+    os.makedirs(CHAT_UPLOAD_TEMP_DIR, exist_ok=True)
+    open(partial_path(upload), 'wb').close()
+    return upload
+
+
+def parse_content_range(header, size):
+    match = _CONTENT_RANGE.match(header or '')
+    if not match:
+        raise UploadError("Content-Range: bytes <start>-<end>/<size> kerak.")
+    start, end, total = (int(group) for group in match.groups())
+    if total != size or end < start or end >= size:
+        raise UploadError("Content-Range fayl hajmiga mos emas.", status_code=416)
+    if end - start + 1 > CHAT_UPLOAD_CHUNK_SIZE:
+        raise UploadError(f"Bitta bo'lak {CHAT_UPLOAD_CHUNK_SIZE} baytdan oshmasin.", status_code=413)
+    return start, end
+
+
+def _receive(stream, path, length):
+    """Parçayı stream'den 64 KB'lık bloklarla path'e yazar. Döndürür: yazılan bayt."""
+    written = 0
+    with open(path, 'wb') as f:
+        while written < length:
+            block = stream.read(min(IO_BLOCK, length - written))
+            if not block:
+                break
+            f.write(block)
+            written += len(block)
+    return written
+
+
+def append_chunk(upload_id, user, content_range, stream):
+    """
+    Parçayı request stream'inden 64 KB'lık bloklarla diske yazar (bellekte tutmaz).
+    Parça tam gelmezse gelen kadarı kabul edilir — istemci `received`'den devam eder.
+    Ağdan okuma kilitsiz, istek başına ayrı bir dosyaya yapılır; satır kilidi sadece
+    yerel diskteki parçayı yarım dosyaya eklerken ve `received`'i ilerletirken tutulur.
+    """
+    upload = AttachmentUpload.objects.filter(id=upload_id, user=user).first()
+    if upload is None:
+        raise UploadError("Yuklash topilmadi.", status_code=404)
+    if upload.complete:
+        return upload
+    start, end = parse_content_range(content_range, upload.size)
+    if start != upload.received:
+        # Kopan / tekrar gönderilen parça — istemciye nereden devam edeceğini söyle
+        raise UploadError("Bo'lak joyi mos emas.", status_code=409, received=upload.received)
+
+    chunk_path = f"{partial_path(upload)}.{uuid.uuid4().hex}"
+    try:
+        written = _receive(stream, chunk_path, end - start + 1)
+        with transaction.atomic():
+            # Aynı yüklemeye paralel PUT'lar: okuma sırasında ilerlemiş olabilir, tekrar bak
+            upload = AttachmentUpload.objects.select_for_update().filter(id=upload_id, user=user).first()
+            if upload is None:
+                raise UploadError("Yuklash topilmadi.", status_code=404)
+            if upload.complete:
+                return upload
+            if start != upload.received:
+                raise UploadError("Bo'lak joyi mos emas.", status_code=409, received=upload.received)
+            with open(partial_path(upload), 'r+b') as f, open(chunk_path, 'rb') as chunk:
+                f.seek(start)
+                shutil.copyfileobj(chunk, f, IO_BLOCK)
+                f.truncate()
+            upload.received = start + written
+            if upload.received == upload.size:
+                upload.stored_name = _store(upload)
+            upload.save(update_fields=['received', 'stored_name', 'updated_at'])
+            return upload
+    finally:
+        if os.path.exists(chunk_path):
+            os.remove(chunk_path)
+
+
+class _PartialFile(File):
+    # FileSystemStorage temporary_file_path görünce kopyalamak yerine taşır (rename)
+    def temporary_file_path(self):
+        return self.file.name
+
+
+def _store(upload):
+    path = partial_path(upload)
+    with open(path, 'rb') as f:
+        name = default_storage.save(f"attachments/{upload.id.hex[:8]}_{upload.filename}", _PartialFile(f))
+    if os.path.exists(path):
+        os.remove(path)
+    return name
+
+
+def take_upload(upload_id, user):
+    """Tamamlanmış yüklemeyi mesaja bağlamak için: (stored_name, size, content_type)."""
+    with transaction.atomic():
+        # Aynı upload_id ile iki mesaj / purge yarışı: satırı sadece biri silebilir
+        upload = AttachmentUpload.objects.select_for_update().filter(id=upload_id, user=user).first()
+        if upload is None:
+            raise UploadError("Yuklash topilmadi.", status_code=404)
+        if not upload.complete:
+            raise UploadError("Yuklash hali tugamagan.", status_code=409, received=upload.received)
+        deleted, _ = AttachmentUpload.objects.filter(pk=upload.pk, stored_name=upload.stored_name).delete()
+        if not deleted:
+            raise UploadError("Yuklash topilmadi.", status_code=404)
+    return upload.stored_name, upload.size, upload.content_type
+
+
+def discard_upload(upload):
+    if os.path.exists(partial_path(upload)):
+        os.remove(partial_path(upload))
+    elif upload.complete:
+        # Tamamlanmış ama mesaja hiç bağlanmamış dosya
+        default_storage.delete(upload.stored_name)
+    upload.delete()
+
+
+def purge_stale_uploads(older_than):
+    """updated_at'i older_than'dan eski yüklemeleri (yarım ya da bağlanmamış) siler. Döndürür: sayı."""
+    stale = list(AttachmentUpload.objects.filter(updated_at__lt=older_than))
+    for upload in stale:
+        discard_upload(upload)
+    return len(stale)
+
+
+# ─── indirme ──────────────────────────────────────────────────────────────────
+
+def attachment_etag(message, size):
+    # Ek mesaja bağlandıktan sonra değişmez (serializer'da read-only) — id + boyut yeterli
+    return f'"m{message.id}-{size}"'
+
+
+def parse_range(header, size):
+    """Tek aralık: (start, end) ya da None (Range yok / çoklu / anlaşılmaz → tam dosya)."""
+    match = _RANGE.match((header or '').strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # bytes=-500 → son 500 bayt
+        length = int(last)
+        if length == 0:
+            raise UploadError("Range bo'sh.", status_code=416)
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        raise UploadError("Range fayl hajmidan tashqarida.", status_code=416)
+    return start, end
+
+
+def _file_range(name, start, length):
+    with default_storage.open(name, 'rb') as f:
+        f.seek(start)
+        while length > 0:
+            block = f.read(min(IO_BLOCK, length))
+            if not block:
+                return
+            length -= len(block)
+            yield block
+
+
+def attachment_response(request, message):
+    name = message.attachment.name
+    size = message.attachment_size
+    if size is None:
+        size = default_storage.size(name)
+    etag = attachment_etag(message, size)
+    content_type = message.attachment_type or mimetypes.guess_type(name)[0] or 'application/octet-stream'
+    filename = os.path.basename(name)
+    disposition = 'inline' if content_type.lower() in INLINE_CONTENT_TYPES else 'attachment'
+
+    def finish(response):
+        response['ETag'] = etag
+        response['Accept-Ranges'] = 'bytes'
+        response['Cache-Control'] = 'private, max-age=86400'
+        response['Content-Disposition'] = f'{disposition}; filename="{filename}"'
+        return response
+
+    if etag in [tag.strip() for tag in request.headers.get('If-None-Match', '').split(',')]:
+        return finish(HttpResponse(status=304))
+
+    accel = getattr(settings, 'CHAT_ATTACHMENT_ACCEL_REDIRECT', None)
+    if accel:
+        # nginx: location <accel> { internal; alias <MEDIA_ROOT>/; } — Range'i nginx yapar
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = accel.rstrip('/') + '/' + name
+        return finish(response)
+    sendfile_header = getattr(settings, 'CHAT_ATTACHMENT_SENDFILE_HEADER', None)
+    if sendfile_header:
+        # Apache mod_xsendfile / lighttpd: X-Sendfile
+        response = HttpResponse(content_type=content_type)
+        response[sendfile_header] = default_storage.path(name)
+        return finish(response)
+
+    if_range = request.headers.get('If-Range')
+    byte_range = parse_range(request.headers.get('Range'), size) if (not if_range or if_range == etag) else None
+    if byte_range is None:
+        response = FileResponse(default_storage.open(name, 'rb'), content_type=content_type)
+        response['Content-Length'] = str(size)
+        return finish(response)
+
+    start, end = byte_range
+    response = StreamingHttpResponse(_file_range(name, start, end - start + 1), status=206, content_type=content_type)
+    response['Content-Range'] = f"bytes {start}-{end}/{size}"
+    response['Content-Length'] = str(end - start + 1)
+    return finish(response)
+
+
+# ─── thumbnail ────────────────────────────────────────────────────────────────
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def is_image(message):
+    content_type = message.attachment_type or mimetypes.guess_type(message.attachment.name)[0] or ''
+    return content_type.startswith('image/')
+
+
+def schedule_thumbnail(message):
+    """Commit'ten sonra havuza verir; CHAT_THUMBNAIL_WORKERS=0 ise aynı thread'de üretir."""
+    global _executor
+    message_id = message.id
+    workers = getattr(settings, 'CHAT_THUMBNAIL_WORKERS', 1)
+    if workers <= 0:
+        transaction.on_commit(lambda: make_thumbnail(message_id))
+        return
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='thumbnail')
+    transaction.on_commit(lambda: _executor.submit(_run_thumbnail, message_id))
+
+
+def _run_thumbnail(message_id):
+    try:
+        make_thumbnail(message_id)
+    except Exception:
+        logger.exception("thumbnail failed for message %s", message_id)
+    finally:
+        # Thread'e ait DB bağlantısı açık kalmasın
+        connection.close()
+
+
+def make_thumbnail(message_id):
+    from PIL import Image, ImageOps
+
+    from .realtime import participant_ids, get_broker
+
+    message = Message.objects.only('id', 'conversation_id', 'attachment', 'thumbnail').get(pk=message_id)
+    side = CHAT_THUMBNAIL_SIZE
+    with default_storage.open(message.attachment.name, 'rb') as f:
+        image = Image.open(f)
+        # JPEG'i tam çözmeden küçük ölçekte aç (büyük fotoğraflarda çok daha hızlı)
+        image.draft('RGB', (side, side))
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((side, side))
+        if image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        buffer = BytesIO()
+        image.save(buffer, format='JPEG', quality=75, optimize=True)
+
+    message.thumbnail.save(f"{message.id}.jpg", ContentFile(buffer.getvalue()), save=False)
+    Message.objects.filter(pk=message.id).update(thumbnail=message.thumbnail.name)
+    # Açık sohbet ekranları önizlemeyi yenilesin
+    users = participant_ids([message.conversation_id]).get(message.conversation_id, [])
+    get_broker().publish(users, {
+        "type": "thumbnail", "conversation": message.conversation_id,
+        "message": message.id, "thumbnail": message.thumbnail.url,
+    })
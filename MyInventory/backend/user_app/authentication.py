@@ -0,0 +1,72 @@
+# user_app/authentication.py
+# DRF TokenAuthentication her istekte Token + CustomUser join'i yapar, sonra hemen her
+# get_queryset'te request.user.company için bir sorgu daha gider. Burada token, user ve
+# company tek sorguyla yüklenir ve AUTH_TOKEN_CACHE'te kısa TTL ile cache'lenir; cache hit'te
+# auth 0 sorgu olur. Paylaşımlı cache (redis) yoksa süreç içi cache'in TTL'i birkaç saniye:
+# logout/şifre/pasifleştirme sadece o worker'da silinir, diğerlerinde TTL dolunca geçerli olur.
+# Silme: logout, şifre değişikliği / user kaydı, user ya da token silinmesi → signals.py.
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+# Süreç başına ayrı kayıt tutan backend'ler — iptal diğer worker'lara ulaşmaz
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.filebased.FileBasedCache',
+)
+# Süreç içi cache'te iptal edilmiş token'ın diğer worker'larda kabul edilebileceği en uzun süre (saniye)
+PROCESS_LOCAL_MAX_TTL = 10
+
+
+def _cache():
+    alias = getattr(settings, 'AUTH_TOKEN_CACHE', None)
+    return caches[alias] if alias else None
+
+
+def _cache_key(key):
+    # Ham token paylaşımlı cache'te anahtar olarak durmasın
+    return 'auth-token:' + hashlib.sha256(key.encode()).hexdigest()
+
+
+def cached_token(key):
+    """Token (user ve company yüklü) ya da None. Cache miss'te tek sorgu."""
+    cache = _cache()
+    if cache is None:
+        return Token.objects.select_related('user__company').filter(key=key).first()
+    cache_key = _cache_key(key)
+    token = cache.get(cache_key)
+    if token is None:
+        token = Token.objects.select_related('user__company').filter(key=key).first()
+        if token is None:
+            return None
+        cache.set(cache_key, token)
+    return token
+
+
+def forget_tokens(keys):
+    cache = _cache()
+    keys = [key for key in keys if key]
+    if cache is not None and keys:
+        cache.delete_many([_cache_key(key) for key in keys])
+
+
+def forget_user_tokens(user_ids):
+    if _cache() is None:
+        return
+    forget_tokens(Token.objects.filter(user_id__in=user_ids).values_list('key', flat=True))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+
+    def authenticate_credentials(self, key):
+        token = cached_token(key)
+        if token is None:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+        return (token.user, token)
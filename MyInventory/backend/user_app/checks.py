@@ -0,0 +1,41 @@
+# user_app/checks.py
+from django.conf import settings
+from django.core.checks import Warning, register
+
+from .authentication import PROCESS_LOCAL_CACHES, PROCESS_LOCAL_MAX_TTL
+from .realtime import broker_path
+
+
+@register()
+def chat_broker_check(app_configs, **kwargs):
+    # CHAT_BROKER açıkça LocalBroker verildiyse (tek süreç) sessiz
+    if settings.DEBUG or getattr(settings, 'CHAT_BROKER', None):
+        return []
+    if broker_path() != 'user_app.realtime.LocalBroker':
+        return []
+    return [Warning(
+        "Chat olayları LocalBroker ile sadece aynı süreçte dağıtılır; birden fazla web "
+        "worker'ı (gunicorn --workers) varsa diğer worker'lardaki SSE istemcilerine olay ulaşmaz.",
+        hint="PostgreSQL kullanın (PgNotifyBroker otomatik seçilir) ya da tek süreçte "
+             "çalışıyorsa CHAT_BROKER=user_app.realtime.LocalBroker verin.",
+        id='user_app.W001',
+    )]
+
+
+@register()
+def auth_token_cache_check(app_configs, **kwargs):
+    alias = getattr(settings, 'AUTH_TOKEN_CACHE', None)
+    if not alias:
+        return []
+    config = settings.CACHES.get(alias, {})
+    backend = config.get('BACKEND')
+    # Süreç içi ama TTL birkaç saniye (varsayılan auth_tokens) — gecikme sınırlı, sessiz
+    timeout = config.get('TIMEOUT', 300)
+    if backend not in PROCESS_LOCAL_CACHES or (timeout is not None and timeout <= PROCESS_LOCAL_MAX_TTL):
+        return []
+    return [Warning(
+        f"AUTH_TOKEN_CACHE '{alias}' süreç içi ({backend}, TTL {timeout}): logout ve şifre değişikliği "
+        "diğer worker'larda TTL dolana kadar geçerli olmaz, iptal edilmiş token kabul edilir.",
+        hint=f"AUTH_TOKEN_CACHE_URL ile redis verin ya da TTL'i {PROCESS_LOCAL_MAX_TTL} saniyenin altında tutun.",
+        id='user_app.W002',
+    )]
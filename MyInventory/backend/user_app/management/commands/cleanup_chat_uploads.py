@@ -0,0 +1,16 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from user_app.attachments import purge_stale_uploads
+
+
+class Command(BaseCommand):
+    help = "Yarım kalmış ya da mesaja bağlanmamış chat eki yüklemelerini siler (cron ile)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, default=24, help="Bu kadar saattir dokunulmayan yüklemeler")
+
+    def handle(self, *args, **options):
+        count = purge_stale_uploads(timezone.now() - timedelta(hours=options['hours']))
+        self.stdout.write(self.style.SUCCESS(f"{count} yuklash o'chirildi."))
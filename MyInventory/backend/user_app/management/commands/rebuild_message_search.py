@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from user_app.search_index import rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = "Mesaj arama index'ini (MessageSearchToken) mevcut mesajlardan batch batch yeniden yazar."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--company', type=int, help="Sadece bu company id kullanıcılarının sohbetleri")
+        parser.add_argument('--conversation', type=int, help="Sadece bu sohbet")
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        count = rebuild_search_index(
+            batch_size=options['batch_size'],
+            conversation_id=options.get('conversation'),
+            company_id=options.get('company'),
+        )
+        self.stdout.write(self.style.SUCCESS(f"{count} mesaj indexlendi."))
@@ -0,0 +1,86 @@
+# user_app/message_text.py
+# Message.text (EncryptedTextField) her satır yüklenirken from_db_value'da çözülür —
+# render edilmese bile. Okuma yolunda text defer edilir, şifreli hali ham olarak
+# (text_ciphertext) gelir; çözme sadece serializer text'i gerçekten yazarken yapılır.
+# Çözülen metinler (id, ciphertext hash) anahtarlı, boyutu sınırlı LRU'da tutulur:
+# metin değişirse ciphertext de değişir, eski kayıt kendiliğinden kullanılmaz olur.
+# Cipher: encrypted_model_fields süreç başına tek bir MultiFernet (CRYPTER) kurar, o kullanılır.
+import hashlib
+import threading
+from collections import OrderedDict
+
+from cryptography.fernet import InvalidToken
+from django.conf import settings
+from django.db.models import ExpressionWrapper, F, TextField
+from encrypted_model_fields.fields import decrypt_str
+
+MESSAGE_TEXT_CACHE_SIZE = getattr(settings, 'MESSAGE_TEXT_CACHE_SIZE', 5000)
+
+
+class PlaintextCache:
+    """Thread-safe LRU: (message id, ciphertext hash) → çözülmüş metin."""
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+
+plaintext_cache = PlaintextCache(MESSAGE_TEXT_CACHE_SIZE)
+
+
+def with_ciphertext(queryset):
+    """text'i defer eder, şifreli değeri çözmeden `text_ciphertext` olarak ekler."""
+    return queryset.defer('text').annotate(
+        text_ciphertext=ExpressionWrapper(F('text'), output_field=TextField()),
+    )
+
+
+def decrypt_cached(message_id, ciphertext):
+    if ciphertext is None:
+        return None
+    key = (message_id, hashlib.blake2b(ciphertext.encode(), digest_size=16).digest())
+    text = plaintext_cache.get(key)
+    if text is None:
+        try:
+            text = decrypt_str(ciphertext)
+        except InvalidToken:
+            # Şifrelenmeden önce yazılmış eski satır — EncryptedMixin gibi olduğu gibi döner
+            text = ciphertext
+        plaintext_cache.put(key, text)
+    return text
+
+
+def message_text(message):
+    """with_ciphertext ile yüklendiyse cache'li çözme, değilse model alanı (zaten çözülmüş)."""
+    if 'text' not in message.__dict__ and 'text_ciphertext' in message.__dict__:
+        return decrypt_cached(message.id, message.text_ciphertext)
+    return message.text
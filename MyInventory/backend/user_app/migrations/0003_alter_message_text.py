@@ -0,0 +1,19 @@
+# Generated by Django 5.2.11 on 2026-10-18 11:18
+
+import encrypted_model_fields.fields
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_app', '0002_conversation_message'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='message',
+            name='text',
+            field=encrypted_model_fields.fields.EncryptedTextField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,71 @@
+# Generated by Django 5.2.11 on 2026-10-18 11:50
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max, Min
+
+
+def build_read_states(apps, schema_editor):
+    # is_read=False mesajlardan: sayaç = başkalarının okunmamış mesajları,
+    # watermark = ilk okunmamış mesajdan hemen önce (yoksa son mesaj)
+    Conversation = apps.get_model('user_app', 'Conversation')
+    Message = apps.get_model('user_app', 'Message')
+    ConversationReadState = apps.get_model('user_app', 'ConversationReadState')
+
+    unread = {}
+    rows = Message.objects.filter(is_read=False).values('conversation_id', 'sender_id').annotate(
+        count=Count('id'), first=Min('id')
+    )
+    for row in rows:
+        unread.setdefault(row['conversation_id'], []).append((row['sender_id'], row['count'], row['first']))
+    latest = dict(Message.objects.values('conversation_id').annotate(last=Max('id')).values_list('conversation_id', 'last'))
+
+    states = []
+    participants = Conversation.participants.through.objects.values_list('conversation_id', 'customuser_id')
+    for conversation_id, user_id in participants.iterator(chunk_size=2000):
+        incoming = [(count, first) for sender_id, count, first in unread.get(conversation_id, ()) if sender_id != user_id]
+        states.append(ConversationReadState(
+            user_id=user_id,
+            conversation_id=conversation_id,
+            unread_count=sum(count for count, _ in incoming),
+            last_read_message_id=min(first for _, first in incoming) - 1 if incoming else latest.get(conversation_id, 0),
+        ))
+    ConversationReadState.objects.bulk_create(states, batch_size=1000)
+
+
+def restore_is_read(apps, schema_editor):
+    Message = apps.get_model('user_app', 'Message')
+    ConversationReadState = apps.get_model('user_app', 'ConversationReadState')
+    for state in ConversationReadState.objects.iterator(chunk_size=2000):
+        Message.objects.filter(
+            conversation_id=state.conversation_id, id__lte=state.last_read_message_id
+        ).exclude(sender_id=state.user_id).update(is_read=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_app', '0004_message_history_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConversationReadState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_read_message_id', models.BigIntegerField(default=0)),
+                ('unread_count', models.PositiveIntegerField(default=0)),
+                ('conversation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='read_states', to='user_app.conversation')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='read_states', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'conversation'), name='readstate_user_conversation')],
+            },
+        ),
+        migrations.RunPython(build_read_states, restore_is_read),
+        migrations.RemoveField(
+            model_name='message',
+            name='is_read',
+        ),
+    ]
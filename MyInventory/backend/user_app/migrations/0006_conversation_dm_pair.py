@@ -0,0 +1,58 @@
+# Generated by Django 5.2.11 on 2026-10-18 11:51
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def set_dm_keys(apps, schema_editor):
+    # Tam iki katılımcılı sohbetler DM sayılır. Aynı çift için birden fazla sohbet varsa
+    # (eski yarış durumu) anahtarı en eskisi alır, diğerleri anahtarsız kalır.
+    Conversation = apps.get_model('user_app', 'Conversation')
+    participants = {}
+    rows = Conversation.participants.through.objects.order_by('conversation_id').values_list(
+        'conversation_id', 'customuser_id'
+    )
+    for conversation_id, user_id in rows.iterator(chunk_size=2000):
+        participants.setdefault(conversation_id, set()).add(user_id)
+
+    seen = set()
+    keyed = []
+    for conversation_id, users in sorted(participants.items()):
+        if len(users) != 2:
+            continue
+        pair = tuple(sorted(users))
+        if pair in seen:
+            continue
+        seen.add(pair)
+        keyed.append(Conversation(id=conversation_id, dm_user_low_id=pair[0], dm_user_high_id=pair[1]))
+    Conversation.objects.bulk_update(keyed, ['dm_user_low', 'dm_user_high'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_app', '0005_conversation_read_state'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversation',
+            name='dm_user_high',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='dm_user_low',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RunPython(set_dm_keys, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='conversation',
+            constraint=models.UniqueConstraint(fields=('dm_user_low', 'dm_user_high'), name='conversation_dm_pair'),
+        ),
+        migrations.AddConstraint(
+            model_name='conversation',
+            constraint=models.CheckConstraint(condition=models.Q(('dm_user_low__lte', models.F('dm_user_high'))), name='conversation_dm_pair_ordered'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.11 on 2026-10-18 12:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_app', '0006_conversation_dm_pair'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MessageSearchToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=32)),
+                ('conversation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='user_app.conversation')),
+                ('message', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_tokens', to='user_app.message')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['token', 'conversation'], name='searchtoken_token_conv')],
+                'constraints': [models.UniqueConstraint(fields=('message', 'token'), name='searchtoken_message_token')],
+            },
+        ),
+    ]
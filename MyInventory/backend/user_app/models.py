@@ -1,5 +1,6 @@
-from django.db import models
+from django.db import IntegrityError, models, transaction
 from django.contrib.auth.models import AbstractUser
+import uuid
 import string
 import random
 
@@ -55,10 +56,37 @@ from encrypted_model_fields.fields import EncryptedTextField
 class Conversation(models.Model):
     participants = models.ManyToManyField(CustomUser, related_name='conversations')
     created_at = models.DateTimeField(auto_now_add=True)
+    # Birebir (DM) sohbet anahtarı: (küçük user id, büyük user id). Grup sohbetlerinde boş.
+    # Unique index — DM bulma tek indexli get, aynı anda gelen iki ilk mesaj çift sohbet açamaz.
+    dm_user_low = models.ForeignKey(CustomUser, null=True, blank=True, on_delete=models.SET_NULL, related_name='+')
+    dm_user_high = models.ForeignKey(CustomUser, null=True, blank=True, on_delete=models.SET_NULL, related_name='+')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['dm_user_low', 'dm_user_high'], name='conversation_dm_pair'),
+            models.CheckConstraint(condition=models.Q(dm_user_low__lte=models.F('dm_user_high')),
+                                   name='conversation_dm_pair_ordered'),
+        ]
     
     def __str__(self):
         return f"Conversation {self.id}"
 
+    @classmethod
+    def get_or_create_direct(cls, user_id, other_id):
+        """İki kullanıcının DM sohbeti; yoksa oluşturur. Döndürür: (conversation, created)."""
+        low, high = sorted((user_id, other_id))
+        conversation = cls.objects.filter(dm_user_low_id=low, dm_user_high_id=high).first()
+        if conversation is not None:
+            return conversation, False
+        try:
+            with transaction.atomic():
+                conversation = cls.objects.create(dm_user_low_id=low, dm_user_high_id=high)
+                conversation.participants.set({low, high})
+            return conversation, True
+        except IntegrityError:
+            # Yarışı kaybettik — diğer istek aynı anda oluşturdu
+            return cls.objects.get(dm_user_low_id=low, dm_user_high_id=high), False
+
 class Message(models.Model):
     conversation = models.ForeignKey(Conversation, related_name='messages', on_delete=models.CASCADE)
     sender = models.ForeignKey(CustomUser, related_name='sent_messages', on_delete=models.CASCADE)
@@ -68,10 +96,82 @@ class Message(models.Model):
     text = EncryptedTextField(blank=True, null=True)
 
     created_at = models.DateTimeField(auto_now_add=True)    
-    is_read = models.BooleanField(default=False)
-    
+    # Okundu bilgisi mesajda değil ConversationReadState'te (katılımcı başına watermark)
+
     # Opsiyonel: dosya veya resim desteği
     attachment = models.FileField(upload_to='attachments/', blank=True, null=True)
+    attachment_size = models.PositiveBigIntegerField(blank=True, null=True)
+    attachment_type = models.CharField(max_length=100, blank=True, default='')
+    # Resim eklerinin küçük önizlemesi — arka planda üretilir (user_app/attachments.py)
+    thumbnail = models.FileField(upload_to='attachments/thumbs/', blank=True, null=True)
+
+    class Meta:
+        # Sohbet geçmişi (before/after cursor) ve son mesaj subquery'si bu index'ten okunur
+        indexes = [
+            models.Index(fields=['conversation', 'created_at', 'id'], name='message_conv_created_id'),
+        ]
 
     def __str__(self):
         return f"Message {self.id} by {self.sender.username}"
+
+
+class ConversationReadState(models.Model):
+    """
+    (katılımcı, sohbet) başına okuma watermark'ı: last_read_message_id'ye kadar her şey
+    okunmuş. unread_count başkalarının yeni mesajlarında artan sayaç — okunmamış sayısı
+    ve "okundu" tek satır okuma/yazma; mesaj geçmişinin boyu önemli değil.
+    Satırlar user_app/read_state.py ve signals.py tarafından tutulur.
+    """
+    user = models.ForeignKey(CustomUser, related_name='read_states', on_delete=models.CASCADE)
+    conversation = models.ForeignKey(Conversation, related_name='read_states', on_delete=models.CASCADE)
+    last_read_message_id = models.BigIntegerField(default=0)
+    unread_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'conversation'], name='readstate_user_conversation'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} read {self.conversation_id} up to {self.last_read_message_id}"
+
+
+class MessageSearchToken(models.Model):
+    """
+    Şifreli mesaj metninde arama için blind index: metindeki her kelimenin anahtarlı
+    HMAC'i (user_app/search_index.py). Düz metin saklanmaz; arama = token eşitliği.
+    conversation tekrar tutulur ki "bu sohbette / kullanıcının sohbetlerinde" filtresi
+    Message join'i olmadan (token, conversation) index'inden gelsin.
+    """
+    message = models.ForeignKey(Message, related_name='search_tokens', on_delete=models.CASCADE)
+    conversation = models.ForeignKey(Conversation, related_name='+', on_delete=models.CASCADE)
+    token = models.CharField(max_length=32)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['message', 'token'], name='searchtoken_message_token'),
+        ]
+        indexes = [
+            models.Index(fields=['token', 'conversation'], name='searchtoken_token_conv'),
+        ]
+
+
+class AttachmentUpload(models.Model):
+    """
+    Parça parça (Content-Range) yüklenen ek. Parçalar CHAT_UPLOAD_TEMP_DIR'deki dosyaya
+    eklenir; son parça gelince storage'a taşınır (stored_name). Bağlantı koparsa
+    istemci `received`'den devam eder. Mesaja bağlanınca satır silinir.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(CustomUser, related_name='attachment_uploads', on_delete=models.CASCADE)
+    filename = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=100, blank=True, default='')
+    size = models.PositiveBigIntegerField()
+    received = models.PositiveBigIntegerField(default=0)
+    stored_name = models.CharField(max_length=255, blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @property
+    def complete(self):
+        return bool(self.stored_name)
@@ -0,0 +1,91 @@
+# user_app/read_state.py
+# Okundu bilgisi: mesaj başına is_read yerine (katılımcı, sohbet) başına watermark.
+#   - "okundu" = tek satır UPDATE (last_read_message_id = son mesaj, unread_count = 0)
+#   - okunmamış sayısı = kullanıcının ConversationReadState satırlarının SUM'u
+#   - yeni mesaj = diğer katılımcıların sayacı +1 (katılımcı sayısı kadar satır)
+# Satırlar signals.py'den tutulur: katılımcı ekle/çıkar, mesaj oluştur/sil.
+from django.db.models import F, OuterRef, Subquery, Sum
+
+from .models import Conversation, ConversationReadState, Message
+
+
+def latest_message_id(conversation_ref):
+    # (conversation, created_at, id) index'inden tek satır
+    return Subquery(
+        Message.objects.filter(conversation=conversation_ref).order_by('-created_at', '-id').values('id')[:1]
+    )
+
+
+def add_participants(conversation_id, user_ids):
+    """Yeni katılımcı mevcut geçmişi okunmamış olarak görmez: watermark son mesajdan başlar."""
+    last = (
+        Message.objects.filter(conversation_id=conversation_id)
+        .order_by('-created_at', '-id').values_list('id', flat=True).first()
+    )
+    ConversationReadState.objects.bulk_create(
+        [ConversationReadState(user_id=user_id, conversation_id=conversation_id, last_read_message_id=last or 0)
+         for user_id in user_ids],
+        ignore_conflicts=True,
+    )
+
+
+def message_added(message):
+    ConversationReadState.objects.filter(conversation_id=message.conversation_id).exclude(
+        user_id=message.sender_id
+    ).update(unread_count=F('unread_count') + 1)
+
+
+def message_removed(message):
+    # Sadece mesajı henüz okumamış olanların sayacı düşer
+    ConversationReadState.objects.filter(
+        conversation_id=message.conversation_id,
+        last_read_message_id__lt=message.id,
+        unread_count__gt=0,
+    ).exclude(user_id=message.sender_id).update(unread_count=F('unread_count') - 1)
+
+
+def mark_read(user_id, conversation_ids):
+    """
+    Sohbetleri user için son mesaja kadar okundu yapar. Yeni bir şey yoksa yazma yok.
+    Döndürür: watermark'ı ilerleyen conversation id'leri.
+    """
+    states = ConversationReadState.objects.filter(user_id=user_id, conversation_id__in=conversation_ids)
+    changed = list(
+        states.filter(last_read_message_id__lt=latest_message_id(OuterRef('conversation_id')))
+        .values_list('conversation_id', flat=True)
+    )
+    if changed:
+        states.filter(conversation_id__in=changed).update(
+            last_read_message_id=latest_message_id(OuterRef('conversation_id')),
+            unread_count=0,
+        )
+    return changed
+
+
+def unread_message_count(user_id):
+    return ConversationReadState.objects.filter(user_id=user_id).aggregate(
+        count=Sum('unread_count')
+    )['count'] or 0
+
+
+def read_watermarks(conversation_ids):
+    """conversation_id → {user_id: last_read_message_id}; tek sorgu."""
+    result = {conversation_id: {} for conversation_id in conversation_ids}
+    rows = ConversationReadState.objects.filter(conversation_id__in=conversation_ids).values_list(
+        'conversation_id', 'user_id', 'last_read_message_id'
+    )
+    for conversation_id, user_id, last_read in rows:
+        result.setdefault(conversation_id, {})[user_id] = last_read
+    return result
+
+
+def is_read(message, watermarks):
+    """Gönderen dışındaki tüm katılımcılar bu mesaja kadar okuduysa True (grup sohbetinde de)."""
+    others = [last_read for user_id, last_read in watermarks.items() if user_id != message.sender_id]
+    return bool(others) and min(others) >= message.id
+
+
+def direct_conversation(user_id, other_id):
+    # Sadece ikisinin DM sohbeti — ortak grup sohbetleri dahil değil
+    low, high = sorted((user_id, other_id))
+    return Conversation.objects.filter(dm_user_low_id=low, dm_user_high_id=high).values('id')
@@ -0,0 +1,71 @@
+# user_app/readiness.py
+# Chat tabloları her istekte CREATE TABLE IF NOT EXISTS ile değil, süreç başına bir kez
+# introspection ile kontrol edilir. Tablolar migrate ile oluşturulur; eksikse chat
+# endpoint'leri 503 döner ve /readyz/ hazır değil der.
+import threading
+import time
+
+from django.db import connection
+from django.http import JsonResponse
+from rest_framework.exceptions import APIException
+
+from .models import Conversation, ConversationReadState, Message, MessageSearchToken
+
+# Eksik tablo bulunduysa en erken bu kadar saniye sonra tekrar bakılır (migrate sonrası kendini düzeltsin)
+CHAT_SCHEMA_RECHECK = 30
+
+_lock = threading.Lock()
+_state = {"ready": False, "missing": [], "checked_at": None}
+
+
+class ChatSchemaNotReady(APIException):
+    status_code = 503
+    default_detail = "Chat jadvallari hali yaratilmagan. Serverda 'python manage.py migrate' ni ishga tushiring."
+    default_code = 'chat_schema_not_ready'
+
+
+def chat_tables():
+    return [
+        Conversation._meta.db_table,
+        Conversation.participants.through._meta.db_table,
+        Message._meta.db_table,
+        ConversationReadState._meta.db_table,
+        MessageSearchToken._meta.db_table,
+    ]
+
+
+def check_chat_schema(force=False):
+    """
+    Döndürür: (ready, missing_tables). Tablolar bir kez bulunduktan sonra süreç
+    boyunca tekrar sorgu atılmaz.
+    """
+    if _state["ready"] and not force:
+        return True, []
+    with _lock:
+        checked_at = _state["checked_at"]
+        recent = checked_at is not None and time.monotonic() - checked_at < CHAT_SCHEMA_RECHECK
+        if not force and (_state["ready"] or recent):
+            return _state["ready"], list(_state["missing"])
+
+        existing = set(connection.introspection.table_names())
+        missing = [table for table in chat_tables() if table not in existing]
+        _state.update(ready=not missing, missing=missing, checked_at=time.monotonic())
+        return not missing, missing
+
+
+def require_chat_schema():
+    ready, missing = check_chat_schema()
+    if not ready:
+        raise ChatSchemaNotReady()
+
+
+def readyz(request):
+    """GET /readyz/ — DB erişilebilir ve chat tabloları var mı (load balancer / deploy kontrolü)."""
+    try:
+        ready, missing = check_chat_schema()
+    except Exception as e:
+        return JsonResponse({"status": "unavailable", "database": str(e)}, status=503)
+    return JsonResponse(
+        {"status": "ok" if ready else "not_ready", "missing_tables": missing},
+        status=200 if ready else 503,
+    )
@@ -0,0 +1,221 @@
+# user_app/realtime.py
+# Chat olaylarını (yeni mesaj, okundu, okunmamış sayısı) bağlı katılımcılara iter.
+# İstemci user_app/events/ (SSE) ile bağlanır; unread-count polling'e gerek kalmaz.
+#
+# Broker settings.CHAT_BROKER ile seçilir (boşsa PostgreSQL'de PgNotifyBroker):
+#   LocalBroker     — süreç içi; tek worker / runserver için
+#   PgNotifyBroker  — PostgreSQL LISTEN/NOTIFY; yayın hangi süreçten (gunicorn WSGI
+#                     worker'ı, ASGI worker'ı) yapılırsa yapılsın tüm worker'lara dağıtır
+# Procfile/Dockerfile'da web birden fazla gunicorn (uvicorn) worker süreci: LocalBroker'la
+# bir worker'da yayınlanan olay diğerindeki SSE bağlantısına hiç ulaşmaz — checks.py bunu uyarır.
+import asyncio
+import json
+import logging
+import select
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection, connections, transaction
+from django.utils.module_loading import import_string
+
+from .models import Conversation
+from .read_state import unread_message_count
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    """Bir SSE bağlantısının kuyruğu. put() herhangi bir thread'den çağrılabilir."""
+
+    MAX_QUEUE = 100
+
+    def __init__(self, broker, user_id, loop):
+        self.broker = broker
+        self.user_id = user_id
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=self.MAX_QUEUE)
+        self.overflowed = False
+
+    def put(self, event):
+        try:
+            self.loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            pass   # event loop kapanmış — bağlantı zaten gitti
+
+    def _put(self, event):
+        if self.queue.full():
+            # Yavaş istemci: olayları biriktirme, bir sonraki get'te "resync" gönder
+            self.overflowed = True
+        else:
+            self.queue.put_nowait(event)
+
+    async def get(self, timeout):
+        if self.overflowed:
+            self.overflowed = False
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            return {"type": "resync"}
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class LocalBroker:
+    """Süreç içi fan-out: user_id → o kullanıcının açık bağlantıları."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}
+
+    def subscribe(self, user_id):
+        subscription = Subscription(self, user_id, asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscribers.get(subscription.user_id)
+            if subscriptions:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscribers[subscription.user_id]
+
+    def connection_count(self):
+        with self._lock:
+            return sum(len(s) for s in self._subscribers.values())
+
+    def publish(self, user_ids, event):
+        self.deliver(user_ids, event)
+
+    def deliver(self, user_ids, event):
+        with self._lock:
+            targets = [s for user_id in user_ids for s in self._subscribers.get(user_id, ())]
+        for subscription in targets:
+            subscription.put(event)
+
+
+class PgNotifyBroker(LocalBroker):
+    """
+    publish() → pg_notify; her süreçteki tek bir dinleyici thread LISTEN eder ve
+    kendi aboneleri için LocalBroker.deliver'a verir. NOTIFY payload sınırı ~8000
+    byte — büyük olaylar "resync" olarak gider, istemci geçmişi API'den çeker.
+    """
+    CHANNEL = 'chat_events'
+    MAX_PAYLOAD = 7900
+
+    def __init__(self):
+        super().__init__()
+        self._listener = None
+
+    def subscribe(self, user_id):
+        if self._listener is None:
+            with self._lock:
+                if self._listener is None:
+                    self._listener = threading.Thread(target=self._listen, name='chat-listen', daemon=True)
+                    self._listener.start()
+        return super().subscribe(user_id)
+
+    def publish(self, user_ids, event):
+        payload = json.dumps({"users": list(user_ids), "event": event}, ensure_ascii=False, default=str)
+        if len(payload.encode()) > self.MAX_PAYLOAD:
+            payload = json.dumps({"users": list(user_ids), "event": {
+                "type": "resync", "conversation": event.get("conversation"),
+            }})
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_notify(%s, %s)", [self.CHANNEL, payload])
+
+    def _listen(self):
+        wrapper = connections['default']
+        while True:
+            conn = None
+            try:
+                conn = wrapper.get_new_connection(wrapper.get_connection_params())
+                conn.autocommit = True
+                with conn.cursor() as cursor:
+                    cursor.execute(f"LISTEN {self.CHANNEL}")
+                while True:
+                    if select.select([conn], [], [], 30) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        notify = conn.notifies.pop(0)
+                        data = json.loads(notify.payload)
+                        self.deliver(data["users"], data["event"])
+            except Exception:
+                logger.exception("chat LISTEN connection lost, reconnecting")
+                time.sleep(2)
+            finally:
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def broker_path():
+    path = getattr(settings, 'CHAT_BROKER', None)
+    if path:
+        return path
+    if connection.vendor == 'postgresql':
+        return 'user_app.realtime.PgNotifyBroker'
+    return 'user_app.realtime.LocalBroker'
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                _broker = import_string(broker_path())()
+    return _broker
+
+
+def publish_on_commit(user_ids, event):
+    # Rollback olan mesaj yayınlanmasın; istemci olayı aldığında satır DB'de olsun
+    user_ids = list(user_ids)
+    transaction.on_commit(lambda: get_broker().publish(user_ids, event))
+
+
+def participant_ids(conversation_ids):
+    """conversation_id → [user_id, ...]; tek sorgu."""
+    result = {}
+    rows = Conversation.participants.through.objects.filter(
+        conversation_id__in=conversation_ids
+    ).values_list('conversation_id', 'customuser_id')
+    for conversation_id, user_id in rows:
+        result.setdefault(conversation_id, []).append(user_id)
+    return result
+
+
+def notify_new_message(message):
+    from .serializers import MessageSerializer
+
+    users = participant_ids([message.conversation_id]).get(message.conversation_id, [])
+    publish_on_commit(users, {
+        "type": "message",
+        "conversation": message.conversation_id,
+        "message": MessageSerializer(message).data,
+    })
+    for user_id in users:
+        if user_id != message.sender_id:
+            notify_unread_count(user_id)
+
+
+def notify_read(reader_id, conversation_ids):
+    """Okundu bilgisi sohbetin katılımcılarına, yeni okunmamış sayısı okuyana."""
+    for conversation_id, users in participant_ids(conversation_ids).items():
+        publish_on_commit(users, {"type": "read", "conversation": conversation_id, "reader": reader_id})
+    notify_unread_count(reader_id)
+
+
+def notify_unread_count(user_id):
+    def send():
+        get_broker().publish([user_id], {"type": "unread_count", "count": unread_message_count(user_id)})
+    transaction.on_commit(send)
@@ -0,0 +1,102 @@
+# user_app/search_index.py
+# Şifreli mesajlarda kelime araması (blind index). Mesaj yazılırken metindeki her
+# kelime için HMAC-SHA256(anahtar, kelime) token'ı MessageSearchToken'a yazılır;
+# arama kelimeleri aynı şekilde token'a çevrilip index'te eşitlikle aranır.
+# Düz metin hiç saklanmaz. Not: token'lar deterministik — aynı kelime aynı token,
+# yani DB'yi gören biri kelime sıklığını görebilir (içeriği değil). Anahtar
+# MESSAGE_SEARCH_KEY; yoksa FIELD_ENCRYPTION_KEY'den ayrı bir amaçla türetilir.
+import hashlib
+import hmac
+import re
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+
+from .models import Message, MessageSearchToken
+
+MESSAGE_SEARCH_MAX_TOKENS = getattr(settings, 'MESSAGE_SEARCH_MAX_TOKENS', 200)
+MIN_WORD_LENGTH = 2
+
+_WORD = re.compile(r"\w+")
+_key = None
+
+
+def search_key():
+    global _key
+    if _key is None:
+        key = getattr(settings, 'MESSAGE_SEARCH_KEY', None)
+        if not key:
+            field_key = settings.FIELD_ENCRYPTION_KEY
+            if isinstance(field_key, (list, tuple)):
+                field_key = field_key[0]
+            # Şifreleme anahtarının kendisi HMAC anahtarı olarak kullanılmasın
+            key = hmac.new(field_key.encode(), b"message-search-index", hashlib.sha256).digest()
+        _key = key.encode() if isinstance(key, str) else key
+    return _key
+
+
+def words(text):
+    """Metindeki tekil kelimeler (küçük harf), en fazla MESSAGE_SEARCH_MAX_TOKENS."""
+    result = dict.fromkeys(w for w in _WORD.findall((text or "").casefold()) if len(w) >= MIN_WORD_LENGTH)
+    return list(result)[:MESSAGE_SEARCH_MAX_TOKENS]
+
+
+def blind_token(word):
+    return hmac.new(search_key(), word.encode(), hashlib.sha256).hexdigest()[:32]
+
+
+def message_tokens(message, text):
+    return [
+        MessageSearchToken(message_id=message.id, conversation_id=message.conversation_id, token=blind_token(word))
+        for word in words(text)
+    ]
+
+
+def index_message(message, created=False):
+    """Mesajın token'larını yeniden yazar; message.text düz metin (kaydedilen değer)."""
+    with transaction.atomic():
+        if not created:
+            MessageSearchToken.objects.filter(message_id=message.id).delete()
+        MessageSearchToken.objects.bulk_create(message_tokens(message, message.text), ignore_conflicts=True)
+
+
+def rebuild_search_index(batch_size=500, conversation_id=None, company_id=None):
+    """Mevcut mesajları id sırasıyla batch batch indexler. Döndürür: mesaj sayısı."""
+    messages = Message.objects.only('id', 'conversation_id', 'text').order_by('id')
+    if conversation_id is not None:
+        messages = messages.filter(conversation_id=conversation_id)
+    if company_id is not None:
+        messages = messages.filter(conversation__participants__company_id=company_id).distinct()
+
+    done = 0
+    last_id = 0
+    while True:
+        batch = list(messages.filter(id__gt=last_id)[:batch_size])
+        if not batch:
+            return done
+        with transaction.atomic():
+            MessageSearchToken.objects.filter(message_id__in=[m.id for m in batch]).delete()
+            MessageSearchToken.objects.bulk_create(
+                [token for message in batch for token in message_tokens(message, message.text)],
+                batch_size=2000, ignore_conflicts=True,
+            )
+        done += len(batch)
+        last_id = batch[-1].id
+
+
+def matching_message_ids(query, conversation_ids):
+    """
+    Sorgudaki tüm kelimeleri içeren mesaj id'leri (subquery). Kelime yoksa None.
+    conversation_ids: id listesi ya da values('id') queryset'i.
+    """
+    tokens = [blind_token(word) for word in words(query)]
+    if not tokens:
+        return None
+    return (
+        MessageSearchToken.objects.filter(token__in=tokens, conversation_id__in=conversation_ids)
+        .values('message_id')
+        .annotate(matched=Count('token'))
+        .filter(matched=len(tokens))
+        .values('message_id')
+    )
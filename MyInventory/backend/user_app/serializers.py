@@ -1,6 +1,10 @@
 from rest_framework import serializers
 from .models import CustomUser, Company, Conversation, Message
+from .message_text import decrypt_cached, message_text
+from .read_state import is_read, read_watermarks
 from django.contrib.auth import authenticate
+from django.core.files.storage import default_storage
+from django.urls import reverse
 
 class CompanySerializer(serializers.ModelSerializer):
     class Meta:
@@ -57,14 +61,42 @@ class UserLoginSerializer(serializers.Serializer):
         return data
 
 # message serializers
+class MessageTextField(serializers.CharField):
+    """Okurken message_text: with_ciphertext ile yüklenen mesaj sadece burada (cache'li) çözülür."""
+
+    def get_attribute(self, instance):
+        return message_text(instance)
+
+
 class MessageSerializer(serializers.ModelSerializer):
     sender_username = serializers.CharField(source='sender.username', read_only=True)
     sender_role = serializers.CharField(source='sender.role', read_only=True)
+    text = MessageTextField(required=False, allow_blank=True, allow_null=True)
+    # Sohbetin read state watermark'larından: gönderen dışındaki herkes buraya kadar okudu mu
+    is_read = serializers.SerializerMethodField()
+    # Range/ETag destekli indirme endpoint'i; listede tam resim yerine thumbnail kullanılır
+    attachment_url = serializers.SerializerMethodField()
     
     class Meta:
         model = Message
-        fields = ['id', 'conversation', 'sender', 'sender_username', 'sender_role', 'text', 'created_at', 'is_read', 'attachment']
-        read_only_fields = ['id', 'sender', 'sender_username', 'sender_role', 'created_at', 'is_read', 'attachment']
+        fields = ['id', 'conversation', 'sender', 'sender_username', 'sender_role', 'text', 'created_at', 'is_read',
+                  'attachment', 'attachment_url', 'attachment_size', 'attachment_type', 'thumbnail']
+        read_only_fields = ['id', 'sender', 'sender_username', 'sender_role', 'created_at', 'is_read',
+                            'attachment', 'attachment_size', 'attachment_type', 'thumbnail']
+
+    def get_attachment_url(self, obj):
+        if not obj.attachment:
+            return None
+        url = reverse('message-attachment', args=[obj.id])
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+
+    def get_is_read(self, obj):
+        # many=True'da context ortak — sohbet başına bir sorgu, mesaj başına değil
+        watermarks = self.context.setdefault('read_watermarks', {})
+        if obj.conversation_id not in watermarks:
+            watermarks.update(read_watermarks([obj.conversation_id]))
+        return is_read(obj, watermarks[obj.conversation_id])
 
 class ConversationSerializer(serializers.ModelSerializer):
     participants = CustomUserSerializer(many=True, read_only=True)
@@ -72,4 +104,35 @@ class ConversationSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Conversation
-        fields = ['id', 'participants', 'messages', 'created_at']
\ No newline at end of file
+        fields = ['id', 'participants', 'messages', 'created_at']
+
+
+class ConversationSummarySerializer(serializers.ModelSerializer):
+    """
+    Sohbet listesi için: mesajlar gömülmez, sadece son mesaj önizlemesi.
+    Alanlar ConversationViewSet'teki annotate'lerden gelir (sorgu sayısı sabit).
+    """
+    PREVIEW_LENGTH = 120
+
+    participants = CustomUserSerializer(many=True, read_only=True)
+    last_activity = serializers.DateTimeField(read_only=True)
+    unread_count = serializers.IntegerField(read_only=True)
+    last_message = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Conversation
+        fields = ['id', 'participants', 'created_at', 'last_activity', 'unread_count', 'last_message']
+
+    def get_last_message(self, obj):
+        if obj.last_message_id is None:
+            return None
+        # Subquery şifreli değeri ham getirir; önizleme cache'li çözülür
+        text = decrypt_cached(obj.last_message_id, obj.last_message_text) or ""
+        return {
+            "id": obj.last_message_id,
+            "sender": obj.last_message_sender_id,
+            "text": text[:self.PREVIEW_LENGTH],
+            "has_attachment": bool(obj.last_message_attachment),
+            "thumbnail": default_storage.url(obj.last_message_thumbnail) if obj.last_message_thumbnail else None,
+            "created_at": serializers.DateTimeField().to_representation(obj.last_message_at),
+        }
@@ -0,0 +1,66 @@
+# user_app/signals.py
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+from .models import Company, Conversation, ConversationReadState, CustomUser, Message
+from .attachments import is_image, schedule_thumbnail
+from .authentication import forget_tokens, forget_user_tokens
+from .read_state import add_participants, message_added, message_removed
+from .realtime import notify_new_message
+from .search_index import index_message
+
+
+@receiver(post_save, sender=Message)
+def message_saved(sender, instance, created, update_fields=None, **kwargs):
+    # perform_create, direct-message, admin — hepsi buradan geçer; yayın commit'ten sonra
+    if created:
+        message_added(instance)
+        notify_new_message(instance)
+        if instance.attachment and is_image(instance):
+            schedule_thumbnail(instance)
+    # Arama token'ları: text yazıldıysa (defer edilip yüklenmemişse metin değişmemiştir)
+    if 'text' in instance.__dict__ and (created or update_fields is None or 'text' in update_fields):
+        index_message(instance, created=created)
+
+
+@receiver(post_delete, sender=Message)
+def message_deleted(sender, instance, **kwargs):
+    message_removed(instance)
+
+
+@receiver(m2m_changed, sender=Conversation.participants.through)
+def participants_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    # conversation.participants.* (reverse=False) ya da user.conversations.* (reverse=True)
+    if action == 'post_add':
+        if reverse:
+            for conversation_id in pk_set:
+                add_participants(conversation_id, [instance.pk])
+        else:
+            add_participants(instance.pk, pk_set)
+    elif action == 'post_remove':
+        if reverse:
+            ConversationReadState.objects.filter(user=instance, conversation_id__in=pk_set).delete()
+        else:
+            ConversationReadState.objects.filter(conversation=instance, user_id__in=pk_set).delete()
+    elif action == 'post_clear':
+        ConversationReadState.objects.filter(**{'user' if reverse else 'conversation': instance}).delete()
+
+
+
+# Token cache'i: logout / user silme token'ı siler; şifre, rol, is_active değişikliği user'ı kaydeder
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    forget_tokens([instance.key])
+
+
+@receiver(post_save, sender=CustomUser)
+def user_saved(sender, instance, created, **kwargs):
+    if not created:
+        forget_user_tokens([instance.pk])
+
+
+@receiver(post_save, sender=Company)
+def company_saved(sender, instance, created, **kwargs):
+    # Cache'teki user'lar company'yi de taşıyor (ad, is_active)
+    if not created:
+        forget_user_tokens(CustomUser.objects.filter(company=instance).values('id'))
@@ -1,3 +1,636 @@
-from django.test import TestCase
+import asyncio
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from io import BytesIO, StringIO
+from unittest.mock import patch
 
-# Create your tests here.
+from django.core.cache import caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from encrypted_model_fields.fields import decrypt_str
+from PIL import Image
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.test import APIClient, APIRequestFactory
+
+from .attachments import UploadError, append_chunk, partial_path, start_upload, take_upload
+from .authentication import PROCESS_LOCAL_MAX_TTL, CachedTokenAuthentication
+from .models import AttachmentUpload, Company, CustomUser, Conversation, Message, MessageSearchToken
+from .message_text import plaintext_cache
+from .readiness import check_chat_schema
+from .checks import auth_token_cache_check, chat_broker_check
+from .realtime import LocalBroker, broker_path
+
+DDL_PREFIXES = ('CREATE', 'ALTER', 'DROP')
+
+
+class ChatSchemaGateTests(TestCase):
+    """Chat endpoint'leri steady-state'te DDL ve introspection sorgusu çalıştırmamalı."""
+
+    @classmethod
+    def setUpTestData(cls):
+        company = Company.objects.create(name="Chat Co")
+        cls.user = CustomUser.objects.create(username="ali", company=company)
+        cls.other = CustomUser.objects.create(username="vali", company=company)
+        cls.conversation = Conversation.objects.create()
+        cls.conversation.participants.set([cls.user, cls.other])
+        Message.objects.create(conversation=cls.conversation, sender=cls.other, text="salom")
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def chat_requests(self):
+        yield self.client.get('/user_app/conversations/')
+        yield self.client.get(f'/user_app/conversations/{self.conversation.id}/')
+        yield self.client.get('/user_app/messages/')
+        yield self.client.get('/user_app/messages/unread-count/')
+        yield self.client.post('/user_app/messages/mark-as-read/', {'conversation_id': self.conversation.id}, format='json')
+        yield self.client.post('/user_app/messages/direct-message/', {'receiver_id': self.other.id, 'text': 'hi'}, format='json')
+
+    def test_no_ddl_in_steady_state(self):
+        # Süreçteki ilk kontrol (introspection) burada olur
+        self.assertEqual(check_chat_schema(), (True, []))
+
+        with CaptureQueriesContext(connection) as ctx:
+            for response in self.chat_requests():
+                self.assertLess(response.status_code, 400, response.content)
+
+        ddl = [q['sql'] for q in ctx.captured_queries if q['sql'].lstrip().upper().startswith(DDL_PREFIXES)]
+        self.assertEqual(ddl, [])
+        introspection = [q['sql'] for q in ctx.captured_queries if 'sqlite_master' in q['sql'] or 'pg_catalog' in q['sql']]
+        self.assertEqual(introspection, [])
+
+    def test_readyz(self):
+        response = self.client.get('/readyz/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['status'], 'ok')
+
+
+class ConversationListTests(TestCase):
+    """Sohbet listesi sohbet/mesaj sayısından bağımsız, sabit sayıda sorgu atmalı."""
+
+    def setUp(self):
+        company = Company.objects.create(name="List Co")
+        self.user = CustomUser.objects.create(username="ali", company=company)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        check_chat_schema()
+
+    def add_conversations(self, count, messages):
+        for n in range(count):
+            other = CustomUser.objects.create(username=f"user{CustomUser.objects.count()}")
+            conversation = Conversation.objects.create()
+            conversation.participants.set([self.user, other])
+            for m in range(messages):
+                Message.objects.create(conversation=conversation, sender=other, text=f"xabar {m}")
+
+    def list_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/user_app/conversations/')
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries), response.json()['results']
+
+    def test_constant_queries_and_summary(self):
+        self.add_conversations(2, messages=1)
+        few, _ = self.list_queries()
+        self.add_conversations(8, messages=5)
+        many, results = self.list_queries()
+        self.assertEqual(few, many)
+
+        self.assertEqual(len(results), 10)
+        latest = results[0]
+        self.assertNotIn('messages', latest)
+        self.assertEqual(latest['unread_count'], 5)
+        self.assertEqual(latest['last_message']['text'], "xabar 4")
+        self.assertEqual(len(latest['participants']), 2)
+
+
+class MessageHistoryTests(TestCase):
+    """conversations/<id>/messages/: before/after keyset sayfaları, aynı created_at'te id sırası."""
+
+    def setUp(self):
+        company = Company.objects.create(name="History Co")
+        self.user = CustomUser.objects.create(username="ali", company=company)
+        self.other = CustomUser.objects.create(username="vali", company=company)
+        self.conversation = Conversation.objects.create()
+        self.conversation.participants.set([self.user, self.other])
+        base = timezone.now() - timedelta(hours=1)
+        # 3., 4. ve 5. mesaj aynı anda — sıra id ile belirlenmeli
+        offsets = [0, 1, 2, 2, 2, 3, 4]
+        self.ids = []
+        for n, offset in enumerate(offsets):
+            message = Message.objects.create(conversation=self.conversation, sender=self.other, text=f"xabar {n}")
+            Message.objects.filter(pk=message.pk).update(created_at=base + timedelta(minutes=offset))
+            self.ids.append(message.id)
+        noise = Conversation.objects.create()
+        noise.participants.set([self.user])
+        self.foreign = Message.objects.create(conversation=noise, sender=self.user, text="boshqa").id
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        check_chat_schema()
+
+    def page(self, **params):
+        response = self.client.get(f'/user_app/conversations/{self.conversation.id}/messages/', params)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        return [message['id'] for message in data['results']], data
+
+    def test_walk_backwards_and_forwards(self):
+        ids, data = self.page(limit=3)
+        self.assertEqual(ids, self.ids[-3:])
+        seen = ids
+        while data['has_more']:
+            ids, data = self.page(limit=3, before=data['before'])
+            seen = ids + seen
+        self.assertEqual(seen, self.ids)
+
+        ids, data = self.page(limit=3, after=self.ids[0])
+        self.assertEqual((ids, data['has_more']), (self.ids[1:4], True))
+        ids, data = self.page(limit=3, after=data['after'])
+        self.assertEqual((ids, data['has_more']), (self.ids[4:], False))
+        # Sonda yeni mesaj yok — after cursor'ı yerinde kalır
+        ids, data = self.page(after=self.ids[-1])
+        self.assertEqual((ids, data['after']), ([], self.ids[-1]))
+
+    def test_invalid_cursors(self):
+        url = f'/user_app/conversations/{self.conversation.id}/messages/'
+        self.assertEqual(self.client.get(url, {'before': self.foreign}).status_code, 404)
+        self.assertEqual(self.client.get(url, {'before': self.ids[2], 'after': self.ids[1]}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'before': "abc"}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'limit': 0}).status_code, 400)
+        # Sayı olmayan pk 500 değil 404
+        self.assertEqual(self.client.get('/user_app/conversations/abc/messages/').status_code, 404)
+        self.assertEqual(self.client.get('/user_app/messages/abc/').status_code, 404)
+
+
+class ChatRealtimeTests(TestCase):
+    """Yeni mesaj commit'ten sonra katılımcıların açık bağlantılarına gitmeli."""
+
+    def setUp(self):
+        company = Company.objects.create(name="Live Co")
+        self.sender = CustomUser.objects.create(username="vali", company=company)
+        self.receiver = CustomUser.objects.create(username="soli", company=company)
+        self.client = APIClient()
+        self.client.force_authenticate(self.sender)
+        check_chat_schema()
+
+    def test_direct_message_is_pushed(self):
+        broker = LocalBroker()
+        loop = asyncio.new_event_loop()
+        self.addCleanup(loop.close)
+
+        async def subscribe():
+            return broker.subscribe(self.receiver.id)
+
+        subscription = loop.run_until_complete(subscribe())
+        with patch('user_app.realtime.get_broker', return_value=broker):
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post('/user_app/messages/direct-message/',
+                                            {"receiver_id": self.receiver.id, "text": "salom"}, format='json')
+        self.assertEqual(response.status_code, 201)
+
+        events = [loop.run_until_complete(subscription.get(1)) for _ in range(2)]
+        self.assertEqual([e["type"] for e in events], ["message", "unread_count"])
+        self.assertEqual(events[0]["message"]["text"], "salom")
+        self.assertEqual(events[1]["count"], 1)
+
+        subscription.close()
+        self.assertEqual(broker.connection_count(), 0)
+
+    def test_default_broker_follows_database(self):
+        expected = 'PgNotifyBroker' if connection.vendor == 'postgresql' else 'LocalBroker'
+        with override_settings(CHAT_BROKER=None, DEBUG=False):
+            self.assertTrue(broker_path().endswith(expected))
+            warnings = [w.id for w in chat_broker_check(None)]
+        self.assertEqual(warnings, ['user_app.W001'] if expected == 'LocalBroker' else [])
+        with override_settings(CHAT_BROKER='user_app.realtime.LocalBroker', DEBUG=False):
+            self.assertEqual(chat_broker_check(None), [])
+
+
+class ReadStateTests(TestCase):
+    """Okundu/okunmamış sayısı mesaj sayısından bağımsız: watermark + sayaç."""
+
+    def setUp(self):
+        company = Company.objects.create(name="Read Co")
+        self.user = CustomUser.objects.create(username="nodir", company=company)
+        self.friend = CustomUser.objects.create(username="jasur", company=company)
+        self.third = CustomUser.objects.create(username="aziz", company=company)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        check_chat_schema()
+
+    def conversation(self, *users):
+        conversation = Conversation.objects.create()
+        conversation.participants.set(users)
+        return conversation
+
+    def unread(self):
+        return self.client.get('/user_app/messages/unread-count/').json()['count']
+
+    def test_mark_as_read_is_one_row_write(self):
+        conversation = self.conversation(self.user, self.friend)
+        for n in range(30):
+            Message.objects.create(conversation=conversation, sender=self.friend, text=f"x{n}")
+        Message.objects.create(conversation=conversation, sender=self.user, text="mine")
+        self.assertEqual(self.unread(), 30)
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post('/user_app/messages/mark-as-read/', {"conversation_id": conversation.id})
+        self.assertEqual(response.status_code, 200)
+        writes = [q['sql'] for q in ctx.captured_queries if q['sql'].startswith('UPDATE')]
+        self.assertEqual(len(writes), 1)
+        self.assertIn('user_app_conversationreadstate', writes[0])
+        self.assertEqual(self.unread(), 0)
+
+        # Tekrar: yeni bir şey yok, yazma yok
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.post('/user_app/messages/mark-as-read/', {"conversation_id": conversation.id})
+        self.assertFalse([q for q in ctx.captured_queries if q['sql'].startswith('UPDATE')])
+
+    def test_group_is_read_needs_every_recipient(self):
+        group = self.conversation(self.user, self.friend, self.third)
+        Message.objects.create(conversation=group, sender=self.user, text="hammaga")
+
+        def is_read():
+            return self.client.get(f'/user_app/conversations/{group.id}/messages/').json()['results'][0]['is_read']
+
+        self.assertFalse(is_read())
+        self.client.force_authenticate(self.friend)
+        self.client.post('/user_app/messages/mark-as-read/', {"conversation_id": group.id})
+        self.assertFalse(is_read())
+        self.client.force_authenticate(self.third)
+        self.client.post('/user_app/messages/mark-as-read/', {"conversation_id": group.id})
+        self.assertTrue(is_read())
+
+        # Okunmadan silinen mesaj sayaçtan düşer
+        incoming = Message.objects.create(conversation=group, sender=self.friend, text="?")
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.unread(), 1)
+        incoming.delete()
+        self.assertEqual(self.unread(), 0)
+
+    def test_receiver_id_marks_only_the_direct_conversation(self):
+        group = self.conversation(self.user, self.friend, self.third)
+        direct, _ = Conversation.get_or_create_direct(self.user.id, self.friend.id)
+        Message.objects.create(conversation=group, sender=self.friend, text="guruhda")
+        Message.objects.create(conversation=direct, sender=self.friend, text="shaxsiy")
+        self.assertEqual(self.unread(), 2)
+
+        response = self.client.post('/user_app/messages/mark-as-read/', {"receiver_id": self.friend.id})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.unread(), 1)
+        bad = self.client.post('/user_app/messages/mark-as-read/', {"receiver_id": "abc"})
+        self.assertEqual(bad.status_code, 400)
+
+
+class DirectMessageTests(TestCase):
+
+    def setUp(self):
+        company = Company.objects.create(name="DM Co")
+        self.a = CustomUser.objects.create(username="olim", company=company)
+        self.b = CustomUser.objects.create(username="karim", company=company)
+        self.client = APIClient()
+        check_chat_schema()
+
+    def send(self, sender, receiver):
+        self.client.force_authenticate(sender)
+        response = self.client.post('/user_app/messages/direct-message/',
+                                    {"receiver_id": receiver.id, "text": "salom"}, format='json')
+        self.assertEqual(response.status_code, 201)
+        return response.json()['conversation']
+
+    def test_both_directions_share_one_conversation(self):
+        group = Conversation.objects.create()
+        group.participants.set([self.a, self.b, CustomUser.objects.create(username="uchinchi")])
+
+        first = self.send(self.a, self.b)
+        self.assertNotEqual(first, group.id)
+        self.assertEqual(self.send(self.b, self.a), first)
+        self.assertEqual(Conversation.objects.filter(dm_user_low=self.a, dm_user_high=self.b).count(), 1)
+
+    def test_two_person_create_is_the_direct_conversation(self):
+        first = self.send(self.a, self.b)
+        self.client.force_authenticate(self.b)
+        response = self.client.post('/user_app/conversations/', {"participants": [self.a.id]}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['id'], first)
+        self.assertEqual(Conversation.objects.count(), 1)
+
+        third = CustomUser.objects.create(username="uchinchi", company=self.a.company)
+        group = self.client.post('/user_app/conversations/', {"participants": [self.a.id, third.id]}, format='json')
+        self.assertIsNone(Conversation.objects.get(id=group.json()['id']).dm_user_low)
+        for participants in (["abc"], [999999]):
+            bad = self.client.post('/user_app/conversations/', {"participants": participants}, format='json')
+            self.assertEqual(bad.status_code, 400, participants)
+
+    def test_lost_race_returns_existing(self):
+        existing, _ = Conversation.get_or_create_direct(self.b.id, self.a.id)
+        # Diğer istek arada oluşturmuş gibi: ilk get boş döner, create unique index'e takılır
+        with patch.object(Conversation.objects, 'filter', side_effect=[Conversation.objects.none()]):
+            conversation, created = Conversation.get_or_create_direct(self.a.id, self.b.id)
+        self.assertFalse(created)
+        self.assertEqual(conversation, existing)
+
+    def test_list_filtered_by_receiver_pages_one_conversation(self):
+        third = CustomUser.objects.create(username="uchinchi", company=self.a.company)
+        for _ in range(3):
+            self.send(self.a, self.b)
+        self.send(self.a, third)
+        self.client.force_authenticate(self.a)
+        page = self.client.get('/user_app/messages/', {'receiver_id': self.b.id, 'page_size': 2}).json()
+        self.assertEqual(len(page['results']), 2)
+        rest = self.client.get(page['next']).json()
+        self.assertEqual((len(rest['results']), rest['next']), (1, None))
+        self.assertEqual(self.client.get('/user_app/messages/', {'receiver_id': "x"}).status_code, 400)
+
+
+class MessageTextTests(TestCase):
+    """Mesaj metni sadece render edilirken çözülür; tekrar okumada LRU'dan gelir."""
+
+    def setUp(self):
+        company = Company.objects.create(name="Crypt Co")
+        self.user = CustomUser.objects.create(username="sardor", company=company)
+        self.conversation = Conversation.objects.create()
+        self.conversation.participants.set([self.user])
+        self.message = Message.objects.create(conversation=self.conversation, sender=self.user, text="sir")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        check_chat_schema()
+        plaintext_cache.clear()
+
+    def test_decrypts_once_and_tracks_edits(self):
+        url = f'/user_app/conversations/{self.conversation.id}/messages/'
+        with patch('user_app.message_text.decrypt_str', wraps=decrypt_str) as decrypt:
+            self.assertEqual(self.client.get(url).json()['results'][0]['text'], "sir")
+            self.assertEqual(self.client.get(url).json()['results'][0]['text'], "sir")
+        self.assertEqual(decrypt.call_count, 1)
+
+        response = self.client.patch(f'/user_app/messages/{self.message.id}/', {"text": "yangi"}, format='json')
+        self.assertEqual(response.json()['text'], "yangi")
+        # Ciphertext değişti — eski cache kaydı kullanılmaz
+        self.assertEqual(self.client.get(url).json()['results'][0]['text'], "yangi")
+        self.assertEqual(self.client.get('/user_app/conversations/').json()['results'][0]['last_message']['text'], "yangi")
+
+
+class MessageSearchTests(TestCase):
+
+    def setUp(self):
+        company = Company.objects.create(name="Search Co")
+        self.user = CustomUser.objects.create(username="bobur", company=company)
+        other = CustomUser.objects.create(username="begona", company=company)
+        self.mine = Conversation.objects.create()
+        self.mine.participants.set([self.user, other])
+        self.foreign = Conversation.objects.create()
+        self.foreign.participants.set([other])
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        check_chat_schema()
+
+    def search(self, q, **params):
+        response = self.client.get('/user_app/messages/search/', {"q": q, **params})
+        self.assertEqual(response.status_code, 200)
+        return [m['text'] for m in response.json()['results']]
+
+    def test_search_is_scoped_and_follows_edits(self):
+        Message.objects.create(conversation=self.mine, sender=self.user, text="Un 50 qop keldi")
+        edited = Message.objects.create(conversation=self.mine, sender=self.user, text="Shakar yo'q")
+        Message.objects.create(conversation=self.foreign, sender=self.user, text="un begona")
+
+        self.assertEqual(self.search("UN"), ["Un 50 qop keldi"])
+        self.assertEqual(self.search("qop un", conversation=self.mine.id), ["Un 50 qop keldi"])
+        self.assertEqual(self.search("un shakar"), [])
+        # Token'lar düz metin değil
+        self.assertFalse(MessageSearchToken.objects.filter(token__in=["un", "qop"]).exists())
+
+        edited.text = "Shakar ham keldi"
+        edited.save()
+        self.assertEqual(self.search("keldi"), ["Shakar ham keldi", "Un 50 qop keldi"])
+        self.assertEqual(self.client.get('/user_app/messages/search/', {"q": "a"}).status_code, 400)
+
+    def test_backfill_command(self):
+        Message.objects.create(conversation=self.mine, sender=self.user, text="eski xabar")
+        MessageSearchToken.objects.all().delete()
+        self.assertEqual(self.search("eski"), [])
+        call_command('rebuild_message_search', '--batch-size', '1', stdout=StringIO())
+        self.assertEqual(self.search("eski"), ["eski xabar"])
+
+
+class AttachmentTests(TestCase):
+    """Parça parça yükleme, Range/ETag indirme, resim eklerinde thumbnail."""
+
+    def setUp(self):
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=os.path.join(tmp, 'media'), CHAT_THUMBNAIL_WORKERS=0)
+        media.enable()
+        self.addCleanup(media.disable)
+        partial = patch('user_app.attachments.CHAT_UPLOAD_TEMP_DIR', os.path.join(tmp, 'partial'))
+        partial.start()
+        self.addCleanup(partial.stop)
+
+        company = Company.objects.create(name="File Co")
+        self.user = CustomUser.objects.create(username="farrux", company=company)
+        self.other = CustomUser.objects.create(username="malika", company=company)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        check_chat_schema()
+
+    def put(self, upload_id, data, start, size):
+        return self.client.generic(
+            'PUT', f'/user_app/attachments/uploads/{upload_id}/', data, content_type='application/octet-stream',
+            HTTP_CONTENT_RANGE=f"bytes {start}-{start + len(data) - 1}/{size}",
+        )
+
+    def test_resumable_upload_and_range_download(self):
+        payload = bytes(range(256)) * 40
+        upload = self.client.post('/user_app/attachments/uploads/',
+                                  {"filename": "hisobot.bin", "size": len(payload)}, format='json').json()
+        upload_id = upload['upload_id']
+
+        self.assertEqual(self.put(upload_id, payload[:4000], 0, len(payload)).json()['received'], 4000)
+        # Kopan bağlantıdan sonra yanlış yerden devam → 409 ve doğru offset
+        conflict = self.put(upload_id, payload[6000:], 6000, len(payload))
+        self.assertEqual((conflict.status_code, conflict.json()['received']), (409, 4000))
+        done = self.put(upload_id, payload[4000:], 4000, len(payload))
+        self.assertEqual(done.status_code, 201)
+        self.assertTrue(done.json()['complete'])
+
+        message = self.client.post('/user_app/messages/direct-message/',
+                                   {"receiver_id": self.other.id, "upload_id": upload_id}, format='json').json()
+        self.assertEqual(message['attachment_size'], len(payload))
+        url = message['attachment_url']
+
+        full = self.client.get(url)
+        self.assertEqual(b"".join(full.streaming_content), payload)
+        etag = full['ETag']
+
+        part = self.client.get(url, HTTP_RANGE="bytes=100-199")
+        self.assertEqual(part.status_code, 206)
+        self.assertEqual(part['Content-Range'], f"bytes 100-199/{len(payload)}")
+        self.assertEqual(b"".join(part.streaming_content), payload[100:200])
+        self.assertEqual(b"".join(self.client.get(url, HTTP_RANGE="bytes=-10").streaming_content), payload[-10:])
+
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(self.client.get(url, HTTP_RANGE=f"bytes={len(payload)}-").status_code, 416)
+
+    def test_only_raster_images_are_inline(self):
+        for filename, content_type, disposition in [("rasm.png", "image/png", "inline"),
+                                                    ("rasm.svg", "image/svg+xml", "attachment"),
+                                                    ("sahifa.html", "text/html", "attachment")]:
+            payload = b"<svg xmlns='http://www.w3.org/2000/svg'><script>alert(1)</script></svg>"
+            upload_id = self.client.post('/user_app/attachments/uploads/',
+                                         {"filename": filename, "size": len(payload), "content_type": content_type},
+                                         format='json').json()['upload_id']
+            self.put(upload_id, payload, 0, len(payload))
+            url = self.client.post('/user_app/messages/direct-message/',
+                                   {"receiver_id": self.other.id, "upload_id": upload_id}, format='json').json()['attachment_url']
+            self.assertTrue(self.client.get(url)['Content-Disposition'].startswith(disposition), content_type)
+
+    def test_parallel_chunk_for_same_offset_is_rejected_after_read(self):
+        payload = b"a" * 3000
+        upload = start_upload(self.user, "ikki.bin", len(payload))
+        rival = self.put(upload.id, payload[:1000], 0, len(payload))
+        self.assertEqual(rival.json()['received'], 1000)
+
+        class RacingStream(BytesIO):
+            # Bu parça ağdan okunurken başka bir PUT aynı offset'i yazıp ilerliyor
+            def read(inner, n=-1):
+                if inner.tell() == 0:
+                    append_chunk(upload.id, self.user, "bytes 1000-1999/3000", BytesIO(b"b" * 1000))
+                return super().read(n)
+
+        with self.assertRaises(UploadError) as raised:
+            append_chunk(upload.id, self.user, "bytes 1000-1999/3000", RacingStream(b"c" * 1000))
+        self.assertEqual((raised.exception.status_code, raised.exception.extra['received']), (409, 2000))
+        with open(partial_path(upload), 'rb') as f:
+            self.assertEqual(f.read(), b"a" * 1000 + b"b" * 1000)
+        # İstek başına açılan geçici parça dosyaları temizlenmiş
+        self.assertEqual(os.listdir(os.path.dirname(partial_path(upload))), [str(upload.id)])
+
+    def test_upload_is_taken_once(self):
+        upload = start_upload(self.user, "bir.bin", 10)
+        self.assertEqual(self.put(upload.id, b"x" * 10, 0, 10).status_code, 201)
+        name, size, _ = take_upload(upload.id, self.user)
+        self.assertEqual(size, 10)
+        with self.assertRaises(UploadError) as raised:
+            take_upload(upload.id, self.user)
+        self.assertEqual(raised.exception.status_code, 404)
+        self.assertFalse(AttachmentUpload.objects.filter(id=upload.id).exists())
+
+    def test_image_gets_thumbnail(self):
+        buffer = BytesIO()
+        Image.new('RGB', (1200, 800), 'orange').save(buffer, format='PNG')
+        image = SimpleUploadedFile("rasm.png", buffer.getvalue(), content_type='image/png')
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/user_app/messages/direct-message/',
+                                        {"receiver_id": self.other.id, "attachment": image}, format='multipart')
+        self.assertEqual(response.status_code, 201)
+
+        message = Message.objects.get(pk=response.json()['id'])
+        self.assertTrue(message.thumbnail)
+        with message.thumbnail.open('rb') as f:
+            self.assertLessEqual(max(Image.open(f).size), 320)
+        preview = self.client.get('/user_app/conversations/').json()['results'][0]['last_message']
+        self.assertEqual(preview['thumbnail'], message.thumbnail.url)
+
+
+@override_settings(AUTH_TOKEN_CACHE='default')
+class CachedTokenAuthTests(TestCase):
+    """Cache hit'te token auth (company dahil) sorgusuz; logout/şifre/silme cache'i temizler."""
+
+    def setUp(self):
+        self.company = Company.objects.create(name="Auth Co")
+        self.user = CustomUser.objects.create(username="ali", company=self.company, role='admin')
+        self.user.set_password("eski-sifre-123")
+        self.user.save()
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+
+    def authenticate(self):
+        request = APIRequestFactory().get('/', HTTP_AUTHORIZATION=f"Token {self.token.key}")
+        user, _ = CachedTokenAuthentication().authenticate(request)
+        return user.company.name
+
+    def test_cache_hit_runs_no_queries(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(self.authenticate(), "Auth Co")
+        with self.assertNumQueries(0):
+            self.assertEqual(self.authenticate(), "Auth Co")
+
+    def test_password_change_and_company_update_invalidate(self):
+        self.authenticate()
+        response = self.client.post('/user_app/users/change-password/',
+                                    {'current_password': "eski-sifre-123", 'new_password': "yeni-sifre-456"})
+        self.assertEqual(response.status_code, 200)
+        with self.assertNumQueries(1):
+            self.authenticate()
+
+        self.company.name = "Yangi nom"
+        self.company.save()
+        self.assertEqual(self.authenticate(), "Yangi nom")
+
+    def test_logout_and_delete_revoke_cached_token(self):
+        self.assertEqual(self.client.get('/user_app/users/').status_code, 200)
+        self.assertEqual(self.client.post('/user_app/logout/').status_code, 200)
+        self.assertEqual(self.client.get('/user_app/users/').status_code, 401)
+
+        other = CustomUser.objects.create(username="vali", company=self.company)
+        other_client = APIClient()
+        other_client.credentials(HTTP_AUTHORIZATION=f"Token {Token.objects.create(user=other).key}")
+        self.assertEqual(other_client.get('/user_app/users/').status_code, 200)
+        admin = APIClient()
+        admin.force_authenticate(self.user)
+        self.assertEqual(admin.delete(f'/user_app/users/{other.id}/').status_code, 204)
+        self.assertEqual(other_client.get('/user_app/users/').status_code, 401)
+
+
+class UncachedTokenAuthTests(TestCase):
+    """AUTH_TOKEN_CACHE boşsa cache yok: her istek tek sorgu, iptal anında geçerli."""
+
+    def setUp(self):
+        company = Company.objects.create(name="Auth Co")
+        self.user = CustomUser.objects.create(username="ali", company=company, role='admin')
+        self.token = Token.objects.create(user=self.user)
+
+    def authenticate(self):
+        request = APIRequestFactory().get('/', HTTP_AUTHORIZATION=f"Token {self.token.key}")
+        return CachedTokenAuthentication().authenticate(request)[0]
+
+    @override_settings(AUTH_TOKEN_CACHE=None)
+    def test_every_request_hits_the_database(self):
+        for _ in range(2):
+            with self.assertNumQueries(1):
+                self.assertEqual(self.authenticate().company.name, "Auth Co")
+
+    @override_settings(AUTH_TOKEN_CACHE=None)
+    def test_revocation_is_immediate_without_signals(self):
+        self.authenticate()
+        # Sinyalsiz değişiklik (başka worker / queryset.update) da hemen geçerli olmalı
+        CustomUser.objects.filter(pk=self.user.pk).update(is_active=False)
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    def test_process_local_cache_is_reported(self):
+        with override_settings(AUTH_TOKEN_CACHE='default'):
+            self.assertEqual([w.id for w in auth_token_cache_check(None)], ['user_app.W002'])
+        with override_settings(AUTH_TOKEN_CACHE=None):
+            self.assertEqual(auth_token_cache_check(None), [])
+        # Varsayılan: süreç içi ama sınırlı ve birkaç saniyelik TTL
+        with override_settings(AUTH_TOKEN_CACHE='auth_tokens'):
+            self.assertEqual(auth_token_cache_check(None), [])
+
+    @override_settings(AUTH_TOKEN_CACHE='auth_tokens')
+    def test_default_cache_skips_the_database_briefly(self):
+        caches['auth_tokens'].clear()
+        self.authenticate()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.authenticate().company.name, "Auth Co")
+        self.assertLessEqual(caches['auth_tokens'].default_timeout, PROCESS_LOCAL_MAX_TTL)
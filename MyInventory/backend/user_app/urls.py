@@ -1,6 +1,7 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import CustomUserViewSet, CompanyViewSet, UserLoginView, UserLogoutView, ConversationViewSet, MessageViewSet, ChatDebugView
+from .views import CustomUserViewSet, CompanyViewSet, UserLoginView, UserLogoutView, ConversationViewSet, MessageViewSet, ChatDebugView, chat_events
+from .views import AttachmentUploadView, AttachmentUploadDetailView
 
 router = DefaultRouter()
 router.register(r'companies', CompanyViewSet)
@@ -15,6 +16,10 @@ urlpatterns = [
     # message urls
     path('conversations/', ConversationViewSet.as_view({'get': 'list', 'post': 'create'})),
     path('conversations/<int:pk>/', ConversationViewSet.as_view({'get': 'retrieve'})),
+    path('conversations/<int:pk>/messages/', ConversationViewSet.as_view({'get': 'messages'})),
+    path('events/', chat_events, name='chat-events'),
+    path('attachments/uploads/', AttachmentUploadView.as_view(), name='attachment-upload'),
+    path('attachments/uploads/<uuid:upload_id>/', AttachmentUploadDetailView.as_view(), name='attachment-upload-detail'),
 
     # debug endpoint (remove after fixing)
     path('chat-debug/', ChatDebugView.as_view(), name='chat-debug'),
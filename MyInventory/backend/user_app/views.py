@@ -1,3 +1,16 @@
+import asyncio
+import json
+from importlib import import_module
+from io import BytesIO
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.files.storage import default_storage
+from django.contrib.auth import get_user
+from django.core.handlers.asgi import ASGIRequest
+from django.db import connection
+from django.http import JsonResponse, StreamingHttpResponse
 from rest_framework.views import APIView
 from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action
@@ -6,49 +19,22 @@ from rest_framework.authtoken.models import Token
 from rest_framework.response import Response
 from rest_framework.exceptions import ValidationError
 from django.contrib.auth import authenticate
-from .models import CustomUser, Company, Conversation, Message
-from .serializers import CustomUserSerializer, CompanySerializer, UserLoginSerializer, ConversationSerializer, MessageSerializer
+from .models import AttachmentUpload, CustomUser, Company, Conversation, ConversationReadState, Message
+from .serializers import CustomUserSerializer, CompanySerializer, UserLoginSerializer, ConversationSerializer, ConversationSummarySerializer, MessageSerializer
 from django.shortcuts import get_object_or_404
-from django.db.models import Count
-from django.db import connection
-
-
-def ensure_chat_tables():
-    """Create Conversation and Message tables if they don't exist yet (bypasses migration issues)."""
-    try:
-        with connection.cursor() as cursor:
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS "user_app_conversation" (
-                    "id" bigserial NOT NULL PRIMARY KEY,
-                    "created_at" timestamp with time zone NOT NULL DEFAULT NOW()
-                );
-            """)
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS "user_app_conversation_participants" (
-                    "id" bigserial NOT NULL PRIMARY KEY,
-                    "conversation_id" bigint NOT NULL
-                        REFERENCES "user_app_conversation" ("id") DEFERRABLE INITIALLY DEFERRED,
-                    "customuser_id" bigint NOT NULL
-                        REFERENCES "user_app_customuser" ("id") DEFERRABLE INITIALLY DEFERRED,
-                    UNIQUE ("conversation_id", "customuser_id")
-                );
-            """)
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS "user_app_message" (
-                    "id" bigserial NOT NULL PRIMARY KEY,
-                    "text" text NULL,
-                    "created_at" timestamp with time zone NOT NULL DEFAULT NOW(),
-                    "is_read" boolean NOT NULL DEFAULT false,
-                    "attachment" varchar(100) NULL,
-                    "conversation_id" bigint NOT NULL
-                        REFERENCES "user_app_conversation" ("id") DEFERRABLE INITIALLY DEFERRED,
-                    "sender_id" bigint NOT NULL
-                        REFERENCES "user_app_customuser" ("id") DEFERRABLE INITIALLY DEFERRED
-                );
-            """)
-    except Exception as e:
-        # Log but don't crash — tables might already exist
-        print(f"ensure_chat_tables warning: {e}")
+from django.db.models import IntegerField, OuterRef, Prefetch, Q, Subquery, TextField, Value
+from django.db.models.functions import Coalesce
+from app.pagination import KeysetCursorPagination
+from .readiness import ChatSchemaNotReady, check_chat_schema, require_chat_schema
+from .attachments import (
+    CHAT_ATTACHMENT_MAX_SIZE, UploadError, append_chunk, attachment_response, discard_upload, start_upload,
+    take_upload, upload_state,
+)
+from .authentication import cached_token, forget_tokens
+from .message_text import with_ciphertext
+from .read_state import direct_conversation, mark_read, unread_message_count
+from .realtime import get_broker, notify_read
+from .search_index import matching_message_ids
 
 
 class CompanyViewSet(viewsets.ModelViewSet):
@@ -172,6 +158,9 @@ class CustomUserViewSet(viewsets.ModelViewSet):
                 try:
                     # To'g'ridan-to'g'ri SQL bilan o'chirib ko'ramiz
                     with connection.cursor() as cursor:
+                        # Ham SQL sinyal göndermez — token cache'i elle temizlenir
+                        cursor.execute('SELECT key FROM authtoken_token WHERE user_id = %s', [user_id])
+                        forget_tokens([row[0] for row in cursor.fetchall()])
                         # Avval tokenni o'chirish (SQL orqali ham)
                         cursor.execute('DELETE FROM authtoken_token WHERE user_id = %s', [user_id])
                         # Keyin foydalanuvchini
@@ -253,47 +242,170 @@ class UserLogoutView(APIView):
             request.user.auth_token.delete()
         except Exception:
             pass
+        # post_delete sinyali de siler; token silinemese bile bu istekteki key cache'ten düşsün
+        if isinstance(request.auth, Token):
+            forget_tokens([request.auth.key])
         return Response({"detail": "Başarıyla çıkış yapıldı."}, status=status.HTTP_200_OK)
 
 
 # message views
 
+class ConversationCursorPagination(KeysetCursorPagination):
+    # Son mesaj zamanına göre (mesajı olmayan sohbet: created_at)
+    ordering = ('-last_activity', '-id')
+
+
+def conversation_summaries(user):
+    """
+    Sohbet listesi: son mesaj ve okunmamış sayısı (read state sayacı) correlated subquery, katılımcılar
+    prefetch — sohbet/mesaj sayısından bağımsız olarak sabit sorgu sayısı.
+    """
+    last = Message.objects.filter(conversation=OuterRef('pk')).order_by('-created_at', '-id')
+    unread = ConversationReadState.objects.filter(conversation=OuterRef('pk'), user=user).values('unread_count')[:1]
+    # (conversation, customuser) tekil — participants join'i satır çoğaltmaz, DISTINCT gerekmez
+    return (
+        Conversation.objects.filter(participants=user)
+        .annotate(
+            last_message_id=Subquery(last.values('id')[:1]),
+            # output_field TextField: şifreli değer ham gelir, serializer önizlemeyi cache'li çözer
+            last_message_text=Subquery(last.values('text')[:1], output_field=TextField()),
+            last_message_sender_id=Subquery(last.values('sender_id')[:1]),
+            last_message_attachment=Subquery(last.values('attachment')[:1]),
+            last_message_thumbnail=Subquery(last.values('thumbnail')[:1]),
+            last_message_at=Subquery(last.values('created_at')[:1]),
+            unread_count=Coalesce(Subquery(unread, output_field=IntegerField()), Value(0)),
+        )
+        .annotate(last_activity=Coalesce('last_message_at', 'created_at'))
+        .prefetch_related(Prefetch('participants', queryset=CustomUser.objects.order_by('id')))
+    )
+
+
 class ConversationViewSet(viewsets.ModelViewSet):
     serializer_class = ConversationSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = ConversationCursorPagination
+    # Sayı olmayan pk view'a ulaşmaz (404); get_object_or_404 ValueError ile 500 vermesin
+    lookup_value_regex = r'\d+'
 
     def get_queryset(self):
         if getattr(self, 'swagger_fake_view', False):
             return Conversation.objects.none()
-        ensure_chat_tables()
-        return Conversation.objects.filter(participants=self.request.user).distinct()
+        require_chat_schema()
+        if self.action == 'list':
+            return conversation_summaries(self.request.user)
+        return Conversation.objects.filter(participants=self.request.user).prefetch_related(
+            'participants',
+            Prefetch('messages', queryset=with_ciphertext(Message.objects.select_related('sender')).order_by('created_at', 'id')),
+        )
+
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return ConversationSummarySerializer
+        if self.action == 'messages':
+            return MessageSerializer
+        return ConversationSerializer
+
+    HISTORY_PAGE_SIZE = 50
+    HISTORY_MAX_PAGE_SIZE = 200
+
+    @action(detail=True, methods=['get'])
+    def messages(self, request, pk=None):
+        """
+        GET conversations/<id>/messages/               → en son 50 mesaj
+        GET conversations/<id>/messages/?before=<msg>  → o mesajdan önceki 50
+        GET conversations/<id>/messages/?after=<msg>   → o mesajdan sonraki 50
+        Sonuç her zaman eskiden yeniye; (conversation, created_at, id) index'i ile
+        geçmişin uzunluğundan bağımsız tek range tarama.
+        """
+        require_chat_schema()
+        conversation = get_object_or_404(Conversation.objects.filter(participants=request.user), pk=pk)
+        try:
+            limit = min(int(request.query_params.get('limit', self.HISTORY_PAGE_SIZE)), self.HISTORY_MAX_PAGE_SIZE)
+            before = request.query_params.get('before')
+            after = request.query_params.get('after')
+            cursor_id = int(before or after) if (before or after) else None
+        except ValueError:
+            return Response({"detail": "before, after va limit sonlar bo'lishi kerak."}, status=status.HTTP_400_BAD_REQUEST)
+        if limit < 1 or (before and after):
+            return Response({"detail": "Faqat bittasi: before yoki after (limit >= 1)."}, status=status.HTTP_400_BAD_REQUEST)
+
+        messages = with_ciphertext(Message.objects.filter(conversation=conversation).select_related('sender'))
+        if cursor_id is not None:
+            pivot = get_object_or_404(
+                Message.objects.filter(conversation=conversation).values('created_at', 'id'), pk=cursor_id
+            )
+            if before:
+                messages = messages.filter(
+                    Q(created_at__lt=pivot['created_at']) | Q(created_at=pivot['created_at'], id__lt=pivot['id'])
+                )
+            else:
+                messages = messages.filter(
+                    Q(created_at__gt=pivot['created_at']) | Q(created_at=pivot['created_at'], id__gt=pivot['id'])
+                )
+
+        if after:
+            page = list(messages.order_by('created_at', 'id')[:limit + 1])
+            has_more = len(page) > limit
+            page = page[:limit]
+        else:
+            page = list(messages.order_by('-created_at', '-id')[:limit + 1])
+            has_more = len(page) > limit
+            page = page[:limit][::-1]
+
+        return Response({
+            "results": self.get_serializer(page, many=True).data,
+            "has_more": has_more,
+            # Eski mesajlar için ?before=, yeni mesajlar için ?after=
+            "before": page[0].id if page else None,
+            "after": page[-1].id if page else cursor_id,
+        })
 
     def list(self, request, *args, **kwargs):
         try:
             return super().list(request, *args, **kwargs)
+        except ChatSchemaNotReady:
+            raise
         except Exception as e:
             import traceback
             return Response({"detail": str(e), "traceback": traceback.format_exc()}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
     def perform_create(self, serializer):
-        participants_data = self.request.data.get('participants', [])
-        if not participants_data:
-            participants_data = [self.request.user.id]
-        elif self.request.user.id not in participants_data:
-            participants_data.append(self.request.user.id)
-        
+        try:
+            participant_ids = {int(p) for p in self.request.data.get('participants', [])}
+        except (TypeError, ValueError):
+            raise ValidationError({"detail": "participants foydalanuvchi id'lari ro'yxati bo'lishi kerak."})
+        participant_ids.add(self.request.user.id)
+        if CustomUser.objects.filter(id__in=participant_ids).count() != len(participant_ids):
+            raise ValidationError({"detail": "Bunday foydalanuvchi topilmadi."})
+
+        if len(participant_ids) == 2:
+            # İki kişilik sohbet DM'dir — dm_user_low/high anahtarıyla tekil (mevcutsa o döner)
+            other_id = (participant_ids - {self.request.user.id}).pop()
+            serializer.instance, _ = Conversation.get_or_create_direct(self.request.user.id, other_id)
+            return
         instance = serializer.save()
-        instance.participants.set(participants_data)
+        instance.participants.set(participant_ids)
 
 class MessageViewSet(viewsets.ModelViewSet):
     serializer_class = MessageSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetCursorPagination
+    lookup_value_regex = r'\d+'
 
     def get_queryset(self):
         if getattr(self, 'swagger_fake_view', False):
             return Message.objects.none()
-        ensure_chat_tables()
-        return Message.objects.filter(conversation__participants=self.request.user).distinct()
+        require_chat_schema()
+        # (conversation, customuser) tekil — join satır çoğaltmaz, DISTINCT gerekmez
+        # text sadece render edilirken çözülür (user_app/message_text.py)
+        messages = Message.objects.filter(conversation__participants=self.request.user)
+        receiver_id = self.request.query_params.get('receiver_id')
+        if self.action == 'list' and receiver_id:
+            # ?receiver_id=<user> — sadece o kullanıcıyla DM sohbeti (chat penceresi sayfa sayfa okur)
+            if not receiver_id.isdigit():
+                raise ValidationError({"detail": "receiver_id son bo'lishi kerak."})
+            messages = messages.filter(conversation__in=direct_conversation(self.request.user.id, int(receiver_id)))
+        return with_ciphertext(messages.select_related('sender'))
 
     def perform_create(self, serializer):
         try:
@@ -306,18 +418,57 @@ class MessageViewSet(viewsets.ModelViewSet):
         except Exception as e:
             raise ValidationError({"detail": str(e)})
 
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """
+        GET messages/search/?q=<kelimeler>[&conversation=<id>]
+        Şifreli metin çözülmeden blind index üzerinden: tüm kelimeleri içeren mesajlar,
+        yeniden eskiye, cursor pagination ile.
+        """
+        require_chat_schema()
+        conversations = Conversation.objects.filter(participants=request.user)
+        conversation_id = request.query_params.get('conversation')
+        if conversation_id:
+            if not conversation_id.isdigit():
+                return Response({"detail": "conversation son bo'lishi kerak."}, status=status.HTTP_400_BAD_REQUEST)
+            conversations = conversations.filter(id=conversation_id)
+
+        matches = matching_message_ids(request.query_params.get('q', ''), conversations.values('id'))
+        if matches is None:
+            return Response({"detail": "q: kamida bitta so'z (2+ harf) kerak."}, status=status.HTTP_400_BAD_REQUEST)
+
+        page = self.paginate_queryset(self.get_queryset().filter(id__in=matches))
+        return self.get_paginated_response(self.get_serializer(page, many=True).data)
+
+    @action(detail=True, methods=['get'])
+    def attachment(self, request, pk=None):
+        """GET messages/<id>/attachment/ — Range (206), If-Range, ETag / If-None-Match (304)."""
+        message = self.get_object()
+        if not message.attachment:
+            return Response({"detail": "Xabarda fayl yo'q."}, status=status.HTTP_404_NOT_FOUND)
+        try:
+            return attachment_response(request, message)
+        except UploadError as e:
+            response = upload_error_response(e)
+            response['Content-Range'] = f"bytes */{message.attachment_size or default_storage.size(message.attachment.name)}"
+            return response
+
     @action(detail=False, methods=['post'], url_path='direct-message')
     def direct_message(self, request):
         import traceback
-        ensure_chat_tables()  # Auto-create tables if migration hasn't run
+        require_chat_schema()
         try:
             conversation_id = request.data.get('conversation')
             receiver_id = request.data.get('receiver_id')
             text = request.data.get('text')
             attachment = request.FILES.get('attachment')
+            upload_id = request.data.get('upload_id')
             
-            if not text and not attachment:
+            if not text and not attachment and not upload_id:
                 return Response({"detail": "text or attachment is required"}, status=status.HTTP_400_BAD_REQUEST)
+            if attachment and attachment.size > CHAT_ATTACHMENT_MAX_SIZE:
+                return Response({"detail": f"Fayl {CHAT_ATTACHMENT_MAX_SIZE} baytdan katta. Bo'laklab yuklang (attachments/uploads/)."},
+                                status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
             
             conversation = None
             if conversation_id:
@@ -331,24 +482,30 @@ class MessageViewSet(viewsets.ModelViewSet):
                 except CustomUser.DoesNotExist:
                     return Response({"detail": "Receiver not found"}, status=status.HTTP_404_NOT_FOUND)
                     
-                # Find or create DM conversation
-                conversation = Conversation.objects.annotate(num_p=Count('participants'))\
-                    .filter(num_p=2)\
-                    .filter(participants=request.user)\
-                    .filter(participants=receiver)\
-                    .first()
-                
-                if not conversation:
-                    conversation = Conversation.objects.create()
-                    conversation.participants.set([request.user, receiver])
+                # Find or create DM conversation — (low, high) unique index üzerinden
+                conversation, _ = Conversation.get_or_create_direct(request.user.id, receiver.id)
             else:
                 return Response({"detail": "Either receiver_id or conversation is required"}, status=status.HTTP_400_BAD_REQUEST)
                 
+            attachment_fields = {}
+            if upload_id:
+                # Parça parça yüklenmiş, storage'a taşınmış dosya
+                try:
+                    name, size, content_type = take_upload(upload_id, request.user)
+                except UploadError as e:
+                    return upload_error_response(e)
+                except DjangoValidationError:
+                    return Response({"detail": "upload_id noto'g'ri."}, status=status.HTTP_400_BAD_REQUEST)
+                attachment_fields = dict(attachment=name, attachment_size=size, attachment_type=content_type)
+            elif attachment:
+                attachment_fields = dict(attachment=attachment, attachment_size=attachment.size,
+                                         attachment_type=(attachment.content_type or '')[:100])
+
             message = Message.objects.create(
                 conversation=conversation,
                 sender=request.user,
                 text=text,
-                attachment=attachment
+                **attachment_fields
             )
             serializer = self.get_serializer(message)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
@@ -357,29 +514,78 @@ class MessageViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get'], url_path='unread-count')
     def unread_count(self, request):
-        ensure_chat_tables()
-        count = Message.objects.filter(conversation__participants=request.user, is_read=False).exclude(sender=request.user).count()
-        return Response({"count": count})
+        require_chat_schema()
+        return Response({"count": unread_message_count(request.user.id)})
 
     @action(detail=False, methods=['post'], url_path='mark-as-read')
     def mark_as_read(self, request):
-        ensure_chat_tables()
+        require_chat_schema()
         conversation_id = request.data.get('conversation_id')
         receiver_id = request.data.get('receiver_id')
         
         if conversation_id:
-            messages = Message.objects.filter(conversation_id=conversation_id, is_read=False).exclude(sender=request.user)
-            messages.update(is_read=True)
+            conversation_ids = [conversation_id]
         elif receiver_id:
-            # Mark messages from this specific user as read
-            messages = Message.objects.filter(conversation__participants=request.user, sender_id=receiver_id, is_read=False)
-            messages.update(is_read=True)
+            # Eskiden sadece o kullanıcının mesajları okunurdu — o yüzden sadece DM sohbeti,
+            # ortak grup sohbetleri okundu yapılmaz
+            try:
+                conversation_ids = direct_conversation(request.user.id, int(receiver_id))
+            except (TypeError, ValueError):
+                return Response({"detail": "receiver_id son bo'lishi kerak."}, status=status.HTTP_400_BAD_REQUEST)
         else:
             return Response({"detail": "Either conversation_id or receiver_id is required"}, status=status.HTTP_400_BAD_REQUEST)
-            
+
+        # Sohbet başına tek satır (watermark) yazılır; okundu bilgisi değişen sohbetlere gider
+        changed = mark_read(request.user.id, conversation_ids)
+        if changed:
+            notify_read(request.user.id, changed)
+
         return Response({"detail": "Messages marked as read"})
 
 
+def upload_error_response(error):
+    return Response({"detail": error.detail, **error.extra}, status=error.status_code)
+
+
+class AttachmentUploadView(APIView):
+    """POST attachments/uploads/ {filename, size, content_type} — parça parça yükleme başlatır."""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        try:
+            upload = start_upload(
+                request.user, request.data.get('filename'), request.data.get('size'), request.data.get('content_type'),
+            )
+        except UploadError as e:
+            return upload_error_response(e)
+        return Response(upload_state(upload), status=status.HTTP_201_CREATED)
+
+
+class AttachmentUploadDetailView(APIView):
+    """
+    GET    attachments/uploads/<id>/  → durum (received: nereden devam edilecek)
+    PUT    attachments/uploads/<id>/  gövde = ham bayt, Content-Range: bytes <a>-<b>/<size>
+    DELETE attachments/uploads/<id>/  → vazgeç
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, upload_id):
+        upload = get_object_or_404(AttachmentUpload, id=upload_id, user=request.user)
+        return Response(upload_state(upload))
+
+    def put(self, request, upload_id):
+        # request.data'ya dokunulmaz — gövde parse edilmeden stream'den diske yazılır
+        try:
+            upload = append_chunk(upload_id, request.user, request.headers.get('Content-Range'), request.stream or BytesIO())
+        except UploadError as e:
+            return upload_error_response(e)
+        return Response(upload_state(upload), status=status.HTTP_201_CREATED if upload.complete else status.HTTP_200_OK)
+
+    def delete(self, request, upload_id):
+        discard_upload(get_object_or_404(AttachmentUpload, id=upload_id, user=request.user))
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
 class ChatDebugView(APIView):
     """Temporary debug view to diagnose 500 errors"""
     permission_classes = [permissions.IsAuthenticated]
@@ -415,3 +621,79 @@ class ChatDebugView(APIView):
             result["tests"]["traceback"] = traceback.format_exc()
 
         return Response(result)
+
+
+# real-time (SSE) — sadece ASGI altında (uvicorn config.asgi:application)
+
+CHAT_EVENTS_HEARTBEAT = getattr(settings, 'CHAT_EVENTS_HEARTBEAT', 25)
+
+
+def _sse(event):
+    return f"event: {event['type']}\ndata: {json.dumps(event, ensure_ascii=False, default=str)}\n\n"
+
+
+def _event_subscriber(request):
+    """
+    Bağlantı başına bir kez: kullanıcı, schema kontrolü ve başlangıç okunmamış sayısı.
+    Paylaşılan thread havuzunda çalışır (thread_sensitive=False) — yoksa her açık SSE
+    bağlantısı kendi thread'ini ve DB bağlantısını tutardı. Döndürür: (user, count | hata).
+    """
+    try:
+        # EventSource header gönderemez — token ?token= ile de kabul edilir
+        header = request.headers.get('Authorization', '')
+        key = header[6:].strip() if header.startswith('Token ') else request.GET.get('token')
+        if key:
+            token = cached_token(key)
+            user = token.user if token else None
+        else:
+            if not hasattr(request, 'session'):
+                # config/asgi.py bu path'te SessionMiddleware'i atlıyor — session cookie'den okunur
+                engine = import_module(settings.SESSION_ENGINE)
+                request.session = engine.SessionStore(request.COOKIES.get(settings.SESSION_COOKIE_NAME))
+            user = get_user(request)
+        if user is None or not user.is_authenticated or not user.is_active:
+            return None, JsonResponse({"detail": "Authentication credentials were not provided."}, status=401)
+        ready, missing = check_chat_schema()
+        if not ready:
+            return None, JsonResponse({"detail": ChatSchemaNotReady.default_detail}, status=503)
+        return user, unread_message_count(user.id)
+    finally:
+        connection.close()
+
+
+async def chat_events(request):
+    """
+    GET user_app/events/  (text/event-stream)
+      event: unread_count  {"count": N}            — bağlanınca ve her değişimde
+      event: message       {"conversation", "message"}
+      event: read          {"conversation", "reader"}
+      event: resync        — kaçırılan olay var, listeyi yeniden çek
+    """
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({"detail": "Real-time kanal faqat ASGI serverda ishlaydi."}, status=501)
+    user, result = await sync_to_async(_event_subscriber, thread_sensitive=False)(request)
+    if user is None:
+        return result
+    count = result
+
+    subscription = get_broker().subscribe(user.id)
+
+    async def stream():
+        try:
+            yield "retry: 5000\n\n"
+            yield _sse({"type": "unread_count", "count": count})
+            while True:
+                try:
+                    event = await subscription.get(CHAT_EVENTS_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    # Proxy'ler boş bağlantıyı kapatmasın
+                    yield ": ping\n\n"
+                    continue
+                yield _sse(event)
+        finally:
+            subscription.close()
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -48,7 +48,8 @@ async function api(path: string, method: string = "GET", body: any = null) {
     opts.body = (body instanceof FormData) ? body : JSON.stringify(body);
   }
   try {
-    const res = await fetch(`${BASE}${path}`, opts);
+    // Sayfalı cevaplardaki `next` tam URL olarak gelir
+    const res = await fetch(/^https?:\/\//.test(path) ? path : `${BASE}${path}`, opts);
     if (res.status === 401) { console.warn("Token invalid"); setToken(null); }
     const data = await res.json().catch(() => ({}));
     if (!res.ok) {
@@ -60,21 +61,45 @@ async function api(path: string, method: string = "GET", body: any = null) {
   } catch (err) { console.error("API Error:", err); throw err; }
 }
 
+// Cursor sayfalı liste endpoint'leri ({next, previous, results}) — bitta sahifa.
+// `next` to'liq URL: "Ko'proq yuklash" bosilganda shu bilan chaqiriladi. Sayfasız (dizi) cevap → next yo'q.
+async function apiPage(path: string, next?: string | null, pageSize: number = 50) {
+  const sep = path.includes("?") ? "&" : "?";
+  const data = await api(next || `${path}${sep}page_size=${pageSize}`);
+  if (Array.isArray(data)) return { results: data, next: null };
+  return { results: data?.results ?? [], next: data?.next ?? null };
+}
+
+// Faqat kichik ma'lumotnoma ro'yxatlari (birlik, valyuta, item) va hisobot uchun buylist:
+// `next` bitene kadar tüm sayfaları çekip tek dizi döner.
+async function apiAll(path: string) {
+  const sep = path.includes("?") ? "&" : "?";
+  let data = await api(`${path}${sep}page_size=500`);
+  if (Array.isArray(data)) return data;
+  const all: any[] = [...(data?.results ?? [])];
+  while (data?.next) {
+    data = await api(data.next);
+    all.push(...(data?.results ?? []));
+  }
+  return all;
+}
+
 const authAPI = {
   login: (companyToken: string, username: string, password: string) =>
     api(`/user_app/${companyToken}/login/`, "POST", { username, password }),
   logout: () => api("/user_app/logout/", "POST"),
-  users: () => api("/user_app/users/"),
+  users: (next?: string | null) => apiPage("/user_app/users/", next),
   getUser: (id: number | string) => api(`/user_app/users/${id}/`),
   updateUser: (id: number | string, data: any) => api(`/user_app/users/${id}/`, "PUT", data),
   createUser: (data: any) => api("/user_app/users/", "POST", data),
   deleteUser: (id: number | string) => api(`/user_app/users/${id}/`, "DELETE"),
-  companies: () => api("/user_app/companies/"),
+  companies: (next?: string | null) => apiPage("/user_app/companies/", next),
   createCompany: (data: any) => api("/user_app/companies/", "POST", data),
   updateCompany: (id: number | string, data: any) => api(`/user_app/companies/${id}/`, "PUT", data),
   deleteCompany: (id: number | string) => api(`/user_app/companies/${id}/`, "DELETE"),
   changePassword: (data: any) => api("/user_app/users/change-password/", "POST", data),
-  getMessages: () => api("/user_app/messages/"),
+  // Bitta DM suhbatining eng yangi xabarlari (yangidan eskiga); eskilari `next` bilan
+  getMessages: (receiverId: number, next?: string | null) => apiPage(`/user_app/messages/?receiver_id=${receiverId}`, next),
   getUnreadCount: () => api("/user_app/messages/unread-count/"),
   markMessagesAsRead: (data: { conversation_id?: number; receiver_id?: number }) =>
     api("/user_app/messages/mark-as-read/", "POST", data),
@@ -86,14 +111,14 @@ const authAPI = {
 };
 
 const depolarAPI = {
-  list: () => api("/depolar/"),
+  list: (next?: string | null) => apiPage("/depolar/", next),
   create: (data: any) => api("/depolar/", "POST", data),
   update: (id: number | string, data: any) => api(`/depolar/${id}/`, "PUT", data),
   patch: (id: number | string, data: any) => api(`/depolar/${id}/`, "PATCH", data),
   delete: (id: number | string) => api(`/depolar/${id}/`, "DELETE"),
 };
 const buylistAPI = {
-  list: () => api("/buylist/"),
+  list: () => apiAll("/buylist/"),
   create: (data: any) => api("/buylist/", "POST", data),
   update: (id: number | string, data: any) => api(`/buylist/${id}/`, "PUT", data),
   patch: (id: number | string, data: any) => api(`/buylist/${id}/`, "PATCH", data),
@@ -101,18 +126,18 @@ const buylistAPI = {
   totalPrice: () => api("/buylist/total_price/"),
 };
 const itemlerAPI = {
-  list: () => api("/itemler/"),
+  list: () => apiAll("/itemler/"),
   create: (data: any) => api("/itemler/", "POST", data),
   update: (id: number | string, data: any) => api(`/itemler/${id}/`, "PUT", data),
   delete: (id: number | string) => api(`/itemler/${id}/`, "DELETE"),
 };
 const moneytypesAPI = {
-  list: () => api("/moneytypes/"),
+  list: () => apiAll("/moneytypes/"),
   create: (data: any) => api("/moneytypes/", "POST", data),
   delete: (id: number | string) => api(`/moneytypes/${id}/`, "DELETE"),
 };
 const unitlerAPI = {
-  list: () => api("/unitler/"),
+  list: () => apiAll("/unitler/"),
   create: (data: any) => api("/unitler/", "POST", data),
   delete: (id: number | string) => api(`/unitler/${id}/`, "DELETE"),
 };
@@ -1649,11 +1674,13 @@ function Dashboard({ currentUser, onUserUpdate, onLogout, lang, onLang, accent,
     try { return localStorage.getItem(`rf_dark_${currentUser.username} `) === "true"; } catch { return false; }
   });
   const [warehouses, setWarehouses] = useState<any[]>([]);
+  const [warehousesNext, setWarehousesNext] = useState<string | null>(null);
   const [buylist, setBuylist] = useState<any[]>([]);
   const [itemler, setItemler] = useState<any[]>([]);
   const [moneytypes, setMoneytypes] = useState<any[]>([]);
   const [unitler, setUnitler] = useState<any[]>([]);
   const [users, setUsers] = useState<any[]>([]);
+  const [usersNext, setUsersNext] = useState<string | null>(null);
   const [companies, setCompanies] = useState<any[]>([]);
   const [toasts, setToasts] = useState<any[]>([]);
   const [loadingWh, setLoadingWh] = useState(false);
@@ -1665,6 +1692,8 @@ function Dashboard({ currentUser, onUserUpdate, onLogout, lang, onLang, accent,
   });
   const [chatUser, setChatUser] = useState<any>(null);
   const [messages, setMessages] = useState<any[]>([]);
+  // undefined: hali yuklanmagan; null: eski xabar qolmagan
+  const [messagesNext, setMessagesNext] = useState<string | null | undefined>(undefined);
   const [notifCount, setNotifCount] = useState(0);
   const [shipments, setShipments] = useState([
     { id: 20, item: "Premium Wall Latex Paint", batch: "#902-X", from: "Warehouse 1", to: "Construction", date: "2024-10-24", status: "Delivered", val: "+$1,200", pos: true },
@@ -1687,25 +1716,33 @@ function Dashboard({ currentUser, onUserUpdate, onLogout, lang, onLang, accent,
 
   const goto = (p: string, cb?: any) => { setPage(p); setSelectedWh(null); setSbOpen(false); if (cb) cb(); };
 
+  const toChatMessage = (m: any) => ({
+    id: m.id,
+    sender: m.sender_username,
+    senderId: m.sender,
+    text: m.text,
+    createdAt: m.created_at,
+    time: new Date(m.created_at).toLocaleTimeString([], { hour: "2-digit", minute: "2-digit" }),
+    is_read: m.is_read,
+    attachment: m.attachment || null,
+  });
+
+  // Yangi va yuklangan xabarlarni id bo'yicha birlashtirib, eskidan yangiga tartiblaydi
+  const mergeMessages = (prev: any[], incoming: any[]) => {
+    const byId = new Map(prev.map((m: any) => [m.id, m]));
+    incoming.forEach((m: any) => byId.set(m.id, m));
+    return [...byId.values()].sort((a: any, b: any) =>
+      new Date(a.createdAt).getTime() - new Date(b.createdAt).getTime() || a.id - b.id);
+  };
+
+  // Faqat eng yangi sahifa olinadi (polling ham shu) — eskilari "Oldingi xabarlar" bilan
   const fetchMessages = useCallback(async (targetId: number, targetUsername: string) => {
     try {
-      const res = await authAPI.getMessages();
-      const all = Array.isArray(res) ? res : (res.results || []);
-      // Filter by conversation participant matching
-      const filtered = all.filter((m: any) =>
-        (Number(m.sender) === Number(targetId) || Number(m.sender) === Number(currentUser.id))
-      );
-      filtered.sort((a: any, b: any) => new Date(a.created_at).getTime() - new Date(b.created_at).getTime());
-      setMessages(filtered.map((m: any) => ({
-        id: m.id,
-        sender: m.sender_username,
-        senderId: m.sender,
-        text: m.text,
-        time: new Date(m.created_at).toLocaleTimeString([], { hour: "2-digit", minute: "2-digit" }),
-        is_read: m.is_read,
-        attachment: m.attachment || null,
-      })));
-      if (chatUser && filtered.length > 0) {
+      const page = await authAPI.getMessages(targetId);
+      const fresh = page.results.map(toChatMessage);
+      setMessages(prev => mergeMessages(prev, fresh));
+      setMessagesNext(prev => prev === undefined ? page.next : prev);
+      if (chatUser && fresh.length > 0) {
         authAPI.markMessagesAsRead({ receiver_id: chatUser.id }).then(() => {
           authAPI.getUnreadCount().then(r => { if (r && typeof r.count === "number") setNotifCount(r.count); });
         });
@@ -1713,6 +1750,15 @@ function Dashboard({ currentUser, onUserUpdate, onLogout, lang, onLang, accent,
     } catch (err) { console.warn("Chat fetch error:", err); }
   }, [currentUser.id]);
 
+  const loadOlderMessages = async () => {
+    if (!chatUser || !messagesNext) return;
+    try {
+      const page = await authAPI.getMessages(chatUser.id, messagesNext);
+      setMessages(prev => mergeMessages(prev, page.results.map(toChatMessage)));
+      setMessagesNext(page.next);
+    } catch (err) { console.warn("Chat fetch error:", err); }
+  };
+
   const fetchUnreadCount = useCallback(async () => {
     try {
       const res = await authAPI.getUnreadCount();
@@ -1736,7 +1782,7 @@ function Dashboard({ currentUser, onUserUpdate, onLogout, lang, onLang, accent,
 
   useEffect(() => {
     if (chatUser) {
-      setMessages([]);
+      setMessages([]); setMessagesNext(undefined);
       fetchMessages(chatUser.id, chatUser.username);
       // Mark as read when opening chat
       authAPI.markMessagesAsRead({ receiver_id: chatUser.id }).then(() => fetchUnreadCount());
@@ -1750,7 +1796,7 @@ function Dashboard({ currentUser, onUserUpdate, onLogout, lang, onLang, accent,
     try {
       const res = await authAPI.sendDirectMessage(chatUser.id, text);
       setMessages(prev => [...prev, {
-        id: res.id, sender: currentUser.username, text: res.text || text,
+        id: res.id, sender: currentUser.username, senderId: currentUser.id, text: res.text || text, createdAt: res.created_at || new Date().toISOString(),
         time: res.created_at ? new Date(res.created_at).toLocaleTimeString([], { hour: "2-digit", minute: "2-digit" }) : new Date().toLocaleTimeString([], { hour: "2-digit", minute: "2-digit" }),
         is_read: false,
       }]);
@@ -1761,12 +1807,20 @@ function Dashboard({ currentUser, onUserUpdate, onLogout, lang, onLang, accent,
   const fetchWarehouses = useCallback(async () => {
     setLoadingWh(true); setApiError(null);
     try {
-      const data = await depolarAPI.list();
-      const arr = Array.isArray(data) ? data : (data?.results ?? []);
-      setWarehouses(arr.map((d: any, i: any) => normalizeDepolar(d, i)));
+      const page = await depolarAPI.list();
+      setWarehouses(page.results.map((d: any, i: any) => normalizeDepolar(d, i)));
+      setWarehousesNext(page.next);
     } catch (e: any) { setApiError(`Failed to load warehouses: ${(e as Error).message} `); }
     finally { setLoadingWh(false); }
   }, []);
+  const loadMoreWarehouses = async () => {
+    if (!warehousesNext) return;
+    try {
+      const page = await depolarAPI.list(warehousesNext);
+      setWarehouses(prev => [...prev, ...page.results.map((d: any, i: any) => normalizeDepolar(d, prev.length + i))]);
+      setWarehousesNext(page.next);
+    } catch (e: any) { addToast(`Failed to load warehouses: ${(e as Error).message}`, "error"); }
+  };
 
   const fetchItemler = useCallback(async () => {
     try { const d = await itemlerAPI.list(); setItemler((Array.isArray(d) ? d : (d?.results ?? [])).map(normalizeItem)); } catch { }
@@ -1778,10 +1832,14 @@ function Dashboard({ currentUser, onUserUpdate, onLogout, lang, onLang, accent,
     try { const d = await unitlerAPI.list(); setUnitler((Array.isArray(d) ? d : (d?.results ?? [])).map(normalizeUnit)); } catch { }
   }, []);
   const fetchUsers = useCallback(async () => {
-    try { const d = await authAPI.users(); setUsers(Array.isArray(d) ? d : (d?.results ?? [])); } catch { }
+    try { const page = await authAPI.users(); setUsers(page.results); setUsersNext(page.next); } catch { }
   }, []);
+  const loadMoreUsers = async () => {
+    if (!usersNext) return;
+    try { const page = await authAPI.users(usersNext); setUsers(prev => [...prev, ...page.results]); setUsersNext(page.next); } catch { }
+  };
   const fetchCompanies = useCallback(async () => {
-    try { const d = await authAPI.companies(); setCompanies(Array.isArray(d) ? d : (d?.results ?? [])); } catch { }
+    try { const page = await authAPI.companies(); setCompanies(page.results); } catch { }
   }, []);
 
   useEffect(() => {
@@ -1789,12 +1847,13 @@ function Dashboard({ currentUser, onUserUpdate, onLogout, lang, onLang, accent,
       setLoadingWh(true); setApiError(null);
       try {
         const [wData, iData, mData, uData] = await Promise.all([
-          depolarAPI.list().catch(() => []),
+          depolarAPI.list().catch(() => ({ results: [], next: null })),
           itemlerAPI.list().catch(() => []),
           moneytypesAPI.list().catch(() => []),
           unitlerAPI.list().catch(() => []),
         ]);
-        const wArr = Array.isArray(wData) ? wData : (wData?.results ?? []);
+        const wArr = wData.results;
+        setWarehousesNext(wData.next);
         const iArr = (Array.isArray(iData) ? iData : (iData?.results ?? [])).map(normalizeItem);
         const mArr = (Array.isArray(mData) ? mData : (mData?.results ?? [])).map(normalizeMoneytype);
         const uArr = (Array.isArray(uData) ? uData : (uData?.results ?? [])).map(normalizeUnit);
@@ -1918,7 +1977,7 @@ function Dashboard({ currentUser, onUserUpdate, onLogout, lang, onLang, accent,
               <button className="btn bo bs" style={{ marginLeft: "auto" }} onClick={fetchWarehouses}><I n="refresh" s={13} />Retry</button>
             </div>
           )}
-          {page === "warehouses" && <WarehousePage warehouses={warehouses} setWarehouses={setWarehouses} buylist={buylist} loading={loadingWh} onRefresh={fetchWarehouses} addToast={addToast} T={T} onOpenWh={goToWh} />}
+          {page === "warehouses" && <WarehousePage warehouses={warehouses} setWarehouses={setWarehouses} buylist={buylist} loading={loadingWh} onRefresh={fetchWarehouses} hasMore={!!warehousesNext} onLoadMore={loadMoreWarehouses} addToast={addToast} T={T} onOpenWh={goToWh} />}
           {page === "whdetail" && selectedWh && <WarehouseDetail wh={selectedWh} setWh={setSelectedWh} warehouses={warehouses} setWarehouses={setWarehouses} buylist={buylist} setBuylist={setBuylist} itemler={itemler} moneytypes={moneytypes} unitler={unitler} addToast={addToast} T={T} onBack={backToWarehouses} />}
           {page === "shipments" && <ShipmentsPage shipments={shipments} setShipments={setShipments} addToast={addToast} T={T} />}
           {page === "intake" && <IntakePage buylist={buylist} setBuylist={setBuylist} warehouses={warehouses} itemler={itemler} moneytypes={moneytypes} unitler={unitler} addToast={addToast} T={T} />}
@@ -1926,7 +1985,7 @@ function Dashboard({ currentUser, onUserUpdate, onLogout, lang, onLang, accent,
           {page === "itemler" && <RefPage title={T.items} icon="pkg" data={itemler} setData={setItemler} api={itemlerAPI} normalize={normalizeItem} fields={[{ k: "name", l: "Name *", required: true }]} addToast={addToast} T={T} />}
           {page === "moneytypes" && <RefPage title={T.moneytypes} icon="dr" data={moneytypes} setData={setMoneytypes} api={moneytypesAPI} normalize={normalizeMoneytype} fields={[{ k: "name", l: "Name * (USD, UZS, EUR)", required: true }]} addToast={addToast} T={T} />}
           {page === "unitler" && <RefPage title={T.units} icon="tag" data={unitler} setData={setUnitler} api={unitlerAPI} normalize={normalizeUnit} fields={[{ k: "name", l: "Name *", required: true }]} addToast={addToast} T={T} />}
-          {page === "users" && <UsersPage users={users} companies={companies} onRefresh={fetchUsers} addToast={addToast} T={T} currentUser={currentUser} onChatOpen={setChatUser} />}
+          {page === "users" && <UsersPage users={users} companies={companies} onRefresh={fetchUsers} hasMore={!!usersNext} onLoadMore={loadMoreUsers} addToast={addToast} T={T} currentUser={currentUser} onChatOpen={setChatUser} />}
           {page === "settings" && <SettingsPage settings={settings} setSettings={setSettings} darkMode={darkMode} onDarkMode={setDarkMode} accent={accent} onAccent={onAccent} lang={lang} onLang={onLang} currentUser={currentUser} onUserUpdate={onUserUpdate} addToast={addToast} onLogout={handleLogout} T={T} />}
         </main>
 
@@ -1948,6 +2007,8 @@ function Dashboard({ currentUser, onUserUpdate, onLogout, lang, onLang, accent,
           targetUser={chatUser}
           currentUser={currentUser}
           messages={messages}
+          hasOlder={!!messagesNext}
+          onLoadOlder={loadOlderMessages}
           onSendMessage={sendMessage}
           onClose={() => setChatUser(null)}
         />
@@ -1957,13 +2018,15 @@ function Dashboard({ currentUser, onUserUpdate, onLogout, lang, onLang, accent,
 }
 
 /* ═══════════════════ CHAT WINDOW ═══════════════════ */
-function ChatWindow({ targetUser, currentUser, messages, onSendMessage, onClose }: any) {
+function ChatWindow({ targetUser, currentUser, messages, hasOlder, onLoadOlder, onSendMessage, onClose }: any) {
   const [text, setText] = useState("");
+  const lastId = messages.length ? messages[messages.length - 1].id : null;
 
+  // Faqat yangi xabar kelganda pastga — eski sahifa yuklanganda joy saqlanadi
   useEffect(() => {
     const el = document.getElementById("chat-body");
     if (el) el.scrollTop = el.scrollHeight;
-  }, [messages]);
+  }, [lastId]);
 
   const handleSend = () => {
     if (!text.trim()) return;
@@ -1998,6 +2061,9 @@ function ChatWindow({ targetUser, currentUser, messages, onSendMessage, onClose
 
         {/* Messages */}
         <div className="chat-body" id="chat-body">
+          {hasOlder && (
+            <button className="btn bo bs" style={{ alignSelf: "center", marginBottom: 8 }} onClick={onLoadOlder}>Oldingi xabarlar</button>
+          )}
           {messages.length === 0 && (
             <div className="chat-empty-state">
               <div className="chat-empty-icon">
@@ -2125,7 +2191,7 @@ function RefPage({ title, icon, data, setData, api, normalize, fields, addToast,
 }
 
 /* ═══════════════════ WAREHOUSE PAGE ═══════════════════ */
-function WarehousePage({ warehouses, setWarehouses, buylist, loading, onRefresh, addToast, T, onOpenWh }: any) {
+function WarehousePage({ warehouses, setWarehouses, buylist, loading, onRefresh, hasMore, onLoadMore, addToast, T, onOpenWh }: any) {
   const [showAdd, setShowAdd] = useState(false);
   const [showEdit, setShowEdit] = useState<any>(null);
   const [showDel, setShowDel] = useState<any>(null);
@@ -2288,6 +2354,11 @@ function WarehousePage({ warehouses, setWarehouses, buylist, loading, onRefresh,
             <div className="awt">{T.createWh}</div>
             <div className="aws">{T.addWhDesc}</div>
           </div>
+          {hasMore && (
+            <div style={{ gridColumn: "1 / -1", display: "flex", justifyContent: "center" }}>
+              <button className="btn bo" onClick={onLoadMore}>Ko'proq yuklash</button>
+            </div>
+          )}
         </div>
       )}
     </div>
@@ -2432,8 +2503,20 @@ function WarehouseDetail({ wh, setWh, warehouses, setWarehouses, buylist, setBuy
                   const token = getToken();
                   const url = `${BASE} /export-buylist-as-excel/${wh.id}/`;
                   try {
-                    const r = await fetch(url, { headers: { Authorization: `Token ${token}` }, credentials: "include" as RequestCredentials });
+                    let r = await fetch(url, { headers: { Authorization: `Token ${token}` }, credentials: "include" as RequestCredentials });
                     if (!r.ok) { addToast(`Excel xatosi: ${r.status}`, "error"); return; }
+                    if (r.status === 202) {
+                      // Katta export — server fon ishini ochdi, tayyor bo'lguncha kutamiz
+                      let job = await r.json();
+                      addToast("Katta export tayyorlanmoqda...", "info");
+                      while (job.status === "queued" || job.status === "running") {
+                        await new Promise(done => setTimeout(done, 2000));
+                        job = await api(`/export-jobs/${job.id}/`);
+                      }
+                      if (!job.download_url) { addToast(`Excel xatosi: ${job.error || job.status}`, "error"); return; }
+                      r = await fetch(job.download_url, { headers: { Authorization: `Token ${token}` }, credentials: "include" as RequestCredentials });
+                      if (!r.ok) { addToast(`Excel xatosi: ${r.status}`, "error"); return; }
+                    }
                     const blob = await r.blob();
                     const u = URL.createObjectURL(blob);
                     const a = document.createElement("a");
@@ -2949,7 +3032,7 @@ function IntakePage({ buylist, setBuylist, warehouses, itemler, moneytypes, unit
 }
 
 /* ═══════════════════ USERS PAGE ═══════════════════ */
-function UsersPage({ users, companies, onRefresh, addToast, T, currentUser, onChatOpen }: any) {
+function UsersPage({ users, companies, onRefresh, hasMore, onLoadMore, addToast, T, currentUser, onChatOpen }: any) {
   const [showAdd, setShowAdd] = useState(false);
   const [delUser, setDelUser] = useState<any>(null);
   const [delConfirmName, setDelConfirmName] = useState("");
@@ -3070,6 +3153,11 @@ function UsersPage({ users, companies, onRefresh, addToast, T, currentUser, onCh
             })}</tbody>
           </table>
         )}
+        {hasMore && (
+          <div style={{ display: "flex", justifyContent: "center", padding: 12 }}>
+            <button className="btn bo" onClick={onLoadMore}>Ko'proq yuklash</button>
+          </div>
+        )}
       </div>
     </div>
   );
@@ -266,12 +266,32 @@ async function api(path, method = 'GET', body = null) {
   if (token) headers['Authorization'] = `Token ${token}`;
   const opts = { method, headers };
   if (body && ['POST', 'PUT', 'PATCH'].includes(method)) opts.body = JSON.stringify(body);
-  const res = await fetch(`${BASE_URL}${path}`, opts);
+  // Sayfalı cevaplardaki `next` tam URL olarak gelir
+  const res = await fetch(/^https?:\/\//.test(path) ? path : `${BASE_URL}${path}`, opts);
   const data = await res.json().catch(() => ({}));
   if (!res.ok) throw new Error(data?.detail || data?.non_field_errors?.[0] || Object.values(data).flat().join(', ') || `Xato: ${res.status}`);
   return data;
 }
 
+// Cursor sayfalı listeden tek sayfa: {results, next}. `next` bir sonraki sayfanın tam URL'i (yoksa null)
+async function apiPage(path, next = null, pageSize = 50) {
+  const data = await api(next || `${path}${path.includes('?') ? '&' : '?'}page_size=${pageSize}`);
+  if (Array.isArray(data)) return { results: data, next: null };
+  return { results: data?.results ?? [], next: data?.next ?? null };
+}
+
+// Sadece küçük referans listeleri (birim, para birimi, ürün) ve raporlar için — `next` bitene kadar hepsini çeker
+async function apiAll(path) {
+  let data = await api(`${path}${path.includes('?') ? '&' : '?'}page_size=500`);
+  if (Array.isArray(data)) return data;
+  const all = [...(data?.results ?? [])];
+  while (data?.next) {
+    data = await api(data.next);
+    all.push(...(data?.results ?? []));
+  }
+  return all;
+}
+
 async function apiUpload(path, uri, type) {
   const token = await getToken();
   const fd = new FormData();
@@ -286,25 +306,25 @@ async function apiUpload(path, uri, type) {
 
 const AUTH = {
   login: (u, p) => api('/user_app/login/', 'POST', { username: u, password: p }),
-  users: () => api('/user_app/users/'),
+  users: (next) => apiPage('/user_app/users/', next),
   createUser: (d) => api('/user_app/users/', 'POST', d),
   deleteUser: (id) => api(`/user_app/users/${id}/`, 'DELETE'),
   updateUser: (id, d) => api(`/user_app/users/${id}/`, 'PUT', d),
   changePassword: (d) => api('/user_app/users/change-password/', 'POST', d),
-  companies: () => api('/user_app/companies/'),
+  companies: (next) => apiPage('/user_app/companies/', next),
   createCompany: (d) => api('/user_app/companies/', 'POST', d),
   deleteCompany: (id) => api(`/user_app/companies/${id}/`, 'DELETE'),
 };
-const DEPOLAR = { list: () => api('/depolar/'), create: (d) => api('/depolar/', 'POST', d), delete: (id) => api(`/depolar/${id}/`, 'DELETE') };
+const DEPOLAR = { list: (next) => apiPage('/depolar/', next), all: () => apiAll('/depolar/'), create: (d) => api('/depolar/', 'POST', d), delete: (id) => api(`/depolar/${id}/`, 'DELETE') };
 const BUYLIST = {
-  list: () => api('/buylist/'),
+  list: () => apiAll('/buylist/'),
   create: (d) => api('/buylist/', 'POST', d),
   update: (id, d) => api(`/buylist/${id}/`, 'PUT', d),
   delete: (id) => api(`/buylist/${id}/`, 'DELETE'),
 };
-const ITEMS = { list: () => api('/itemler/'), create: (d) => api('/itemler/', 'POST', d), delete: (id) => api(`/itemler/${id}/`, 'DELETE') };
-const MONEY = { list: () => api('/moneytypes/'), create: (d) => api('/moneytypes/', 'POST', d), delete: (id) => api(`/moneytypes/${id}/`, 'DELETE') };
-const UNITS = { list: () => api('/unitler/'), create: (d) => api('/unitler/', 'POST', d), delete: (id) => api(`/unitler/${id}/`, 'DELETE') };
+const ITEMS = { list: () => apiAll('/itemler/'), create: (d) => api('/itemler/', 'POST', d), delete: (id) => api(`/itemler/${id}/`, 'DELETE') };
+const MONEY = { list: () => apiAll('/moneytypes/'), create: (d) => api('/moneytypes/', 'POST', d), delete: (id) => api(`/moneytypes/${id}/`, 'DELETE') };
+const UNITS = { list: () => apiAll('/unitler/'), create: (d) => api('/unitler/', 'POST', d), delete: (id) => api(`/unitler/${id}/`, 'DELETE') };
 
 // ─── HELPERS ──────────────────────────────────────────────────────────────────
 function cfm(title, msg, onYes) {
@@ -605,13 +625,25 @@ function WarehouseListScreen({ navigation }) {
   const [saving, setSaving] = useState(false);
   const [search, setSearch] = useState('');
 
+  const [next, setNext] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
+
   const load = useCallback(async () => {
-    try { const d = await DEPOLAR.list(); setWarehouses(Array.isArray(d) ? d : d?.results ?? []); }
+    try { const d = await DEPOLAR.list(); setWarehouses(d.results); setNext(d.next); }
     catch (e) { Alert.alert('Xato', e.message); }
     finally { setLoading(false); setRefreshing(false); }
   }, []);
   useEffect(() => { load(); }, []);
 
+  // Liste sonuna gelince bir sonraki cursor sayfası
+  async function loadMore() {
+    if (!next || loadingMore) return;
+    setLoadingMore(true);
+    try { const d = await DEPOLAR.list(next); setWarehouses(w => [...w, ...d.results]); setNext(d.next); }
+    catch (e) { Alert.alert('Xato', e.message); }
+    finally { setLoadingMore(false); }
+  }
+
   const filteredWh = warehouses.filter(w =>
     w.name?.toLowerCase().includes(search.toLowerCase()) ||
     (w.address?.toLowerCase() || '').includes(search.toLowerCase())
@@ -722,6 +754,8 @@ function WarehouseListScreen({ navigation }) {
       </View>
 
       <FlatList data={filteredWh} keyExtractor={i => String(i.id)}
+        onEndReached={loadMore} onEndReachedThreshold={0.5}
+        ListFooterComponent={loadingMore ? <ActivityIndicator color={T.blue} style={{ marginVertical: 12 }} /> : null}
         refreshControl={<RefreshControl refreshing={refreshing} onRefresh={() => { setRefreshing(true); load(); }} tintColor={T.blue} colors={[T.blue]} />}
         contentContainerStyle={{ padding: 16, gap: 10, flexGrow: 1, backgroundColor: T.bg }}
         ListEmptyComponent={<Empty iconName="warehouse" iconLib="MaterialIcons" title={t.noWarehouse} sub={t.noWarehouseSub} />}
@@ -878,6 +912,11 @@ function WarehouseDetailScreen({ route, navigation }) {
                   headers: token ? { Authorization: `Token ${token}` } : {},
                 });
                 if (!res.ok) { Alert.alert('Xato', `Excel yuklanmadi: ${res.status}`); return; }
+                if (res.status === 202) {
+                  // Katta export fon ishida tayyorlanadi (export-jobs)
+                  Alert.alert('⏳ Tayyorlanmoqda', 'Excel fayl katta — server uni fon rejimida tayyorlamoqda.');
+                  return;
+                }
                 Alert.alert('✅ Muvaffaqiyatli', 'Excel fayl serverdan yuklandi. Uni ilovangizdan ko'rish mumkin.');
               } catch (e) { Alert.alert('Xato', e.message); }
             }}>
@@ -1095,10 +1134,17 @@ function ScanScreen() {
   const [done, setDone] = useState(false);
   const [editId, setEditId] = useState(null);
 
+  const [whNext, setWhNext] = useState(null);
+
   useEffect(() => {
-    DEPOLAR.list().then(d => { const a = Array.isArray(d) ? d : d?.results ?? []; setWarehouses(a); if (a.length) setSelWh(String(a[0].id)); }).catch(() => { });
+    DEPOLAR.list().then(d => { setWarehouses(d.results); setWhNext(d.next); if (d.results.length) setSelWh(String(d.results[0].id)); }).catch(() => { });
   }, []);
 
+  function loadMoreWarehouses() {
+    if (!whNext) return;
+    DEPOLAR.list(whNext).then(d => { setWarehouses(w => [...w, ...d.results]); setWhNext(d.next); }).catch(() => { });
+  }
+
   async function pickImage(cam = false) {
     const p = cam ? await ImagePicker.requestCameraPermissionsAsync() : await ImagePicker.requestMediaLibraryPermissionsAsync();
     if (!p.granted) { Alert.alert('Ruxsat kerak', 'Kamera/galereya ruxsati bering'); return; }
@@ -1305,6 +1351,11 @@ function ScanScreen() {
                   <Text style={{ color: selWh === String(w.id) ? '#fff' : C.text2, fontSize: 13, fontWeight: '600' }}>{w.name}</Text>
                 </TouchableOpacity>
               ))}
+              {whNext && (
+                <TouchableOpacity onPress={loadMoreWarehouses} style={[s.chip, { backgroundColor: T.surface, borderColor: T.border }]}>
+                  <Ionicons name="ellipsis-horizontal" size={16} color={C.text2} />
+                </TouchableOpacity>
+              )}
             </ScrollView>
 
             <Btn title={saving ? t.scanning : t.approve(lines.length)} iconName="checkmark-circle"
@@ -1437,16 +1488,29 @@ function UsersScreen() {
   const [coForm, setCoForm] = useState({ name: '', address: '', phone: '' });
   const [saving, setSaving] = useState(false);
 
+  const [usersNext, setUsersNext] = useState(null);
+  const [companiesNext, setCompaniesNext] = useState(null);
+
   const load = useCallback(async () => {
     setLoading(true);
     try {
       const [u, c] = await Promise.all([AUTH.users(), AUTH.companies()]);
-      setUsers(Array.isArray(u) ? u : u?.results ?? []); setCompanies(Array.isArray(c) ? c : c?.results ?? []);
+      setUsers(u.results); setUsersNext(u.next);
+      setCompanies(c.results); setCompaniesNext(c.next);
     } catch { }
     finally { setLoading(false); }
   }, []);
   useEffect(() => { load(); }, []);
 
+  async function loadMoreUsers() {
+    if (!usersNext) return;
+    try { const u = await AUTH.users(usersNext); setUsers(a => [...a, ...u.results]); setUsersNext(u.next); } catch { }
+  }
+  async function loadMoreCompanies() {
+    if (!companiesNext) return;
+    try { const c = await AUTH.companies(companiesNext); setCompanies(a => [...a, ...c.results]); setCompaniesNext(c.next); } catch { }
+  }
+
   async function addUser() {
     if (!form.username) return; setSaving(true);
     try {
@@ -1498,6 +1562,7 @@ function UsersScreen() {
 
       {tab === 'users' ? (
         <FlatList data={users} keyExtractor={i => String(i.id)} contentContainerStyle={{ padding: 16, gap: 8 }}
+          onEndReached={loadMoreUsers} onEndReachedThreshold={0.5}
           ListEmptyComponent={<Empty iconName="person" iconLib="Ionicons" title="Foydalanuvchi yo'q" />}
           renderItem={({ item }) => {
             const rc = RC[item.role] || RC.staff; return (
@@ -1526,6 +1591,7 @@ function UsersScreen() {
         />
       ) : (
         <FlatList data={companies} keyExtractor={i => String(i.id)} contentContainerStyle={{ padding: 16, gap: 8 }}
+          onEndReached={loadMoreCompanies} onEndReachedThreshold={0.5}
           ListEmptyComponent={<Empty iconName="business" iconLib="MaterialIcons" title="Kompaniya yo'q" />}
           renderItem={({ item }) => (
             <Card style={s.refCard}>
@@ -1922,7 +1988,7 @@ function AnalyticsScreen() {
   const load = useCallback(async () => {
     try {
       const [wh, bl, im, mm] = await Promise.all([
-        DEPOLAR.list(), BUYLIST.list(), ITEMS.list(), MONEY.list(),
+        DEPOLAR.all(), BUYLIST.list(), ITEMS.list(), MONEY.list(),
       ]);
       setWarehouses(Array.isArray(wh) ? wh : wh?.results ?? []);
       setBuylist(Array.isArray(bl) ? bl : bl?.results ?? []);